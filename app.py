@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import io
 import os
 from datetime import datetime, date
 import time
@@ -9,9 +10,12 @@ pd.options.display.float_format = '{:,.2f}'.format
 
 # --- MODULE IMPORTS ---
 try:
-    from modules.paths import PRODUCTS_FILE, SALES_FILE, EXPENSES_FILE, INVOICE_FOLDER
-    from modules.invoice import generate_invoice_pdf
-    from modules.reports_pdf import generate_financial_report_pdf, generate_balance_sheet_pdf
+    from modules.invoice import invoice_item, invoice_path, read_invoice_pdf
+    from modules.storage import get_storage
+    from modules import reports, customers, render_queue, report_cache, invoice_archive
+    from modules.excel_export import export_workbook
+    from modules.sequence import next_invoice_no
+    from modules.reports_pdf import generate_financial_report_pdf, generate_balance_sheet_pdf, generate_gst_summary_pdf
 except ImportError:
     st.error("Modules not found. Ensure 'modules' directory exists.")
     st.stop()
@@ -71,26 +75,14 @@ if 'cart' not in st.session_state:
 if 'last_invoice' not in st.session_state:
     st.session_state.last_invoice = None
 
-# Ensure Files Exist
-def init_files():
-    if not os.path.exists(PRODUCTS_FILE) or os.path.getsize(PRODUCTS_FILE) == 0:
-        pd.DataFrame(columns=["id","name","price","gst"]).to_csv(PRODUCTS_FILE, index=False)
-    if not os.path.exists(SALES_FILE) or os.path.getsize(SALES_FILE) == 0:
-        pd.DataFrame(columns=["invoice_no","date","customer","service","price","gst","total"]).to_csv(SALES_FILE, index=False)
-    if not os.path.exists(EXPENSES_FILE) or os.path.getsize(EXPENSES_FILE) == 0:
-        pd.DataFrame(columns=["date","description","amount"]).to_csv(EXPENSES_FILE, index=False)
+# Storage backend (creates the data files / database if missing)
+storage = get_storage()
 
-init_files()
-
-# --- HELPER FUNCTIONS ---
-def load_data(file):
-    try:
-        return pd.read_csv(file)
-    except:
-        return pd.DataFrame()
-
-def save_data(df, file):
-    df.to_csv(file, index=False)
+# Invoice PDFs render on a background thread; the first run in this process also re-queues
+# any render a previous run left unfinished
+render_queue.start(storage)
+# Invoice PDFs older than a few months are rolled into indexed monthly archives (also idempotent)
+invoice_archive.start()
 
 # --- SIDEBAR NAVIGATION ---
 with st.sidebar:
@@ -100,6 +92,14 @@ with st.sidebar:
     st.markdown("---")
     menu = st.radio("Navigation", ["📝 Billing", "📊 Reports", "🏢 Balance Sheet"], index=0)
     st.markdown("---")
+    pdf_queue = render_queue.counts()
+    if pdf_queue["pending"] or pdf_queue["rendering"]:
+        st.caption(f"🖨️ {pdf_queue['pending'] + pdf_queue['rendering']} invoice PDF(s) rendering")
+    if pdf_queue["failed"]:
+        st.warning(f"{pdf_queue['failed']} invoice PDF(s) failed")
+        if st.button("Retry failed PDFs"):
+            render_queue.retry_failed()
+            st.rerun()
     st.caption("v2.0 | Streamlit Edition")
 
 # --- PAGE: BILLING ---
@@ -117,11 +117,7 @@ if menu == "📝 Billing":
             st.write("") # Spacer
             if st.button("Add to Menu", type="primary"):
                 if new_name:
-                    df = load_data(PRODUCTS_FILE)
-                    new_id = len(df) + 1
-                    new_row = {"id": new_id, "name": new_name, "price": new_price, "gst": new_gst}
-                    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-                    save_data(df, PRODUCTS_FILE)
+                    storage.add_product(new_name, new_price, new_gst)
                     st.success(f"Added {new_name}!")
                     time.sleep(1)
                     st.rerun()
@@ -133,7 +129,7 @@ if menu == "📝 Billing":
 
     with col_left:
         st.subheader("1. Select Services")
-        products_df = load_data(PRODUCTS_FILE)
+        products_df = storage.load_products()
         
         if not products_df.empty:
             # Custom formatting for display
@@ -193,9 +189,38 @@ if menu == "📝 Billing":
     with col_right:
         st.subheader("2. Checkout Details")
         with st.container(border=True):
-            cust_name = st.text_input("Customer Name *")
-            cust_addr = st.text_input("Address")
-            cust_contact = st.text_input("Contact")
+            # Returning customers: prefix search on the customer index (no ledger scan)
+            lookup_text = st.text_input("🔎 Returning customer (name or phone)", key="cust_lookup")
+            matches = customers.suggest(lookup_text) if lookup_text.strip() else []
+            chosen = None
+            if matches:
+                pick = st.selectbox("Matches", range(len(matches)), key="cust_pick",
+                                    format_func=lambda i: f"{matches[i]['name']} · {matches[i]['contact'] or '-'} · "
+                                                          f"{matches[i]['visits']} visits")
+                chosen = matches[pick]
+            elif lookup_text.strip():
+                st.caption("No matching customer; enter a new one below.")
+
+            cust_name = st.text_input("Customer Name *", value=chosen['name'] if chosen else "")
+            cust_addr = st.text_input("Address", value=(chosen['address'] or "") if chosen else "")
+            cust_contact = st.text_input("Contact", value=(chosen['contact'] or "") if chosen else "")
+
+            if chosen:
+                with st.expander(f"History: {chosen['name']}", expanded=True):
+                    h1, h2, h3 = st.columns(3)
+                    h1.metric("Visits", chosen['visits'])
+                    h2.metric("Lifetime Spend", f"₹ {chosen['spend']:,.0f}")
+                    h3.metric("Last Visit", (chosen['last_visit'] or "-")[:10])
+                    st.dataframe(
+                        customers.history(chosen['name'], limit=10),
+                        use_container_width=True,
+                        hide_index=True,
+                        column_config={
+                            "invoice_no": "Inv #",
+                            "total": st.column_config.NumberColumn("Amount", format="₹ %.2f"),
+                            "lines": "Items",
+                        }
+                    )
             
             st.markdown("---")
             
@@ -219,19 +244,8 @@ if menu == "📝 Billing":
                 elif not cust_name:
                     st.error("Customer Name is required!")
                 else:
-                    # Generate Invoice Process
-                    sales_df = load_data(SALES_FILE)
-                    
-                    # Determine Invoice No
-                    if not sales_df.empty:
-                        last_inv_no = sales_df["invoice_no"].max()
-                        # Handle potential NaN or non-numeric if legacy data exists, simplifying assumption:
-                        try:
-                            inv_no = int(last_inv_no) + 1
-                        except:
-                            inv_no = 1001
-                    else:
-                        inv_no = 1001
+                    # Allocate Invoice No (persistent sequence, never reused)
+                    inv_no = next_invoice_no()
                         
                     inv_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                     
@@ -251,38 +265,42 @@ if menu == "📝 Billing":
                             "total": item['total']
                         })
                         # PDF Record: [service, price_str, gst_str, total_str]
-                        pdf_items.append([
-                            item['name'],
-                            f"₹{item['price']:.2f}",
-                            f"{item['gst']}%",
-                            f"₹{item['total']:.2f}"
-                        ])
+                        pdf_items.append(invoice_item(item['name'], item['price'], item['gst'], item['total']))
                     
-                    # Update Sales File
-                    sales_df = pd.concat([sales_df, pd.DataFrame(new_rows)], ignore_index=True)
-                    save_data(sales_df, SALES_FILE)
+                    # Append to Sales Ledger (only the new line items are written)
+                    storage.append_sales(new_rows)
+                    customers.remember(cust_name, cust_contact, cust_addr)
                     
-                    # Generate PDF
-                    try:
-                        pdf_path = generate_invoice_pdf(inv_no, cust_name, pdf_items, grand_total, cust_addr, cust_contact)
-                        st.session_state.last_invoice = pdf_path
-                        st.session_state.cart = [] # Clear cart
-                        st.success(f"Invoice #{inv_no} Generated Successfully!")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error generating PDF: {e}")
+                    # Queue the PDF; the sale is already saved, so the next customer need not wait for it
+                    render_queue.enqueue(inv_no, cust_name, pdf_items, grand_total, cust_addr, cust_contact, inv_date)
+                    st.session_state.last_invoice = inv_no
+                    st.session_state.cart = [] # Clear cart
+                    st.success(f"Invoice #{inv_no} Generated Successfully!")
+                    st.rerun()
 
-            # Download Button (if invoice generated)
-            if st.session_state.last_invoice and os.path.exists(st.session_state.last_invoice):
-                with open(st.session_state.last_invoice, "rb") as pdf_file:
+            # Download Button (once the invoice's PDF is ready)
+            if st.session_state.last_invoice:
+                inv_no = st.session_state.last_invoice
+                pdf_state = render_queue.status(inv_no)
+                if pdf_state == "ready":
+                    # Loose or already rolled into the monthly archive
                     st.download_button(
                         label="⬇️ Download Invoice PDF",
-                        data=pdf_file,
-                        file_name=os.path.basename(st.session_state.last_invoice),
+                        data=read_invoice_pdf(inv_no),
+                        file_name=os.path.basename(invoice_path(inv_no)),
                         mime="application/pdf",
                         type="secondary",
                         use_container_width=True
                     )
+                elif pdf_state == "failed":
+                    st.error(f"PDF for Invoice #{inv_no} failed: {render_queue.error(inv_no)}")
+                    if st.button("Retry PDF", use_container_width=True):
+                        render_queue.retry_failed()
+                        st.rerun()
+                elif pdf_state is not None:
+                    st.info(f"PDF for Invoice #{inv_no} is {pdf_state}…")
+                    if st.button("🔄 Check PDF", use_container_width=True):
+                        st.rerun()
 
 # --- PAGE: REPORTS ---
 elif menu == "📊 Reports":
@@ -300,33 +318,18 @@ elif menu == "📊 Reports":
             if st.button("Apply Filter", type="primary", use_container_width=True):
                 st.rerun()
 
-    # Load Data
-    sales_df = load_data(SALES_FILE)
-    expenses_df = load_data(EXPENSES_FILE)
-
-    if not sales_df.empty:
-        # Date Conversion
-        sales_df['date_dt'] = pd.to_datetime(sales_df['date']).dt.date
-        filter_mask = (sales_df['date_dt'] >= start_date) & (sales_df['date_dt'] <= end_date)
-        filtered_sales = sales_df[filter_mask]
-        
-        # Calculate Metrics
-        total_sales = filtered_sales['total'].sum()
-        revenue_ex_gst = filtered_sales['price'].sum()
-        gst_collected = total_sales - revenue_ex_gst
+    # Load Data (date-range filtering happens in the storage backend)
+    if storage.last_invoice_no() is not None:
+        # Row count for the range; the table below fetches one page at a time
+        sales_count = storage.sales_page(start_date, end_date, limit=0)[1]
         
-        # Expenses (Assuming similar date structure if available, else standard)
-        if not expenses_df.empty:
-            try:
-                expenses_df['date_dt'] = pd.to_datetime(expenses_df['date']).dt.date
-                filtered_expenses = expenses_df[(expenses_df['date_dt'] >= start_date) & (expenses_df['date_dt'] <= end_date)]
-                total_expenses = filtered_expenses['amount'].sum()
-            except:
-                total_expenses = 0.0
-        else:
-            total_expenses = 0.0
-            
-        net_profit = revenue_ex_gst - total_expenses
+        # Calculate Metrics (shared, memoized report engine)
+        summary = reports.summary(start_date, end_date)
+        total_sales = summary['total_sales']
+        revenue_ex_gst = summary['revenue_ex_gst']
+        gst_collected = summary['gst_collected']
+        total_expenses = summary['expenses']
+        net_profit = summary['net_profit']
         
         # Display Metrics
         m1, m2, m3, m4, m5 = st.columns(5)
@@ -342,23 +345,43 @@ elif menu == "📊 Reports":
         c1, c2 = st.columns([2, 1])
         with c1:
             st.subheader("Sales Trend")
-            if not filtered_sales.empty:
-                # Group by date
-                daily_sales = filtered_sales.groupby('date_dt')['total'].sum().reset_index()
-                st.bar_chart(daily_sales, x='date_dt', y='total', color="#4CAF50")
+            if sales_count:
+                trend_view = st.selectbox("View", ["Daily", "Weekly", "Monthly", "Quarterly",
+                                                   "Rolling 7-day", "Rolling 30-day"], key="trend_view")
+                if trend_view.startswith("Rolling"):
+                    window = 7 if "7" in trend_view else 30
+                    trend = reports.rolling(start_date, end_date, window=window)
+                    st.line_chart(trend, x='period', y=['gross', 'expenses', 'profit'])
+                else:
+                    bucket = {"Daily": "day", "Weekly": "week", "Monthly": "month", "Quarterly": "quarter"}[trend_view]
+                    trend = reports.timeseries(start_date, end_date, bucket=bucket)
+                    # Net + GST stack up to the gross takings of each period
+                    st.bar_chart(trend, x='period', y=['net', 'gst'], color=["#4CAF50", "#FFC107"])
             else:
                 st.info("No sales in selected range.")
 
         with c2:
             st.subheader("Top Services")
-            if not filtered_sales.empty:
-                top_services = filtered_sales['service'].value_counts().head(5)
+            if sales_count:
+                top_services = reports.top_services(start_date, end_date, limit=5)
                 st.bar_chart(top_services, horizontal=True)
                 
-        # Detailed Data Table
+        # Detailed Data Table (server-side pages: only the visible rows are sent to the browser)
         st.subheader("Detailed Sales History")
+        SORT_COLUMNS = {"Date": "date", "Inv #": "invoice_no", "Customer": "customer", "Service": "service", "Amount": "total"}
+        p1, p2, p3, p4 = st.columns([2, 1, 1, 1])
+        sort_label = p1.selectbox("Sort by", list(SORT_COLUMNS), key="history_sort")
+        descending = p2.toggle("Descending", value=True, key="history_desc")
+        page_size = p3.selectbox("Rows per page", [50, 100, 250, 500], index=1, key="history_page_size")
+        pages = max((sales_count + page_size - 1) // page_size, 1)
+        # A narrower range or filter leaves fewer pages; clamp before the widget rejects the stored page
+        if st.session_state.get("history_page", 1) > pages:
+            st.session_state["history_page"] = pages
+        page_no = p4.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, step=1, key="history_page")
+        page, _ = storage.sales_page(start_date, end_date, offset=(page_no - 1) * page_size, limit=page_size,
+                                     sort_by=SORT_COLUMNS[sort_label], descending=descending)
         st.dataframe(
-            filtered_sales[['invoice_no', 'date', 'customer', 'service', 'total']],
+            page[['invoice_no', 'date', 'customer', 'service', 'total']],
             use_container_width=True,
             hide_index=True,
             column_config={
@@ -366,38 +389,102 @@ elif menu == "📊 Reports":
                 "total": st.column_config.NumberColumn("Amount", format="₹ %.2f")
             }
         )
+        first_row = (page_no - 1) * page_size
+        st.caption(f"Showing {min(first_row + 1, sales_count):,}–{first_row + len(page):,} of {sales_count:,} line items")
         
+        # GST Return Summary (per rate slab, optionally per day)
+        st.subheader("GST Summary by Rate Slab")
+        gst_by_day = st.checkbox("Break down by day", key="gst_by_day")
+        gst_slabs = reports.gst_summary(start_date, end_date)
+        gst_table = reports.gst_summary(start_date, end_date, by_day=True) if gst_by_day else gst_slabs
+        st.dataframe(
+            gst_table,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "rate": st.column_config.NumberColumn("GST %", format="%g%%"),
+                "taxable_value": st.column_config.NumberColumn("Taxable Value", format="₹ %.2f"),
+                "tax": st.column_config.NumberColumn("Tax", format="₹ %.2f"),
+                "total": st.column_config.NumberColumn("Total", format="₹ %.2f"),
+            }
+        )
+        g1, g2, g3 = st.columns(3)
+        gst_name = f"GST_Summary_{start_date}_to_{end_date}"
+        # Built only on demand, like the PDF, so other reruns of the page do not write them
+        if g1.button("⬇️ GST Summary (CSV)", use_container_width=True):
+            csv_buffer = io.BytesIO()
+            reports.export_gst_summary(gst_table, csv_buffer, fmt="csv")
+            g1.download_button("Download GST CSV Now", data=csv_buffer.getvalue(),
+                               file_name=f"{gst_name}.csv", mime="text/csv", type="primary")
+        if g2.button("⬇️ GST Summary (Excel)", use_container_width=True):
+            xlsx_buffer = io.BytesIO()
+            reports.export_gst_summary(gst_table, xlsx_buffer, fmt="xlsx")
+            g2.download_button("Download GST Excel Now", data=xlsx_buffer.getvalue(), file_name=f"{gst_name}.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                               type="primary")
+        if g3.button("⬇️ GST Summary (PDF)", use_container_width=True):
+            try:
+                daily_rows = reports.gst_summary_rows(gst_table, total=False) if gst_by_day else None
+                gst_pdf = generate_gst_summary_pdf(None, str(start_date), str(end_date),
+                                                   reports.gst_summary_rows(gst_slabs), daily_rows)
+                st.download_button(
+                    label="Download GST PDF Now",
+                    data=gst_pdf,
+                    file_name=f"{gst_name}.pdf",
+                    mime="application/pdf",
+                    type="primary"
+                )
+            except Exception as e:
+                st.error(f"Failed to generate GST summary: {e}")
+
+        # Excel export: summary, sales and expenses streamed into a constant-memory workbook
+        if st.button("⬇️ Export to Excel (Summary, Sales, Expenses)"):
+            try:
+                bar = st.progress(0.0, text="Writing workbook...")
+                workbook = io.BytesIO()
+                export = export_workbook(
+                    workbook, start=start_date, end=end_date,
+                    progress=lambda r: bar.progress(min(r["sales_rows"] / max(sales_count, 1), 1.0),
+                                                    text=f"{r['rows']:,} rows · {r['rows_per_s']:,.0f} rows/s"))
+                bar.empty()
+                st.caption(f"{export['rows']:,} rows in {export['seconds']:.1f}s "
+                           f"({export['rows_per_s']:,.0f} rows/s), {export['sheets']} sheets")
+                st.download_button(
+                    label="Download Excel Now",
+                    data=workbook.getvalue(),
+                    file_name=f"Ledger_{start_date}_to_{end_date}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    type="primary"
+                )
+            except Exception as e:
+                st.error(f"Failed to export workbook: {e}")
+
         # Download Report PDF
+        report_by_day = st.checkbox("Summarise the report by day", help="One row per day instead of every sale")
         if st.button("⬇️ Download Financial Report (PDF)"):
             try:
                 # Prepare data for PDF module
                 # Summary Data
-                summary_data = [
-                    ["Total Sales (Incl. GST)", f"₹ {total_sales:,.2f}"],
-                    ["Total Revenue (Excl. GST)", f"₹ {revenue_ex_gst:,.2f}"],
-                    ["GST Collected", f"₹ {gst_collected:,.2f}"],
-                    ["Total Expenses", f"₹ {total_expenses:,.2f}"],
-                    ["NET PROFIT/LOSS", f"₹ {net_profit:,.2f}"]
-                ]
-                # Sales Data
-                sales_data_list = filtered_sales[['invoice_no', 'date', 'customer', 'service', 'total']].values.tolist()
-                # Format total in list
-                final_sales_data = []
-                for row in sales_data_list:
-                    # row: [inv, date, cust, service, total]
-                    final_sales_data.append([row[0], row[1], row[2], row[3], f"₹{row[4]:.2f}"])
+                summary_data = reports.summary_rows(summary)
+                def render(f):
+                    # Sales rows are streamed from the ledger as the pages are laid out
+                    if report_by_day:
+                        sales_rows = reports.daily_report_rows(start_date, end_date)
+                    else:
+                        sales_rows = reports.sales_report_rows(start_date, end_date)
+                    generate_financial_report_pdf(f, str(start_date), str(end_date), summary_data,
+                                                  sales_rows, by_day=report_by_day)
 
-                report_path = os.path.join(INVOICE_FOLDER, f"Financial_Report_{start_date}_to_{end_date}.pdf")
-                generate_financial_report_pdf(report_path, str(start_date), str(end_date), summary_data, final_sales_data)
-                
-                with open(report_path, "rb") as f:
-                    st.download_button(
-                        label="Download PDF Now",
-                        data=f,
-                        file_name=os.path.basename(report_path),
-                        mime="application/pdf",
-                        type="primary"
-                    )
+                # Served from the report cache unless the range or the ledger changed since the last render
+                report_pdf = report_cache.read_report(
+                    "financial", [str(start_date), str(end_date), report_by_day, summary_data], render)
+                st.download_button(
+                    label="Download PDF Now",
+                    data=report_pdf,
+                    file_name=f"Financial_Report_{start_date}_to_{end_date}.pdf",
+                    mime="application/pdf",
+                    type="primary"
+                )
             except Exception as e:
                 st.error(f"Failed to generate report: {e}")
 
@@ -409,26 +496,10 @@ elif menu == "🏢 Balance Sheet":
     st.title("🏢 Business Balance Sheet")
     st.markdown("Snapshot of financial health.")
 
-    sales_df = load_data(SALES_FILE)
-    expenses_df = load_data(EXPENSES_FILE)
-    
-    if not sales_df.empty:
-        total_sales_inc_gst = sales_df["total"].sum()
-        revenue_ex_gst = sales_df["price"].sum()
-        gst_collected = total_sales_inc_gst - revenue_ex_gst
-    else:
-        total_sales_inc_gst = 0.0
-        revenue_ex_gst = 0.0
-        gst_collected = 0.0
-    
-    if not expenses_df.empty:
-        total_exp = expenses_df["amount"].sum()
-    else:
-        total_exp = 0.0
-        
-    cash_balance = total_sales_inc_gst - total_exp
-    gst_payable = gst_collected
-    retained_earnings = revenue_ex_gst - total_exp
+    sheet = reports.balance_sheet()
+    cash_balance = sheet["cash_balance"]
+    gst_payable = sheet["gst_payable"]
+    retained_earnings = sheet["retained_earnings"]
     
     # Layout
     c1, c2 = st.columns(2)
@@ -451,22 +522,22 @@ elif menu == "🏢 Balance Sheet":
             st.metric("Retained Earnings", f"₹ {retained_earnings:,.2f}")
             
             st.markdown("---")
-            total_liab_equity = gst_payable + retained_earnings
+            total_liab_equity = sheet["total_liabilities_equity"]
             st.markdown(f"### Total Liab. & Equity: ₹ {total_liab_equity:,.2f}")
             
     # Download Balance Sheet
     st.markdown("### Export")
     if st.button("⬇️ Generate Balance Sheet PDF"):
         try:
-            bs_path = os.path.join(INVOICE_FOLDER, f"Balance_Sheet_{date.today()}.pdf")
-            generate_balance_sheet_pdf(bs_path, cash_balance, gst_payable, retained_earnings)
-            with open(bs_path, "rb") as f:
-                st.download_button(
-                    label="Download PDF",
-                    data=f,
-                    file_name=os.path.basename(bs_path),
-                    mime="application/pdf",
-                    type="primary"
-                )
+            bs_pdf = report_cache.read_report(
+                "balance-sheet", [cash_balance, gst_payable, retained_earnings],
+                lambda f: generate_balance_sheet_pdf(f, cash_balance, gst_payable, retained_earnings))
+            st.download_button(
+                label="Download PDF",
+                data=bs_pdf,
+                file_name=f"Balance_Sheet_{date.today()}.pdf",
+                mime="application/pdf",
+                type="primary"
+            )
         except Exception as e:
             st.error(f"Error: {e}")
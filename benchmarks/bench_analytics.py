@@ -0,0 +1,69 @@
+"""Time-bucketed analytics over a multi-year ledger.
+
+Builds a ledger of N line items (default 10M, ~10 years), then times reports.timeseries
+for each bucket and the rolling windows over the whole range. The first query includes
+building the daily rollups from scratch; after that every view is computed from one row
+per day, so it should stay far below a second regardless of ledger size.
+Run from the repo root:  python benchmarks/bench_analytics.py [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROWS = 10_000_000
+CHUNK = 1_000_000
+
+
+def build_ledger(storage, n_rows):
+    from modules.schema import parse_sales
+
+    minutes = (10 * 365 * 24 * 60) / n_rows  # spread over ten years
+    rng = np.random.default_rng(0)
+    for offset in range(0, n_rows, CHUNK):
+        n = min(CHUNK, n_rows - offset)
+        idx = np.arange(offset, offset + n)
+        price = rng.choice(np.arange(100, 5000, 50), n).astype(float)
+        storage.append_sales_frame(parse_sales(pd.DataFrame({
+            "invoice_no": idx // 3 + 1001,
+            "date": pd.Timestamp("2016-01-01") + pd.to_timedelta(idx * minutes, unit="min"),
+            "customer": "Customer",
+            "service": np.array([f"Service {i}" for i in range(30)])[idx % 30],
+            "price": price,
+            "gst": 18.0,
+            "total": price * 1.18,
+        })))
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    out = fn()
+    print(f"{label:>28} | {(time.perf_counter() - start) * 1000:>9.1f} ms | {len(out):>6,} rows")
+
+
+def main():
+    from modules import reports
+    from modules.storage import get_storage
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    storage = get_storage()
+    start = time.perf_counter()
+    build_ledger(storage, n_rows)
+    print(f"built {n_rows:,} line items in {time.perf_counter() - start:.1f}s")
+
+    timed("day (incl. rollup build)", lambda: reports.timeseries(bucket="day"))
+    reports.clear_cache()
+    for bucket in reports.BUCKETS:
+        timed(bucket, lambda: reports.timeseries(bucket=bucket))
+    for window in reports.ROLLING_WINDOWS:
+        timed(f"rolling {window}d", lambda: reports.rolling(window=window))
+    timed("month (memoized)", lambda: reports.timeseries(bucket="month"))
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("FAIRANDLOVELY_HOME", tempfile.mkdtemp(prefix="fl_bench_"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
@@ -0,0 +1,71 @@
+"""Checkout latency vs. size of the sales history.
+
+Compares the old read-concat-rewrite of sales.csv with the append-only ledger writer.
+Run from the repo root:  python benchmarks/bench_checkout.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FAIRANDLOVELY_HOME", tempfile.mkdtemp(prefix="fl_bench_"))
+
+import pandas as pd
+
+from modules.ledger import SALES_COLUMNS, append_sales
+
+HISTORY_SIZES = [10_000, 100_000, 1_000_000]
+CHECKOUTS = 20
+
+
+def make_history(path, n_rows):
+    inv = [1001 + i // 3 for i in range(n_rows)]
+    pd.DataFrame({
+        "invoice_no": inv,
+        "date": "2024-01-01 10:00:00",
+        "customer": "Customer",
+        "service": "Facial",
+        "price": 500.0,
+        "gst": 18.0,
+        "total": 590.0,
+    })[SALES_COLUMNS].to_csv(path, index=False)
+
+
+def cart(invoice_no):
+    return [{"invoice_no": invoice_no, "date": "2024-06-01 12:00:00", "customer": "Bench",
+             "service": s, "price": 500.0, "gst": 18.0, "total": 590.0} for s in ("Facial", "Haircut", "Bridal")]
+
+
+def old_checkout(path, invoice_no):
+    df = pd.read_csv(path)
+    df = pd.concat([df, pd.DataFrame(cart(invoice_no))], ignore_index=True)
+    df.to_csv(path, index=False)
+
+
+def new_checkout(path, invoice_no):
+    append_sales(cart(invoice_no), path=path)
+
+
+def time_checkouts(fn, path, checkouts):
+    start = time.perf_counter()
+    for i in range(checkouts):
+        fn(path, 900_000 + i)
+    return (time.perf_counter() - start) / checkouts * 1000
+
+
+def main():
+    workdir = os.environ["FAIRANDLOVELY_HOME"]
+    print(f"{'history rows':>14} | {'rewrite ms/checkout':>20} | {'append ms/checkout':>19}")
+    for n in HISTORY_SIZES:
+        path = os.path.join(workdir, f"sales_{n}.csv")
+        make_history(path, n)
+        old_ms = time_checkouts(old_checkout, path, max(2, CHECKOUTS // (n // 10_000)))
+        make_history(path, n)
+        new_ms = time_checkouts(new_checkout, path, CHECKOUTS)
+        print(f"{n:>14,} | {old_ms:>20.2f} | {new_ms:>19.3f}")
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
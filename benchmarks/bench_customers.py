@@ -0,0 +1,66 @@
+"""Customer index: autocomplete/lookup latency and per-checkout maintenance cost.
+
+Builds a ledger with many distinct customers (default 300k customers, 1M line items),
+then times prefix suggestions, a profile + history lookup and the index update that
+each checkout pays. None of these should grow with the number of customers.
+Run from the repo root:  python benchmarks/bench_customers.py [customers] [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CUSTOMERS = 300_000
+DEFAULT_ROWS = 1_000_000
+CHECKOUTS = 50
+
+
+def per_call_ms(fn, args):
+    start = time.perf_counter()
+    for a in args:
+        fn(a)
+    return (time.perf_counter() - start) / len(args) * 1000
+
+
+def main():
+    from modules import customers
+    from modules.schema import parse_sales
+    from modules.sequence import reserve_invoice_numbers
+    from modules.storage import get_storage
+
+    n_customers = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CUSTOMERS
+    n_rows = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ROWS
+    storage = get_storage()
+    customers.lookup("nobody")  # initialise the (empty) index so writes maintain it incrementally
+
+    rng = np.random.default_rng(0)
+    names = np.array([f"Customer {i:06d}" for i in range(n_customers)])
+    idx = np.arange(n_rows)
+    start = time.perf_counter()
+    storage.append_sales_frame(parse_sales(pd.DataFrame({
+        "invoice_no": idx // 2 + 1001,
+        "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(idx, unit="min"),
+        "customer": names[rng.integers(0, n_customers, n_rows // 2).repeat(2)],
+        "service": "Facial", "price": 500.0, "gst": 18.0, "total": 590.0,
+    })))
+    print(f"bulk write of {n_rows:,} lines incl. index update: {time.perf_counter() - start:.1f}s")
+
+    prefixes = [f"customer {i:03d}" for i in rng.integers(0, 1000, 200)]
+    print(f"suggest(prefix):        {per_call_ms(customers.suggest, prefixes):.2f} ms")
+    picks = list(names[rng.integers(0, n_customers, 200)])
+    print(f"lookup + history:       {per_call_ms(lambda n: (customers.lookup(n), customers.history(n)), picks):.2f} ms")
+
+    def checkout(name):
+        inv = reserve_invoice_numbers(1)[0]
+        storage.append_sales([{"invoice_no": inv, "date": "2026-01-01 10:00:00", "customer": name,
+                               "service": "Facial", "price": 500.0, "gst": 18.0, "total": 590.0}])
+    print(f"checkout (with index):  {per_call_ms(checkout, picks[:CHECKOUTS]):.2f} ms")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("FAIRANDLOVELY_HOME", tempfile.mkdtemp(prefix="fl_bench_"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
@@ -0,0 +1,73 @@
+"""Date-range filtering: binary search on the sorted ledger vs. per-row masks.
+
+  legacy  -- the old UI code: a Python date object per row, then two full-column comparisons
+  mask    -- two vectorised datetime64 comparisons over every row
+  search  -- storage._filter_by_date: two searchsorted calls on the sorted epoch column + a slice
+
+Each query is a one-week range in the middle of the history.
+Run from the repo root:  python benchmarks/bench_date_filter.py [max_rows]
+"""
+import os
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+SIZES = [100_000, 1_000_000, 10_000_000]
+REPEATS = 20
+LEGACY_MAX_ROWS = 1_000_000  # the per-row date() conversion takes minutes beyond this
+
+
+def make_ledger(n_rows):
+    from modules.schema import parse_sales
+    return parse_sales(pd.DataFrame({
+        "invoice_no": np.arange(n_rows) // 3 + 1001,
+        "date": pd.date_range("2016-01-01", periods=n_rows, freq="30s"),
+        "customer": "Customer",
+        "service": "Facial",
+        "price": 500.0,
+        "gst": 18.0,
+        "total": 590.0,
+    }))
+
+
+def legacy(df, start, end):
+    days = pd.to_datetime(df["date"]).dt.date
+    return df[(days >= start) & (days <= end)]
+
+
+def mask(df, start, end):
+    return df[(df["date"] >= pd.Timestamp(start)) & (df["date"] < pd.Timestamp(end + timedelta(days=1)))]
+
+
+def timed(fn, df, start, end, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        t = time.perf_counter()
+        out = fn(df, start, end)
+        best = min(best, time.perf_counter() - t)
+    return best * 1000, len(out)
+
+
+def main():
+    from modules.storage import _filter_by_date
+
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+    print(f"{'rows':>12} | {'legacy ms':>10} | {'mask ms':>9} | {'search ms':>9} | {'rows hit':>8}")
+    for n in [s for s in SIZES if s <= max_rows]:
+        df = make_ledger(n)
+        mid = df["date"].iloc[n // 2].date()
+        start, end = mid, mid + timedelta(days=6)
+        search_ms, hit = timed(_filter_by_date, df, start, end, REPEATS)
+        mask_ms, mask_hit = timed(mask, df, start, end, REPEATS)
+        assert hit == mask_hit
+        legacy_ms = timed(legacy, df, start, end, 1)[0] if n <= LEGACY_MAX_ROWS else float("nan")
+        print(f"{n:>12,} | {legacy_ms:>10.1f} | {mask_ms:>9.2f} | {search_ms:>9.3f} | {hit:>8,}")
+
+
+if __name__ == "__main__":
+    main()
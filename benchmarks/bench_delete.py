@@ -0,0 +1,62 @@
+"""Invoice deletion latency vs. size of the sales history.
+
+With tombstones, a delete appends one small record instead of rewriting the ledger,
+so latency should stay flat as history grows. Compaction cost is reported separately.
+Run from the repo root:  python benchmarks/bench_delete.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+HISTORY_SIZES = [10_000, 100_000, 1_000_000]
+DELETES = 50
+
+
+def make_history(sales_file, n_rows):
+    pd.DataFrame({
+        "invoice_no": np.arange(n_rows) // 3 + 1001,
+        "date": pd.date_range("2022-01-01", periods=n_rows, freq="3min").strftime("%Y-%m-%d %H:%M:%S"),
+        "customer": "Customer",
+        "service": "Facial",
+        "price": 500.0,
+        "gst": 18.0,
+        "total": 590.0,
+    }).to_csv(sales_file, index=False)
+
+
+def main():
+    from modules.storage import CsvStorage
+
+    print(f"{'history rows':>14} | {'delete ms':>10} | {'compact s':>10}")
+    for n in HISTORY_SIZES:
+        home = tempfile.mkdtemp(prefix="fl_bench_delete_")
+        data = os.path.join(home, "data")
+        os.makedirs(data)
+        make_history(os.path.join(data, "sales.csv"), n)
+        storage = CsvStorage(products_file=os.path.join(data, "products.csv"),
+                             sales_file=os.path.join(data, "sales.csv"),
+                             expenses_file=os.path.join(data, "expenses.csv"),
+                             sales_folder=os.path.join(data, "sales"))
+        targets = np.random.default_rng(0).choice(np.arange(1001, 1001 + n // 3), DELETES, replace=False)
+        storage.load_sales()  # warm the partition cache, as a running app would be
+
+        start = time.perf_counter()
+        for inv in targets:
+            storage.delete_invoice(int(inv))
+        delete_ms = (time.perf_counter() - start) / DELETES * 1000
+
+        start = time.perf_counter()
+        storage.compact()
+        compact_s = time.perf_counter() - start
+        print(f"{n:>14,} | {delete_ms:>10.2f} | {compact_s:>10.2f}")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("FAIRANDLOVELY_HOME", tempfile.mkdtemp(prefix="fl_bench_"))
+    main()
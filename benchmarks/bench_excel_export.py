@@ -0,0 +1,100 @@
+"""Excel export throughput and peak memory, streaming vs. whole-frame.
+
+  stream  -- modules.excel_export.export_workbook: ledger chunks into a constant_memory workbook
+  pandas  -- load the whole range, then DataFrame.to_excel (xlsxwriter, in-memory worksheets)
+
+Each export runs in a fresh process so its peak RSS is its own. The ledger is written first,
+in another child process. Peak RSS for 'stream' should stay flat as the row count grows.
+Run from the repo root:  python benchmarks/bench_excel_export.py [max_rows] [csv|sqlite]
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+SIZES = [100_000, 1_000_000, 3_000_000]
+PANDAS_MAX_ROWS = 1_000_000  # the whole-frame export needs several GB beyond this
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def make_ledger(n_rows):
+    from modules.schema import parse_sales
+    from modules.storage import get_storage
+    rng = np.random.default_rng(0)
+    storage = get_storage()
+    step = 500_000
+    for offset in range(0, n_rows, step):
+        n = min(step, n_rows - offset)
+        idx = np.arange(offset, offset + n)
+        price = rng.choice(np.arange(100, 5000, 50), n).astype(float)
+        storage.append_sales_frame(parse_sales(pd.DataFrame({
+            "invoice_no": idx // 3 + 1001,
+            "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(idx * 60, unit="s"),
+            "customer": np.char.add("Customer ", rng.integers(0, 20_000, n).astype(str)),
+            "service": np.char.add("Service ", rng.integers(0, 30, n).astype(str)),
+            "price": price,
+            "gst": 18.0,
+            "total": price * 1.18,
+        })))
+    storage.add_expense("2020-01-15", "Rent", 25_000.0)
+    # Bring the daily rollups up to date here, as the running app keeps them, so the export's
+    # summary sheet reads them instead of paying for a one-off rebuild
+    from modules import rollups
+    rollups.rebuild(storage)
+
+
+def run_export(mode, path, results):
+    from modules.storage import get_storage
+    storage = get_storage()
+    t = time.perf_counter()
+    if mode == "stream":
+        from modules.excel_export import export_workbook
+        rows = export_workbook(path, storage=storage)["rows"]
+    else:
+        sales = storage.load_sales()
+        with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
+            sales.to_excel(writer, sheet_name="Sales", index=False)
+            storage.load_expenses().to_excel(writer, sheet_name="Expenses", index=False)
+        rows = len(sales) + 1
+    results.put((rows, time.perf_counter() - t, peak_rss_mb()))
+
+
+def in_child(target, *args):
+    child = multiprocessing.Process(target=target, args=args)
+    child.start()
+    child.join()
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+    print(f"{'rows':>10} | {'mode':>6} | {'seconds':>8} | {'rows/s':>8} | {'peak RSS MB':>11} | {'file MB':>7}")
+    base = tempfile.mkdtemp(prefix="fl_bench_xlsx_")
+    for n in [s for s in SIZES if s <= max_rows]:
+        os.environ["FAIRANDLOVELY_HOME"] = os.path.join(base, str(n))
+        in_child(make_ledger, n)
+        for mode in ("stream", "pandas"):
+            if mode == "pandas" and n > PANDAS_MAX_ROWS:
+                continue
+            path = os.path.join(base, f"{mode}_{n}.xlsx")
+            results = multiprocessing.Queue()
+            in_child(run_export, mode, path, results)
+            rows, seconds, rss = results.get()
+            print(f"{n:>10,} | {mode:>6} | {seconds:>8.1f} | {rows / seconds:>8,.0f} | {rss:>11.0f} | "
+                  f"{os.path.getsize(path) / 2**20:>7.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        os.environ["FAIRANDLOVELY_STORAGE"] = sys.argv[2]
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
@@ -0,0 +1,72 @@
+"""GST return summary over a financial year: one vectorised pass vs. a pandas groupby.
+
+  groupby -- per-slab groupby with sum + nunique over the loaded frame
+  single  -- reports._gst_frame: one bincount pass keyed on slab (or day x slab)
+
+Each line item gets a random rate from the standard slabs; lines per year vary by run.
+Run from the repo root:  python benchmarks/bench_gst.py [lines_per_year]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+SIZES = [100_000, 1_000_000, 5_000_000]
+REPEATS = 5
+
+
+def make_year(n_rows):
+    from modules.schema import parse_sales
+    rng = np.random.default_rng(0)
+    price = rng.choice(np.arange(100, 5000, 50), n_rows).astype(float)
+    gst = rng.choice([0.0, 5.0, 12.0, 18.0, 28.0], n_rows, p=[0.05, 0.15, 0.2, 0.5, 0.1])
+    return parse_sales(pd.DataFrame({
+        "invoice_no": np.arange(n_rows) // 3 + 1001,
+        "date": pd.date_range("2024-04-01", "2025-03-31 23:59", periods=n_rows),
+        "customer": "Customer",
+        "service": "Facial",
+        "price": price,
+        "gst": gst,
+        "total": price * (1 + gst / 100),
+    }))
+
+
+def groupby(df, by_day):
+    keys = [df["date"].dt.floor("D"), df["gst"]] if by_day else [df["gst"]]
+    frame = df.assign(tax=df["total"] - df["price"])
+    return frame.groupby(keys, observed=True).agg(
+        taxable_value=("price", "sum"), tax=("tax", "sum"), total=("total", "sum"),
+        invoices=("invoice_no", "nunique"), lines=("price", "size"))
+
+
+def timed(fn, *args):
+    best = float("inf")
+    for _ in range(REPEATS):
+        t = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t)
+    return best * 1000, out
+
+
+def main():
+    from modules.reports import _gst_frame
+
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+    print(f"{'lines/year':>12} | {'view':>6} | {'groupby ms':>10} | {'single ms':>9} | {'rows':>5}")
+    for n in [s for s in SIZES if s <= max_rows]:
+        df = make_year(n)
+        for by_day in (False, True):
+            group_ms, expected = timed(groupby, df, by_day)
+            single_ms, out = timed(_gst_frame, df, by_day)
+            used = out[out["lines"] > 0]
+            assert np.allclose(used["tax"].to_numpy(), expected["tax"].to_numpy())
+            assert (used["invoices"].to_numpy() == expected["invoices"].to_numpy()).all()
+            print(f"{n:>12,} | {'day' if by_day else 'slab':>6} | {group_ms:>10.1f} | {single_ms:>9.1f} | {len(out):>5,}")
+
+
+if __name__ == "__main__":
+    main()
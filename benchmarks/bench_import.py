@@ -0,0 +1,77 @@
+"""Bulk import throughput and peak memory for a large POS export.
+
+Generates a foreign-format sales export (different headers, dd/mm/yyyy dates, currency
+strings, a few bad rows) and streams it in with modules.importer. Peak RSS should stay
+flat as the file grows, since only one chunk is in memory at a time.
+Run from the repo root:  python benchmarks/bench_import.py [rows] [csv|sqlite]
+(10M rows needs ~1 GB of disk for the source file.)
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROWS = 1_000_000
+WRITE_CHUNK = 500_000
+
+
+def make_export(path, n_rows):
+    rng = np.random.default_rng(0)
+    for offset in range(0, n_rows, WRITE_CHUNK):
+        n = min(WRITE_CHUNK, n_rows - offset)
+        idx = np.arange(offset, offset + n)
+        price = rng.choice(np.arange(100, 5000, 50), n).astype(float)
+        dates = pd.Timestamp("2015-01-01") + pd.to_timedelta(idx * 30, unit="s")
+        df = pd.DataFrame({
+            "Bill No": idx // 3 + 1,
+            "Bill Date": dates.strftime("%d/%m/%Y %H:%M"),
+            "Customer Name": np.char.add("Customer ", rng.integers(0, 5000, n).astype(str)),
+            "Item": np.char.add("Service ", rng.integers(0, 30, n).astype(str)),
+            "Rate": np.char.add("Rs. ", price.astype(str)),
+            "GST %": 18,
+        })
+        df.loc[df.index % 10_007 == 0, "Bill Date"] = "not a date"
+        df.to_csv(path, mode="a", header=offset == 0, index=False)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    work = tempfile.mkdtemp(prefix="fl_bench_import_")
+    source = os.path.join(work, "pos_export.csv")
+    # Generate in a child process so its memory does not count towards the import's peak RSS
+    child = multiprocessing.Process(target=make_export, args=(source, n_rows))
+    child.start()
+    child.join()
+    print(f"source: {n_rows:,} rows, {os.path.getsize(source) / 2**20:.0f} MB")
+
+    from modules.importer import import_sales
+    from modules.storage import get_storage
+
+    storage = get_storage()
+    start = time.perf_counter()
+    report = import_sales(source, storage=storage, rejects_file=os.path.join(work, "rejected.csv"))
+    elapsed = time.perf_counter() - start
+    print(f"backend={storage.name} imported={report['imported']:,} rejected={report['rejected']:,} "
+          f"invoices={report['invoices']:,}")
+    print(f"{elapsed:.1f}s -> {report['rows_per_s']:,.0f} rows/s, peak RSS {peak_rss_mb():.0f} MB")
+    assert report["imported"] + report["rejected"] == n_rows
+    assert report["invoices"] == len(range(0, n_rows, 3)), "bills must keep one invoice number across chunks"
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("FAIRANDLOVELY_HOME", tempfile.mkdtemp(prefix="fl_bench_"))
+    if len(sys.argv) > 2:
+        os.environ["FAIRANDLOVELY_STORAGE"] = sys.argv[2]
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
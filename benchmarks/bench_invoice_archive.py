@@ -0,0 +1,70 @@
+"""Invoice folder size, listing and lookup, loose PDFs vs. the monthly archive.
+
+N invoice PDFs (copies of one rendered invoice) are spread over two years of mtimes in a fresh
+invoice folder, then rolled into Invoices_<YYYY-MM>.zip containers by invoice_archive:
+
+  list     -- os.listdir of the invoice folder
+  read     -- read_invoice_pdf of random invoices (loose file vs. index lookup + one seek)
+  remove   -- dropping one archived invoice (rewrites its month's container)
+
+Run from the repo root:  python benchmarks/bench_invoice_archive.py [max_invoices]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+SIZES = [10_000, 50_000]
+READS = 1_000
+MONTHS = 24
+
+
+def timed_ms(fn, repeat=1):
+    t = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t) * 1000 / repeat
+
+
+def main():
+    from modules import invoice_archive
+    from modules.invoice import invoice_path, read_invoice_pdf, render_invoice_pdf
+
+    max_invoices = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+    pdf = render_invoice_pdf(1, "Bench Customer", [["Facial", "₹1000.00", "18%", "₹1180.00"]], 1180.0)
+    base = tempfile.mkdtemp(prefix="fl_bench_archive_")
+    rng = random.Random(0)
+    now = time.time()
+    print(f"{'invoices':>9} | {'files':>7} | {'list ms':>8} | {'read ms':>8} | {'archive s':>9} | "
+          f"{'files':>5} | {'list ms':>8} | {'read ms':>8} | {'remove ms':>9}")
+    for n in [s for s in SIZES if s <= max_invoices]:
+        folder = os.path.join(base, str(n))
+        os.makedirs(folder)
+        for invoice_no in range(1, n + 1):
+            path = invoice_path(invoice_no, folder)
+            with open(path, "wb") as f:
+                f.write(pdf)
+            # Oldest first, all older than the archive threshold
+            age = (invoice_archive.ARCHIVE_AFTER_DAYS + 1 + (n - invoice_no) * MONTHS * 30 / n) * 86400
+            os.utime(path, (now - age, now - age))
+        sample = [rng.randint(1, n) for _ in range(READS)]
+
+        files_before = len(os.listdir(folder))
+        list_before = timed_ms(lambda: os.listdir(folder), 5)
+        read_before = timed_ms(lambda: [read_invoice_pdf(i, folder) for i in sample]) / READS
+
+        report = invoice_archive.archive_invoices(folder=folder)
+
+        files_after = len(os.listdir(folder)) + len(os.listdir(invoice_archive.archive_folder(folder)))
+        list_after = timed_ms(lambda: os.listdir(folder), 5)
+        read_after = timed_ms(lambda: [read_invoice_pdf(i, folder) for i in sample]) / READS
+        remove = timed_ms(lambda: invoice_archive.remove(sample[0], folder))
+        print(f"{n:>9,} | {files_before:>7,} | {list_before:>8.2f} | {read_before:>8.3f} | {report['seconds']:>9.1f} | "
+              f"{files_after:>5,} | {list_after:>8.2f} | {read_after:>8.3f} | {remove:>9.1f}")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("FAIRANDLOVELY_HOME", tempfile.mkdtemp(prefix="fl_bench_"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
@@ -0,0 +1,64 @@
+"""Batch invoice regeneration throughput vs. worker processes.
+
+  workers=N -- invoice_batch.regenerate_invoices(force=True) on a pool of N processes
+  skip      -- a second pass with every PDF already current (only the ledger scan and the checks)
+
+The ledger holds INVOICES invoices of 1-5 lines each. Rendering is CPU-bound, so throughput
+should scale with physical cores up to the pool size.
+Run from the repo root:  python benchmarks/bench_invoice_batch.py [invoices] [csv|sqlite]
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FAIRANDLOVELY_HOME", tempfile.mkdtemp(prefix="fl_bench_"))
+if len(sys.argv) > 2:
+    os.environ["FAIRANDLOVELY_STORAGE"] = sys.argv[2]
+
+import numpy as np
+import pandas as pd
+
+from modules.invoice_batch import regenerate_invoices
+from modules.schema import parse_sales
+from modules.storage import get_storage
+
+INVOICES = 10_000
+
+
+def make_ledger(n_invoices):
+    rng = np.random.default_rng(0)
+    lines = rng.integers(1, 6, n_invoices)
+    invoice = np.repeat(np.arange(n_invoices) + 1001, lines)
+    n = len(invoice)
+    price = rng.choice(np.arange(100, 5000, 50), n).astype(float)
+    gst = rng.choice([5.0, 12.0, 18.0], n)
+    get_storage().append_sales_frame(parse_sales(pd.DataFrame({
+        "invoice_no": invoice,
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta((invoice - 1001) * 600, unit="s"),
+        "customer": np.char.add("Customer ", (invoice % 2_000).astype(str)),
+        "service": np.char.add("Service ", rng.integers(0, 30, n).astype(str)),
+        "price": price,
+        "gst": gst,
+        "total": price * (1 + gst / 100),
+    })))
+    return n
+
+
+def main():
+    n_invoices = int(sys.argv[1]) if len(sys.argv) > 1 else INVOICES
+    lines = make_ledger(n_invoices)
+    cores = os.cpu_count() or 1
+    print(f"{n_invoices:,} invoices, {lines:,} lines, {cores} CPU(s), {get_storage().name} storage")
+    print(f"{'pass':>10} | {'seconds':>8} | {'rendered':>8} | {'skipped':>8} | {'invoices/s':>10}")
+    for workers in sorted({1, 2, 4, cores}):
+        report = regenerate_invoices(force=True, workers=workers)
+        print(f"{'workers=' + str(workers):>10} | {report['seconds']:>8.1f} | {report['rendered']:>8,} | "
+              f"{report['skipped']:>8,} | {report['invoices_per_s']:>10.1f}")
+    report = regenerate_invoices(workers=cores)
+    print(f"{'skip':>10} | {report['seconds']:>8.1f} | {report['rendered']:>8,} | {report['skipped']:>8,} | "
+          f"{report['invoices'] / report['seconds']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Checkout latency with the invoice PDF rendered inline vs. queued for the background worker.
+
+  inline -- append_sales + generate_invoice_pdf, as checkout used to do
+  queued -- append_sales + render_queue.enqueue; the worker thread renders meanwhile
+
+  ledger -- append_sales alone: the floor for either mode
+
+CHECKOUTS sales, either back to back or GAP_SECONDS apart (the next customer stepping up);
+'all PDFs' is when the last one is on disk. Back to back on a single core, the render thread
+competes with checkout for the interpreter, so the gain shows once there is any gap at all.
+Run from the repo root:  python benchmarks/bench_render_queue.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FAIRANDLOVELY_HOME", tempfile.mkdtemp(prefix="fl_bench_"))
+
+from modules import render_queue
+from modules.invoice import generate_invoice_pdf
+from modules.storage import get_storage
+
+CHECKOUTS = 30
+LINES = 3
+GAP_SECONDS = 0.1
+
+
+def sale(invoice_no):
+    date = "2024-06-01 12:00:00"
+    rows = [{"invoice_no": invoice_no, "date": date, "customer": "Priya", "service": f"Service {i}",
+             "price": 500.0, "gst": 18.0, "total": 590.0} for i in range(LINES)]
+    items = [[r["service"], "₹500.00", "18%", "₹590.00"] for r in rows]
+    return rows, items, 590.0 * LINES, date
+
+
+def rush(first, checkout, gap):
+    storage = get_storage()
+    waits = []
+    start = time.perf_counter()
+    for invoice_no in range(first, first + CHECKOUTS):
+        time.sleep(gap)
+        rows, items, total, date = sale(invoice_no)
+        t = time.perf_counter()
+        storage.append_sales(rows)
+        checkout(invoice_no, items, total, date)
+        waits.append(time.perf_counter() - t)
+    for invoice_no in range(first, first + CHECKOUTS):
+        render_queue.wait(invoice_no)
+    done = time.perf_counter() - start
+    waits.sort()
+    return sum(waits) / len(waits) * 1000, waits[int(len(waits) * 0.95)] * 1000, done
+
+
+def main():
+    render_queue.start()
+    modes = [
+        ("inline", lambda n, items, total, date: generate_invoice_pdf(n, "Priya", items, total)),
+        ("queued", lambda n, items, total, date: render_queue.enqueue(n, "Priya", items, total, date=date)),
+        ("ledger", lambda n, items, total, date: None),
+    ]
+    print(f"{'mode':>7} | {'gap s':>5} | {'checkout ms (mean)':>18} | {'p95 ms':>7} | {'all PDFs s':>10}")
+    first = 1_000
+    for gap in (0.0, GAP_SECONDS):
+        for name, checkout in modes:
+            rush(first, checkout, 0.0)  # warm-up
+            mean, p95, done = rush(first + CHECKOUTS, checkout, gap)
+            first += 2 * CHECKOUTS
+            print(f"{name:>7} | {gap:>5} | {mean:>18.1f} | {p95:>7.1f} | {done:>10.2f}")
+    render_queue.stop()
+
+
+if __name__ == "__main__":
+    main()
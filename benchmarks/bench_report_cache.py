@@ -0,0 +1,87 @@
+"""Report PDF download latency with the report cache: first render, repeat, and after a sale.
+
+  miss     -- nothing cached: the PDF is rendered into the cache
+  hit      -- same report, same ledger version: the cached file is read back
+  stale    -- one sale appended since: the ledger version changed, so it renders again
+
+Run from the repo root:  python benchmarks/bench_report_cache.py [rows] [csv|sqlite]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROWS = 20_000
+REPEATS = 5
+
+
+def make_ledger(storage, n_rows):
+    from modules import rollups
+    from modules.schema import parse_sales
+    rng = np.random.default_rng(0)
+    idx = np.arange(n_rows)
+    price = rng.choice(np.arange(100, 5000, 50), n_rows).astype(float)
+    storage.append_sales_frame(parse_sales(pd.DataFrame({
+        "invoice_no": idx // 3 + 1001,
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(idx * 60, unit="s"),
+        "customer": np.char.add("Customer ", rng.integers(0, 2_000, n_rows).astype(str)),
+        "service": np.char.add("Service ", rng.integers(0, 30, n_rows).astype(str)),
+        "price": price,
+        "gst": 18.0,
+        "total": price * 1.18,
+    })))
+    storage.add_expense("2024-01-15", "Rent", 25_000.0)
+    rollups.rebuild(storage)
+
+
+def timed(fn):
+    t = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t) * 1000
+
+
+def main():
+    from modules import report_cache, reports
+    from modules.reports_pdf import generate_balance_sheet_pdf, generate_financial_report_pdf
+    from modules.storage import get_storage
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    storage = get_storage()
+    make_ledger(storage, rows)
+    start, end = "2024-01-01", "2024-12-31"
+
+    def financial():
+        summary_data = reports.summary_rows(reports.summary(start, end))
+        return report_cache.read_report(
+            "financial", [start, end, False, summary_data],
+            lambda f: generate_financial_report_pdf(f, start, end, summary_data, reports.sales_report_rows(start, end)))
+
+    def balance_sheet():
+        sheet = reports.balance_sheet()
+        values = [sheet["cash_balance"], sheet["gst_payable"], sheet["retained_earnings"]]
+        return report_cache.read_report("balance-sheet", values,
+                                        lambda f: generate_balance_sheet_pdf(f, *values))
+
+    print(f"{rows:,} sales rows, {storage.name} ledger")
+    print(f"{'report':>14} | {'miss ms':>9} | {'hit ms':>8} | {'stale ms':>9}")
+    invoice_no = int(storage.last_invoice_no()) + 1
+    for name, fn in (("financial", financial), ("balance sheet", balance_sheet)):
+        report_cache.clear()
+        miss = timed(fn)
+        hit = min(timed(fn) for _ in range(REPEATS))
+        storage.append_sales([{"invoice_no": invoice_no, "date": "2024-06-01 10:00:00", "customer": "Bench",
+                               "service": "Facial", "price": 100.0, "gst": 18.0, "total": 118.0}])
+        invoice_no += 1
+        stale = timed(fn)
+        print(f"{name:>14} | {miss:>9.1f} | {hit:>8.2f} | {stale:>9.1f}")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("FAIRANDLOVELY_HOME", tempfile.mkdtemp(prefix="fl_bench_"))
+    if len(sys.argv) > 2:
+        os.environ["FAIRANDLOVELY_STORAGE"] = sys.argv[2]
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
@@ -0,0 +1,129 @@
+"""Financial report PDF throughput and peak memory, streamed pages vs. one big table.
+
+  stream  -- reports.sales_report_rows from the ledger into page-sized repeat-header LongTables
+  daily   -- the summarised-by-day variant (reports.daily_report_rows, from the daily rollups)
+  table   -- the previous approach: load the whole range, format every row, one platypus Table
+
+Each report runs in a fresh process so its peak RSS is its own. The ledger is written first,
+in another child process. Peak RSS for 'stream' should stay flat as the row count grows.
+Run from the repo root:  python benchmarks/bench_report_pdf.py [max_rows] [csv|sqlite]
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+SIZES = [10_000, 100_000, 1_000_000]
+TABLE_MAX_ROWS = 10_000  # splitting one table page by page is quadratic; beyond this it takes many minutes
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def make_ledger(n_rows):
+    from modules.schema import parse_sales
+    from modules.storage import get_storage
+    rng = np.random.default_rng(0)
+    storage = get_storage()
+    step = 500_000
+    for offset in range(0, n_rows, step):
+        n = min(step, n_rows - offset)
+        idx = np.arange(offset, offset + n)
+        price = rng.choice(np.arange(100, 5000, 50), n).astype(float)
+        storage.append_sales_frame(parse_sales(pd.DataFrame({
+            "invoice_no": idx // 3 + 1001,
+            "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(idx * 60, unit="s"),
+            "customer": np.char.add("Customer ", rng.integers(0, 20_000, n).astype(str)),
+            "service": np.char.add("Service ", rng.integers(0, 30, n).astype(str)),
+            "price": price,
+            "gst": 18.0,
+            "total": price * 1.18,
+        })))
+    storage.add_expense("2020-01-15", "Rent", 25_000.0)
+    # The running app keeps the daily rollups current; the summary and the by-day variant read them
+    from modules import rollups
+    rollups.rebuild(storage)
+
+
+def table_report(path, start, end, summary_data, storage):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+    styles = getSampleStyleSheet()
+    sales = storage.load_sales(start, end)
+    rows = [["Invoice #", "Date", "Customer", "Item", "Total"]]
+    for inv, ts, cust, service, amount in zip(sales["invoice_no"], sales["date"], sales["customer"],
+                                              sales["service"], sales["total"]):
+        rows.append([inv, str(ts), cust, service, f"₹{amount:.2f}"])
+    summary_table = Table([["Metric", "Value"]] + summary_data, colWidths=[3*72, 1.5*72])
+    sales_table = Table(rows, colWidths=[0.8*72, 1.2*72, 1.2*72, 1.2*72, 0.8*72])
+    sales_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.whitesmoke),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ]))
+    SimpleDocTemplate(path, pagesize=A4).build([
+        Paragraph("<b>Fairandlovely - FINANCIAL REPORT</b>", styles['Title']), Spacer(1, 12),
+        summary_table, Spacer(1, 24),
+        Paragraph("<b>Detailed Sales History</b>", styles['Heading2']), Spacer(1, 6), sales_table])
+
+
+def run_report(mode, path, results):
+    from modules import reports
+    from modules.reports_pdf import generate_financial_report_pdf
+    from modules.storage import get_storage
+    storage = get_storage()
+    t = time.perf_counter()
+    summary_data = reports.summary_rows(reports.summary(storage=storage))
+    if mode == "table":
+        table_report(path, None, None, summary_data, storage)
+    elif mode == "daily":
+        generate_financial_report_pdf(path, "all", "all", summary_data,
+                                      reports.daily_report_rows(storage=storage), by_day=True)
+    else:
+        generate_financial_report_pdf(path, "all", "all", summary_data, reports.sales_report_rows(storage=storage))
+    seconds = time.perf_counter() - t
+    with open(path, "rb") as f:
+        pages = f.read().count(b"/Type /Page\n")
+    results.put((pages, seconds, peak_rss_mb()))
+
+
+def in_child(target, *args):
+    child = multiprocessing.Process(target=target, args=args)
+    child.start()
+    child.join()
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+    print(f"{'rows':>10} | {'mode':>6} | {'pages':>7} | {'seconds':>8} | {'pages/s':>8} | {'peak RSS MB':>11} | {'file MB':>7}")
+    base = tempfile.mkdtemp(prefix="fl_bench_report_")
+    for n in [s for s in SIZES if s <= max_rows]:
+        os.environ["FAIRANDLOVELY_HOME"] = os.path.join(base, str(n))
+        in_child(make_ledger, n)
+        for mode in ("stream", "daily", "table"):
+            if mode == "table" and n > TABLE_MAX_ROWS:
+                continue
+            path = os.path.join(base, f"{mode}_{n}.pdf")
+            results = multiprocessing.Queue()
+            in_child(run_report, mode, path, results)
+            pages, seconds, rss = results.get()
+            print(f"{n:>10,} | {mode:>6} | {pages:>7,} | {seconds:>8.1f} | {pages / seconds:>8,.1f} | {rss:>11.0f} | "
+                  f"{os.path.getsize(path) / 2**20:>7.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        os.environ["FAIRANDLOVELY_STORAGE"] = sys.argv[2]
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
@@ -0,0 +1,82 @@
+"""Sales history table: one page from storage.sales_page vs. materialising the whole range.
+
+  full   -- the old path: load the range and turn every row into a table row (iterrows)
+  page   -- storage.sales_page: shallow and deep pages of 100 rows, by date and by customer
+            (the first request pays for loading the range, the first deep page for sorting it;
+            later pages reuse both)
+
+The range is one year of a ledger with ~3 lines per invoice.
+Run from the repo root:  python benchmarks/bench_sales_page.py [rows] [csv|sqlite]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROWS = 1_000_000
+PAGE = 100
+
+
+def make_sales(n_rows):
+    from modules.schema import parse_sales
+    rng = np.random.default_rng(0)
+    return parse_sales(pd.DataFrame({
+        "invoice_no": np.arange(n_rows) // 3 + 1001,
+        "date": pd.date_range("2024-04-01", "2025-03-31 23:59", periods=n_rows),
+        "customer": np.char.add("Customer ", rng.integers(0, 20_000, n_rows).astype(str)),
+        "service": np.char.add("Service ", rng.integers(0, 30, n_rows).astype(str)),
+        "price": 500.0,
+        "gst": 18.0,
+        "total": 590.0,
+    }))
+
+
+def timed(fn):
+    t = time.perf_counter()
+    out = fn()
+    return (time.perf_counter() - t) * 1000, out
+
+
+def legacy(storage, start, end):
+    rows = []
+    for _, row in storage.load_sales(start, end).iterrows():
+        rows.append((row["invoice_no"], row["date"], row["customer"], row["service"], f"₹{row['total']:.2f}"))
+    return rows
+
+
+def main():
+    from modules.storage import get_storage
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    storage = get_storage()
+    storage.append_sales_frame(make_sales(n_rows))
+    start, end = "2024-04-01", "2025-03-31"
+    storage.load_sales(start, end)  # warm the table cache, as the running app would be
+
+    print(f"backend={storage.name} rows={n_rows:,}")
+    print(f"{'query':<36} | {'ms':>9}")
+    for label, fn in [
+        ("page 1 by date (newest first)", lambda: storage.sales_page(start, end, 0, PAGE, descending=True)),
+        ("page 5,000 by date", lambda: storage.sales_page(start, end, 5000 * PAGE, PAGE)),
+        ("page 1 by customer", lambda: storage.sales_page(start, end, 0, PAGE, sort_by="customer")),
+        ("page 2 by customer", lambda: storage.sales_page(start, end, PAGE, PAGE, sort_by="customer")),
+        ("page 5,000 by customer (first deep)", lambda: storage.sales_page(start, end, 5000 * PAGE, PAGE,
+                                                                          sort_by="customer")),
+        ("page 5,001 by customer", lambda: storage.sales_page(start, end, 5001 * PAGE, PAGE, sort_by="customer")),
+    ]:
+        ms, (page, total) = timed(fn)
+        assert total == n_rows and len(page) == PAGE
+        print(f"{label:<36} | {ms:>9.1f}")
+    ms, rows = timed(lambda: legacy(storage, start, end))
+    print(f"{'full range via iterrows':<36} | {ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("FAIRANDLOVELY_HOME", tempfile.mkdtemp(prefix="fl_bench_"))
+    if len(sys.argv) > 2:
+        os.environ["FAIRANDLOVELY_STORAGE"] = sys.argv[2]
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
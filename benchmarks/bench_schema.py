@@ -0,0 +1,74 @@
+"""Memory footprint and load time of the sales table: default dtypes vs. the compact schema.
+
+The default read leaves customer/service/date as Python-object strings and every number
+as 64-bit; modules.schema stores names as categoricals, invoice_no as int32, the GST rate
+as float32 and dates as datetime64.
+Run from the repo root:  python benchmarks/bench_schema.py [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROWS = 1_200_000
+CUSTOMERS = 5_000
+SERVICES = 30
+GST_RATES = [0.0, 5.0, 12.0, 18.0, 28.0]
+
+
+def make_sales(path, n_rows):
+    rng = np.random.default_rng(0)
+    price = rng.choice(np.arange(100, 5000, 50), n_rows).astype(float)
+    gst = rng.choice(GST_RATES, n_rows)
+    pd.DataFrame({
+        "invoice_no": np.arange(n_rows) // 3 + 1001,
+        "date": pd.date_range("2019-01-01", periods=n_rows, freq="2min").strftime("%Y-%m-%d %H:%M:%S"),
+        "customer": np.array([f"Customer {i}" for i in range(CUSTOMERS)])[rng.integers(0, CUSTOMERS, n_rows)],
+        "service": np.array([f"Service {i}" for i in range(SERVICES)])[rng.integers(0, SERVICES, n_rows)],
+        "price": price,
+        "gst": gst,
+        "total": price * (1 + gst / 100),
+    }).to_csv(path, index=False)
+
+
+def load_default(path):
+    df = pd.read_csv(path)
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def measure(label, load, path):
+    start = time.perf_counter()
+    df = load(path)
+    elapsed = time.perf_counter() - start
+    mb = df.memory_usage(deep=True).sum() / 2**20
+    print(f"{label:>16} | {elapsed:>8.2f} | {mb:>9.1f}")
+    return df, mb
+
+
+def main():
+    from modules.schema import read_sales_csv
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    path = os.path.join(tempfile.mkdtemp(prefix="fl_bench_schema_"), "sales.csv")
+    make_sales(path, n_rows)
+    print(f"{n_rows:,} rows, {os.path.getsize(path) / 2**20:.1f} MB on disk")
+    print(f"{'schema':>16} | {'load s':>8} | {'memory MB':>9}")
+    default, default_mb = measure("default dtypes", load_default, path)
+    compact, compact_mb = measure("compact schema", read_sales_csv, path)
+    print(f"memory saved: {1 - compact_mb / default_mb:.0%}")
+
+    # The narrower types must not change the numbers reports are built from
+    for col in ("price", "total"):
+        assert np.isclose(default[col].sum(), compact[col].sum()), col
+    assert (default["gst"].to_numpy() == compact["gst"].to_numpy().astype(float)).all()
+    print(compact.dtypes.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""How long the desktop app's event loop stalls during a Reports refresh.
+
+A stand-in for Tk's event loop ticks every 10 ms (as redraws and key presses would) while the
+Reports tab refreshes over a year of sales:
+
+  inline   -- the old path: summary, trend and first sales window computed inside the event loop
+  workers  -- modules.workers.TaskRunner: computed on a worker, painted from an after() callback
+
+The longest gap between ticks is how long the window was frozen. Timings are cold (empty memo).
+Run from the repo root:  python benchmarks/bench_ui_latency.py [rows] [csv|sqlite]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROWS = 1_000_000
+TICK_MS = 10
+
+
+class EventLoop:
+    """Just enough of Tk for TaskRunner: after() and a mainloop that records its longest stall."""
+
+    def __init__(self):
+        self.jobs = []
+        self.longest = 0.0
+
+    def after(self, ms, fn):
+        self.jobs.append((time.perf_counter() + ms / 1000, fn))
+
+    def report_callback_exception(self, kind, exc, tb):
+        raise exc
+
+    def run(self, until):
+        last = time.perf_counter()
+        while not until():
+            self.jobs.sort(key=lambda job: job[0])
+            if self.jobs and self.jobs[0][0] <= time.perf_counter():
+                self.jobs.pop(0)[1]()
+            else:
+                time.sleep(TICK_MS / 1000)
+            now = time.perf_counter()
+            self.longest = max(self.longest, now - last)
+            last = now
+
+
+def make_sales(n_rows):
+    from modules.schema import parse_sales
+    rng = np.random.default_rng(0)
+    return parse_sales(pd.DataFrame({
+        "invoice_no": np.arange(n_rows) // 3 + 1001,
+        "date": pd.date_range("2024-04-01", "2025-03-31 23:59", periods=n_rows),
+        "customer": np.char.add("Customer ", rng.integers(0, 20_000, n_rows).astype(str)),
+        "service": np.char.add("Service ", rng.integers(0, 30, n_rows).astype(str)),
+        "price": 500.0,
+        "gst": 18.0,
+        "total": 590.0,
+    }))
+
+
+def refresh(storage, start, end):
+    # The same work refresh_stats does: summary, trend and the first window of sales rows
+    from modules import reports
+    summary = reports.summary(start, end)
+    trend = reports.timeseries(start, end, bucket="week")
+    return summary, trend, storage.sales_page(start, end, 0, 200, descending=True)
+
+
+def main():
+    from modules import cache, reports, rollups, workers
+    from modules.storage import get_storage
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    storage = get_storage()
+    storage.append_sales_frame(make_sales(n_rows))
+    start, end = "2024-04-01", "2025-03-31"
+    print(f"backend={storage.name} rows={n_rows:,}")
+    print(f"{'mode':<8} | {'wall ms':>8} | {'longest stall ms':>16}")
+
+    for mode in ("inline", "workers"):
+        reports.clear_cache()
+        cache.invalidate()
+        storage._page_cache = None
+        rollups.rebuild(storage)
+        loop = EventLoop()
+        done = []
+        t = time.perf_counter()
+        if mode == "inline":
+            loop.after(0, lambda: done.append(refresh(storage, start, end)))
+        else:
+            runner = workers.TaskRunner(loop)
+            runner.submit("stats", refresh, storage, start, end, on_done=done.append)
+        loop.run(lambda: done)
+        print(f"{mode:<8} | {(time.perf_counter() - t) * 1000:>8.0f} | {loop.longest * 1000:>16.0f}")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("FAIRANDLOVELY_HOME", tempfile.mkdtemp(prefix="fl_bench_"))
+    if len(sys.argv) > 2:
+        os.environ["FAIRANDLOVELY_STORAGE"] = sys.argv[2]
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
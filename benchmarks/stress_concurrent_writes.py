@@ -0,0 +1,102 @@
+"""Concurrent writer stress test for the storage layer.
+
+Spawns many processes that each check out invoices (sequence + ledger append) while
+also deleting some of their own invoices and adding catalog items, then verifies that
+no line item was lost or duplicated and reports write throughput under contention.
+Run from the repo root:  python benchmarks/stress_concurrent_writes.py [processes] [checkouts]
+"""
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FAIRANDLOVELY_HOME", tempfile.mkdtemp(prefix="fl_stress_"))
+
+LINES_PER_INVOICE = 3
+DELETE_EVERY = 5
+
+
+def writer(args):
+    worker_id, checkouts = args
+    from modules.sequence import next_invoice_no
+    from modules.storage import get_storage
+
+    storage = get_storage()
+    kept, deleted = [], []
+    for i in range(checkouts):
+        inv = next_invoice_no()
+        storage.append_sales([{
+            "invoice_no": inv, "date": "2024-06-01 12:00:00", "customer": f"W{worker_id}",
+            "service": f"S{n}", "price": 100.0, "gst": 18.0, "total": 118.0,
+        } for n in range(LINES_PER_INVOICE)])
+        if i % DELETE_EVERY == DELETE_EVERY - 1:
+            storage.delete_invoice(inv)
+            deleted.append(inv)
+        else:
+            kept.append(inv)
+        if i % 10 == 0:
+            storage.add_product(f"W{worker_id}-item{i}", 50.0, 5.0)
+    return kept, deleted, len(range(0, checkouts, 10))
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    checkouts = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    import json
+    from modules import customers, rollups
+    from modules.paths import ROLLUP_FILE
+    from modules.storage import get_storage
+    storage = get_storage()
+    rollups.totals(storage)  # initialise the rollups so writers maintain them incrementally
+    customers.lookup("nobody")  # ... and the customer index
+    print(f"backend={storage.name}  processes={processes}  checkouts/process={checkouts}")
+
+    start = time.perf_counter()
+    with Pool(processes) as pool:
+        results = pool.map(writer, [(w, checkouts) for w in range(processes)])
+    elapsed = time.perf_counter() - start
+
+    kept = sorted(inv for k, _, _ in results for inv in k)
+    deleted = {inv for _, d, _ in results for inv in d}
+    products_added = sum(p for _, _, p in results)
+
+    sales = storage.load_sales()
+    counts = sales.groupby("invoice_no").size()
+    missing = [inv for inv in kept if counts.get(inv, 0) != LINES_PER_INVOICE]
+    resurrected = deleted & set(counts.index)
+    all_invoices = kept + sorted(deleted)
+
+    ok = True
+    ok &= len(set(all_invoices)) == len(all_invoices)
+    ok &= not missing and not resurrected
+    ok &= len(sales) == len(kept) * LINES_PER_INVOICE
+    ok &= len(storage.load_products()) == products_added
+
+    # Daily rollups must have been kept current by the writers, not rebuilt afterwards
+    with open(ROLLUP_FILE, "r", encoding="utf-8") as f:
+        rollup_fresh = json.load(f)["versions"]["sales"] == json.dumps(storage.table_version("sales"), default=str)
+    rollup_lines = rollups.totals(storage)["lines"]
+    ok &= rollup_fresh and rollup_lines == len(sales)
+
+    # Same for the customer index: one visit per surviving invoice
+    with customers._connect() as conn:
+        index_fresh = customers._version(conn) == customers._token(storage.table_version("sales"))
+        (visits,) = conn.execute("SELECT COALESCE(SUM(visits), 0) FROM customers").fetchone()
+    ok &= index_fresh and visits == len(kept)
+
+    writes = processes * checkouts + len(deleted) + products_added
+    print(f"line items: {len(sales)} (expected {len(kept) * LINES_PER_INVOICE})")
+    print(f"invoices missing/incomplete: {len(missing)}  deleted-but-present: {len(resurrected)}")
+    print(f"products: {len(storage.load_products())} (expected {products_added})")
+    print(f"rollups incrementally current: {rollup_fresh}  rollup line count: {rollup_lines}")
+    print(f"customer index incrementally current: {index_fresh}  visits: {visits} (expected {len(kept)})")
+    print(f"{writes} writes in {elapsed:.2f}s -> {writes / elapsed:,.0f} writes/s under contention")
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
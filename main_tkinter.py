@@ -1,27 +1,17 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from tkinter import messagebox, filedialog
-import pandas as pd
+from tkinter import messagebox, filedialog, Canvas
 import os
+import shutil
 from datetime import datetime
 
-# PDF
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-
-from modules.paths import PRODUCTS_FILE, SALES_FILE, EXPENSES_FILE, INVOICE_FOLDER
+from modules.storage import get_storage
+from modules import reports, customers, workers, render_queue, report_cache, invoice_archive
+from modules.invoice import delete_invoice, invoice_file, invoice_item, void_invoice
+from modules.sequence import next_invoice_no
 
 # ================== SAFE FILE CREATION ==================
-if not os.path.exists(PRODUCTS_FILE) or os.path.getsize(PRODUCTS_FILE) == 0:
-    pd.DataFrame(columns=["id","name","price","gst"]).to_csv(PRODUCTS_FILE, index=False)
-
-if not os.path.exists(SALES_FILE) or os.path.getsize(SALES_FILE) == 0:
-    pd.DataFrame(columns=["invoice_no","date","customer","service","price","gst","total"]).to_csv(SALES_FILE, index=False)
-
-if not os.path.exists(EXPENSES_FILE) or os.path.getsize(EXPENSES_FILE) == 0:
-    pd.DataFrame(columns=["date","description","amount"]).to_csv(EXPENSES_FILE, index=False)
+storage = get_storage()
 
 # ================== APP WINDOW ==================
 app = ttk.Window(themename="flatly")
@@ -32,6 +22,62 @@ app.geometry("1300x800")
 if os.path.exists("logo.ico"):
     app.iconbitmap("logo.ico")
 
+# ================== STATUS BAR & WORKERS ==================
+# Loading, aggregation and PDF rendering run on worker threads; results come back via after()
+status_bar = ttk.Frame(app)
+status_bar.pack(side=BOTTOM, fill=X, padx=10, pady=(0, 5))
+status_lbl = ttk.Label(status_bar, text="Ready", bootstyle="secondary")
+status_lbl.pack(side=LEFT)
+status_progress = ttk.Progressbar(status_bar, length=180, bootstyle="info-striped")
+
+def show_busy(tasks):
+    if not tasks:
+        status_lbl.config(text="Ready")
+        status_progress.stop()
+        status_progress.pack_forget()
+        return
+    task = tasks[-1]
+    more = f" (+{len(tasks) - 1} more)" if len(tasks) > 1 else ""
+    status_lbl.config(text=f"{task.label}{': ' + task.text if task.text else ''}…{more}")
+    if not status_progress.winfo_ismapped():
+        status_progress.pack(side=RIGHT)
+    if task.fraction is None:
+        if str(status_progress["mode"]) != "indeterminate":
+            status_progress.configure(mode="indeterminate")
+            status_progress.start(15)
+    else:
+        status_progress.stop()
+        status_progress.configure(mode="determinate", value=task.fraction * 100)
+
+runner = workers.TaskRunner(app, on_busy=show_busy)
+
+# Invoice PDFs render on the background queue; its state is polled onto the status bar
+PDF_POLL_MS = 1000
+pdf_lbl = ttk.Label(status_bar, text="", bootstyle="secondary")
+pdf_retry_btn = ttk.Button(status_bar, text="Retry PDFs", bootstyle="danger-link",
+                           command=lambda: render_queue.retry_failed())
+
+def poll_pdf_queue():
+    try:
+        queue = render_queue.counts()
+    except Exception:
+        queue = {"pending": 0, "rendering": 0, "failed": 0}
+    busy = queue["pending"] + queue["rendering"]
+    parts = ([f"🖨️ {busy} PDF(s) rendering"] if busy else []) + ([f"{queue['failed']} failed"] if queue["failed"] else [])
+    pdf_lbl.config(text="  ·  ".join(parts), bootstyle="danger" if queue["failed"] else "secondary")
+    if parts and not pdf_lbl.winfo_ismapped():
+        pdf_lbl.pack(side=LEFT, padx=15)
+    elif not parts:
+        pdf_lbl.pack_forget()
+    if queue["failed"] and not pdf_retry_btn.winfo_ismapped():
+        pdf_retry_btn.pack(side=LEFT)
+    elif not queue["failed"]:
+        pdf_retry_btn.pack_forget()
+    app.after(PDF_POLL_MS, poll_pdf_queue)
+
+def show_error(title, prefix):
+    return lambda e: messagebox.showerror(title, f"{prefix}: {e}")
+
 # ================== MAIN NOTEBOOK ==================
 notebook = ttk.Notebook(app, bootstyle="primary")
 notebook.pack(fill=BOTH, expand=True, padx=10, pady=10)
@@ -64,10 +110,7 @@ gst_entry.grid(row=0, column=5, padx=5, pady=5)
 def add_item():
     if not name_entry.get(): return
     try:
-        df = pd.read_csv(PRODUCTS_FILE)
-        new_id = len(df) + 1
-        df.loc[len(df)] = [new_id, name_entry.get(), float(price_entry.get()), float(gst_entry.get())]
-        df.to_csv(PRODUCTS_FILE, index=False)
+        storage.add_product(name_entry.get(), float(price_entry.get()), float(gst_entry.get()))
         load_products()
         name_entry.delete(0, END); price_entry.delete(0, END); gst_entry.delete(0, END)
     except Exception as e:
@@ -92,7 +135,7 @@ tree.pack(fill=BOTH, expand=True)
 
 def load_products():
     for row in tree.get_children(): tree.delete(row)
-    df = pd.read_csv(PRODUCTS_FILE)
+    df = storage.load_products()
     for _, row in df.iterrows(): tree.insert("", END, values=list(row))
 
 load_products()
@@ -125,15 +168,27 @@ selected_tree.pack(fill=BOTH, expand=True)
 # Right: Preview
 right_frame = ttk.LabelFrame(body_frame, text="3. Invoice Preview", width=350)
 right_frame.pack(side=RIGHT, fill=Y, padx=5)
-invoice_text = ttk.Text(right_frame, width=40, height=25, font=("Courier", 9))
+invoice_text = ttk.Text(right_frame, width=40, height=18, font=("Courier", 9))
 invoice_text.pack(padx=10, pady=10)
 
+# Customer history panel (filled from the customer index when a returning customer is picked)
+history_frame = ttk.LabelFrame(right_frame, text="Customer History")
+history_frame.pack(fill=X, padx=10, pady=(0, 10))
+customer_info_lbl = ttk.Label(history_frame, text="Pick a returning customer to see their visits.", wraplength=300)
+customer_info_lbl.pack(anchor=W, padx=5, pady=5)
+history_cols = ("Invoice #", "Date", "Total")
+history_tree = ttk.Treeview(history_frame, columns=history_cols, show="headings", height=4)
+for col in history_cols:
+    history_tree.heading(col, text=col)
+    history_tree.column(col, width=90, anchor=CENTER)
+history_tree.pack(fill=X, padx=5, pady=5)
+
 # --- BOTTOM ACTION BAR ---
 bottom_frame = ttk.LabelFrame(billing_frame, text="Checkout & Generate")
 bottom_frame.pack(fill=X, padx=20, pady=10)
 
 ttk.Label(bottom_frame, text="Name:").pack(side=LEFT, padx=5)
-customer_entry = ttk.Entry(bottom_frame, width=15)
+customer_entry = ttk.Combobox(bottom_frame, width=18)
 customer_entry.pack(side=LEFT, padx=5)
 
 ttk.Label(bottom_frame, text="Address:").pack(side=LEFT, padx=5)
@@ -144,10 +199,63 @@ ttk.Label(bottom_frame, text="Contact:").pack(side=LEFT, padx=5)
 contact_entry = ttk.Entry(bottom_frame, width=12)
 contact_entry.pack(side=LEFT, padx=5)
 
-last_invoice_path = None
+# --- Customer autocomplete (prefix search on the customer index) ---
+suggest_job = None
+
+def suggest_customers(event=None):
+    global suggest_job
+    if event is not None and event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+        return
+    if suggest_job:
+        app.after_cancel(suggest_job)
+
+    def run():
+        text = customer_entry.get().strip()
+        if not text:
+            runner.cancel("suggest")
+            customer_entry.configure(values=[])
+            return
+        runner.submit("suggest", lambda: [m["name"] for m in customers.suggest(text)], label="Searching customers",
+                      on_done=lambda names: customer_entry.configure(values=names))
+    # Wait for a pause in typing instead of querying on every keystroke
+    suggest_job = app.after(150, run)
+
+def show_customer(event=None):
+    for item in history_tree.get_children(): history_tree.delete(item)
+    name = customer_entry.get().strip()
+    if not name:
+        runner.cancel("customer")
+        customer_info_lbl.config(text="Pick a returning customer to see their visits.")
+        return
+
+    def load():
+        profile = customers.lookup(name)
+        return profile, customers.history(profile["name"], limit=10) if profile else None
+
+    def show(result):
+        profile, visits = result
+        if profile is None:
+            customer_info_lbl.config(text="New customer.")
+            return
+        if profile["contact"] and not contact_entry.get():
+            contact_entry.insert(0, profile["contact"])
+        if profile["address"] and not address_entry.get():
+            address_entry.insert(0, profile["address"])
+        customer_info_lbl.config(text=f"{profile['visits']} visits · ₹ {profile['spend']:,.2f} lifetime · "
+                                      f"last visit {(profile['last_visit'] or '-')[:10]}")
+        for row in visits.itertuples(index=False):
+            history_tree.insert("", END, values=(row.invoice_no, (row.date or "-")[:10], f"₹{row.total:.2f}"))
+    customer_info_lbl.config(text="Looking up customer…")
+    runner.submit("customer", load, label="Loading customer", on_done=show,
+                  on_error=show_error("Error", "Could not load customer"))
+
+customer_entry.bind("<KeyRelease>", suggest_customers)
+customer_entry.bind("<<ComboboxSelected>>", show_customer)
+customer_entry.bind("<FocusOut>", show_customer)
+
+last_invoice_no = None
 
 def generate_invoice():
-    global last_invoice_path
     children = selected_tree.get_children()
     if not children:
         messagebox.showwarning("Empty", "Please select services first")
@@ -157,13 +265,12 @@ def generate_invoice():
         messagebox.showwarning("Input", "Enter customer name")
         return
 
-    df_existing = pd.read_csv(SALES_FILE)
-    invoice_no = df_existing["invoice_no"].nunique() + 1001
+    invoice_no = next_invoice_no()
     date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     selected_items_data = []
+    new_rows = []
     grand_total = 0
-    df = pd.read_csv(SALES_FILE)
 
     invoice_text.delete("1.0", END)
     invoice_text.insert(END, f"INVOICE NO: {invoice_no}\nCUSTOMER: {customer}\nDATE: {date}\n" + "-"*40 + "\n")
@@ -173,37 +280,65 @@ def generate_invoice():
         service, price, gst = item[1], float(item[2]), float(item[3])
         total = price + (price * gst / 100)
         grand_total += total
-        selected_items_data.append([service, f"₹{price}", f"{gst}%", f"₹{total:.2f}"])
-        df.loc[len(df)] = [invoice_no, date, customer, service, price, gst, total]
+        selected_items_data.append(invoice_item(service, price, gst, total))
+        new_rows.append({"invoice_no": invoice_no, "date": date, "customer": customer,
+                         "service": service, "price": price, "gst": gst, "total": total})
         invoice_text.insert(END, f"{service:<20} | ₹{total:>8.2f}\n")
 
-    df.to_csv(SALES_FILE, index=False)
     invoice_text.insert(END, "-"*40 + f"\nGRAND TOTAL: ₹{grand_total:.2f}\n")
-
-    from modules.invoice import generate_invoice_pdf
-    generate_invoice_pdf(invoice_no, customer, selected_items_data, grand_total, address_entry.get(), contact_entry.get())
-    last_invoice_path = os.path.join(INVOICE_FOLDER, f"Invoice_{invoice_no}.pdf")
-    
+    address, contact = address_entry.get(), contact_entry.get()
+
+    def save():
+        # Ledger write off the UI thread; one task per invoice, so none supersede each other.
+        # The PDF is queued and rendered in the background, so checkout does not wait for it.
+        workers.report(None, "saving sale")
+        storage.append_sales(new_rows)
+        customers.remember(customer, contact, address)
+        render_queue.enqueue(invoice_no, customer, selected_items_data, grand_total, address, contact, date)
+        return invoice_no
+
+    def saved(number):
+        global last_invoice_no
+        last_invoice_no = number
+        messagebox.showinfo("Success", f"Invoice #{invoice_no} Generated!")
+
+    runner.submit(f"invoice-{invoice_no}", save, label=f"Invoice #{invoice_no}", on_done=saved,
+                  on_error=show_error("Error", f"Invoice #{invoice_no} could not be saved"))
     for child in children: selected_tree.delete(child)
-    messagebox.showinfo("Success", f"Invoice #{invoice_no} Generated!")
 
 ttk.Button(bottom_frame, text="Save & PDF", bootstyle="primary", command=generate_invoice).pack(side=LEFT, padx=10)
 
+def ready_invoice_path():
+    """The last invoice's PDF path once rendered; otherwise tells the user why not and returns None."""
+    if last_invoice_no is None:
+        messagebox.showwarning("Error", "Generate invoice first")
+        return None
+    state = render_queue.status(last_invoice_no)
+    if state == "ready":
+        return invoice_file(last_invoice_no)  # extracted next to the archive if already archived
+    if state == "failed":
+        messagebox.showerror("PDF failed", f"Invoice #{last_invoice_no}: {render_queue.error(last_invoice_no)}\n"
+                                           "Use 'Retry PDFs' on the status bar.")
+    elif state is None:
+        messagebox.showwarning("Error", f"No PDF for invoice #{last_invoice_no}")
+    else:
+        messagebox.showinfo("Please wait", f"The PDF for invoice #{last_invoice_no} is {state}. Try again in a moment.")
+    return None
+
 def print_invoice():
-    if last_invoice_path and os.path.exists(last_invoice_path):
-        os.startfile(last_invoice_path, "print")
-    else: messagebox.showwarning("Error", "Generate invoice first")
+    path = ready_invoice_path()
+    if path:
+        os.startfile(path, "print")
 
 ttk.Button(bottom_frame, text="Print", bootstyle="secondary", command=print_invoice).pack(side=LEFT, padx=5)
 
 def download_invoice():
-    if not last_invoice_path:
-        messagebox.showwarning("Error", "Generate invoice first")
+    path = ready_invoice_path()
+    if not path:
         return
-    save_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")], initialfile=os.path.basename(last_invoice_path))
+    save_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")], initialfile=os.path.basename(path))
     if save_path:
-        import shutil
-        shutil.copy(last_invoice_path, save_path)
+        shutil.copy(path, save_path)
         messagebox.showinfo("Success", "File exported successfully!")
 
 ttk.Button(bottom_frame, text="Download", bootstyle="success", command=download_invoice).pack(side=LEFT, padx=5)
@@ -212,10 +347,12 @@ def reset_billing():
     customer_entry.delete(0, END)
     address_entry.delete(0, END)
     contact_entry.delete(0, END)
+    for item in history_tree.get_children(): history_tree.delete(item)
+    customer_info_lbl.config(text="Pick a returning customer to see their visits.")
     for child in selected_tree.get_children(): selected_tree.delete(child)
     invoice_text.delete("1.0", END)
-    global last_invoice_path
-    last_invoice_path = None
+    global last_invoice_no
+    last_invoice_no = None
 
 ttk.Button(bottom_frame, text="Reset", bootstyle="warning-outline", command=reset_billing).pack(side=LEFT, padx=10)
 
@@ -244,111 +381,330 @@ for col in summary_cols:
     summary_tree.column(col, width=300, anchor=W if col=="Metric" else E)
 summary_tree.pack(fill=X, padx=10, pady=10)
 
+# --- Trend Chart ---
+chart_frame = ttk.LabelFrame(reports_frame, text="Sales Trend")
+chart_frame.pack(fill=X, padx=20, pady=5)
+
+# View name -> (bucket, rolling window); drawn from reports.timeseries / reports.rolling
+TREND_VIEWS = {
+    "Daily": ("day", None), "Weekly": ("week", None), "Monthly": ("month", None),
+    "Quarterly": ("quarter", None), "Rolling 7-day": (None, 7), "Rolling 30-day": (None, 30),
+}
+trend_view = ttk.Combobox(chart_frame, values=list(TREND_VIEWS), state="readonly", width=16)
+trend_view.set("Daily")
+trend_view.pack(anchor=W, padx=10, pady=(5, 0))
+trend_canvas = Canvas(chart_frame, height=180, highlightthickness=0, background="white")
+trend_canvas.pack(fill=X, padx=10, pady=5)
+
+def trend_data(sd, ed, view):
+    # Worker side: the series for one TREND_VIEWS entry
+    bucket, window = TREND_VIEWS[view]
+    return (reports.rolling(sd, ed, window=window) if window else reports.timeseries(sd, ed, bucket=bucket)), window
+
+def draw_trend(trend):
+    df, window = trend
+    trend_canvas.delete("all")
+    width = max(trend_canvas.winfo_width(), 600)
+    height = int(trend_canvas["height"])
+    left, top, bottom = 80, 10, 20
+    plot_w, plot_h = width - left - 10, height - top - bottom
+    peak = max(df["gross"].max(), df["expenses"].max()) if not df.empty else 0
+    if peak <= 0:
+        trend_canvas.create_text(width / 2, height / 2, text="No sales in selected range.", fill="gray")
+        return
+
+    step = plot_w / len(df)
+    y = lambda v: top + plot_h * (1 - max(v, 0) / peak)
+    if window:
+        # Rolling sums: one line each for takings and expenses
+        for col, color in (("gross", "#4CAF50"), ("expenses", "#E53935")):
+            points = [c for i, v in enumerate(df[col]) for c in (left + (i + 0.5) * step, y(v))]
+            if len(points) >= 4:
+                trend_canvas.create_line(*points, fill=color, width=2)
+        trend_canvas.create_text(width - 10, top, anchor=NE, text=f"{window}-day gross / expenses", fill="gray")
+    else:
+        for i, v in enumerate(df["gross"]):
+            x0 = left + i * step
+            trend_canvas.create_rectangle(x0, y(v), x0 + max(step * 0.8, 1), top + plot_h, fill="#4CAF50", outline="")
+
+    trend_canvas.create_line(left, top, left, top + plot_h, left + plot_w, top + plot_h, fill="gray")
+    trend_canvas.create_text(left - 5, top, anchor=NE, text=f"₹ {peak:,.0f}", fill="gray")
+    trend_canvas.create_text(left - 5, top + plot_h, anchor=E, text="0", fill="gray")
+    trend_canvas.create_text(left, height - 2, anchor=SW, text=df["period"].iloc[0].strftime("%Y-%m-%d"), fill="gray")
+    trend_canvas.create_text(left + plot_w, height - 2, anchor=SE, text=df["period"].iloc[-1].strftime("%Y-%m-%d"), fill="gray")
+
+def redraw_trend(event=None):
+    try:
+        sd = datetime.strptime(start_date_entry.get(), "%Y-%m-%d").date()
+        ed = datetime.strptime(end_date_entry.get(), "%Y-%m-%d").date()
+    except ValueError:
+        return
+    runner.submit("trend", trend_data, sd, ed, trend_view.get(), label="Drawing trend", on_done=draw_trend,
+                  on_error=show_error("Error", "Could not draw the trend"))
+
+trend_view.bind("<<ComboboxSelected>>", redraw_trend)
+
 # --- Detailed Sales Table ---
 sales_list_frame = ttk.LabelFrame(reports_frame, text="Detailed Sales History")
 sales_list_frame.pack(fill=BOTH, expand=True, padx=20, pady=5)
 
-sales_cols = ("Invoice #", "Date", "Customer", "Item", "Total")
-sales_report_tree = ttk.Treeview(sales_list_frame, columns=sales_cols, show="headings", height=8)
+# Column -> ledger field; rows are fetched a window at a time (storage.sales_page) as the list scrolls
+sales_cols = {"Invoice #": "invoice_no", "Date": "date", "Customer": "customer", "Item": "service", "Total": "total"}
+SALES_WINDOW = 200
+sales_view = {"range": None, "sort_by": "date", "descending": True, "loaded": 0, "total": 0, "pending": False}
+
+sales_count_lbl = ttk.Label(sales_list_frame, text="", bootstyle="secondary")
+sales_count_lbl.pack(anchor=E, padx=10)
+sales_scroll = ttk.Scrollbar(sales_list_frame, orient=VERTICAL)
+sales_report_tree = ttk.Treeview(sales_list_frame, columns=list(sales_cols), show="headings", height=8)
 for col in sales_cols:
-    sales_report_tree.heading(col, text=col)
+    sales_report_tree.heading(col, text=col, command=lambda c=col: sort_sales(c))
     sales_report_tree.column(col, width=150, anchor=CENTER)
-sales_report_tree.pack(fill=BOTH, expand=True, padx=10, pady=10)
+sales_report_tree.heading("Date", text="Date ▼")
+sales_scroll.pack(side=RIGHT, fill=Y, padx=(0, 10), pady=10)
+sales_report_tree.pack(fill=BOTH, expand=True, padx=(10, 0), pady=10)
+
+def load_sales_window():
+    """Fetches the next SALES_WINDOW rows of the current range/order on a worker and appends them."""
+    if sales_view["range"] is None or sales_view["pending"] or \
+            sales_view["loaded"] >= sales_view["total"] and sales_view["loaded"]:
+        return
+    sd, ed = sales_view["range"]
+
+    def append(result):
+        page, total = result
+        sales_view["pending"] = False
+        for inv, ts, cust, service, amount in zip(page["invoice_no"], page["date"], page["customer"],
+                                                  page["service"], page["total"]):
+            sales_report_tree.insert("", END, values=(inv, ts, cust, service, f"₹{amount:.2f}"))
+        sales_view["loaded"] += len(page)
+        sales_view["total"] = total
+        sales_count_lbl.config(text=f"Showing {sales_view['loaded']:,} of {total:,} line items")
+
+    def failed(e):
+        sales_view["pending"] = False
+        messagebox.showerror("Error", f"Could not load sales: {e}")
+
+    sales_view["pending"] = True
+    # Same key for every window: a reload (new range or order) supersedes a window still in flight
+    runner.submit("sales-window", storage.sales_page, sd, ed, offset=sales_view["loaded"], limit=SALES_WINDOW,
+                  sort_by=sales_view["sort_by"], descending=sales_view["descending"],
+                  label="Loading sales", on_done=append, on_error=failed)
+
+def on_sales_scroll(first, last):
+    sales_scroll.set(first, last)
+    # Near the bottom of what is loaded: fetch the next window
+    if float(last) > 0.9 and sales_view["loaded"] < sales_view["total"]:
+        load_sales_window()
+
+sales_report_tree.configure(yscrollcommand=on_sales_scroll)
+sales_scroll.configure(command=sales_report_tree.yview)
+
+def reload_sales(sd, ed):
+    for item in sales_report_tree.get_children(): sales_report_tree.delete(item)
+    sales_view.update({"range": (sd, ed), "loaded": 0, "total": 0, "pending": False})
+    load_sales_window()
+
+def sort_sales(col):
+    field = sales_cols[col]
+    if sales_view["sort_by"] == field:
+        sales_view["descending"] = not sales_view["descending"]
+    else:
+        sales_view.update({"sort_by": field, "descending": False})
+    for c in sales_cols:
+        arrow = (" ▼" if sales_view["descending"] else " ▲") if c == col else ""
+        sales_report_tree.heading(c, text=c + arrow)
+    if sales_view["range"] is not None:
+        reload_sales(*sales_view["range"])
 
 def refresh_stats():
     try:
-        sales = pd.read_csv(SALES_FILE)
-        expenses = pd.read_csv(EXPENSES_FILE)
-        
+        sd = datetime.strptime(start_date_entry.get(), "%Y-%m-%d").date()
+        ed = datetime.strptime(end_date_entry.get(), "%Y-%m-%d").date()
+    except ValueError as e:
+        messagebox.showerror("Error", f"Could not calculate stats: {e}")
+        return
+    view = trend_view.get()
+
+    def load():
+        # Worker side: everything the tab shows except the sales rows (those load per window)
+        if storage.last_invoice_no() is None:
+            return None
+        workers.report(1 / 3, "summary")
+        summary = reports.summary(sd, ed)
+        workers.check_cancelled()
+        workers.report(2 / 3, "trend")
+        return summary, trend_data(sd, ed, view)
+
+    def show(result):
         # Clear existing
         for item in summary_tree.get_children(): summary_tree.delete(item)
         for item in sales_report_tree.get_children(): sales_report_tree.delete(item)
+        sales_view.update({"range": None, "loaded": 0, "total": 0, "pending": False})
+        sales_count_lbl.config(text="")
 
-        if sales.empty:
+        if result is None:
             summary_tree.insert("", END, values=("Info", "No data found"))
             return
+        summary, trend = result
+        profit = summary["net_profit"]
 
-        # Date handling
-        sales['date_dt'] = pd.to_datetime(sales['date']).dt.date
-        expenses['date_dt'] = pd.to_datetime(expenses['date']).dt.date
-        
-        sd = datetime.strptime(start_date_entry.get(), "%Y-%m-%d").date()
-        ed = datetime.strptime(end_date_entry.get(), "%Y-%m-%d").date()
-        
-        f_sales = sales[(sales['date_dt'] >= sd) & (sales['date_dt'] <= ed)]
-        f_expenses = expenses[(expenses['date_dt'] >= sd) & (expenses['date_dt'] <= ed)]
-        
-        total_sales = f_sales["total"].sum()
-        revenue_ex_gst = f_sales["price"].sum()
-        gst_collected = total_sales - revenue_ex_gst
-        total_exp = f_expenses["amount"].sum()
-        profit = revenue_ex_gst - total_exp
-        
         # Populate Summary Table
-        metrics = [
-            ("Total Sales (Incl. GST)", f"₹ {total_sales:,.2f}"),
-            ("Total Revenue (Excl. GST)", f"₹ {revenue_ex_gst:,.2f}"),
-            ("GST Collected", f"₹ {gst_collected:,.2f}"),
-            ("Total Expenses", f"₹ {total_exp:,.2f}"),
-            ("NET PROFIT/LOSS", f"₹ {profit:,.2f}")
-        ]
-        for m, v in metrics:
+        for m, v in reports.summary_rows(summary):
             summary_tree.insert("", END, values=(m, v))
             if "PROFIT" in m:
                 item_id = summary_tree.get_children()[-1]
                 summary_tree.tag_configure("gain", foreground="green" if profit >=0 else "red")
                 summary_tree.item(item_id, tags=("gain",))
 
-        # Populate Detailed Table
-        for _, row in f_sales.iterrows():
-            sales_report_tree.insert("", END, values=(
-                row["invoice_no"], row["date"], row["customer"], row["service"], f"₹{row['total']:.2f}"
-            ))
-        
-    except Exception as e:
-        messagebox.showerror("Error", f"Could not calculate stats: {e}")
+        draw_trend(trend)
+
+        # Populate Detailed Table (first window only; more load on scroll)
+        reload_sales(sd, ed)
+
+    # A newer refresh (or date range) supersedes this one
+    runner.submit("stats", load, label="Refreshing reports", on_done=show,
+                  on_error=show_error("Error", "Could not calculate stats"))
 
 ttk.Button(filter_frame, text="Refresh Stats", bootstyle="info", command=refresh_stats).grid(row=0, column=4, padx=20)
 
 def download_report_pdf():
-    try:
+    sd = start_date_entry.get()
+    ed = end_date_entry.get()
+    by_day = report_by_day.get()
+
+    # Get data from tables
+    summary_data = []
+    for child in summary_tree.get_children():
+        summary_data.append(summary_tree.item(child)["values"])
+
+    save_path = filedialog.asksaveasfilename(
+        defaultextension=".pdf",
+        filetypes=[("PDF files", "*.pdf")],
+        initialfile=f"Financial_Report_{sd}_to_{ed}.pdf"
+    )
+    if not save_path:
+        return
+
+    def build():
         from modules.reports_pdf import generate_financial_report_pdf
-        from modules.paths import INVOICE_FOLDER
-        
-        sd = start_date_entry.get()
-        ed = end_date_entry.get()
-        
-        # Get data from tables
-        summary_data = []
-        for child in summary_tree.get_children():
-            summary_data.append(summary_tree.item(child)["values"])
-            
-        sales_data = []
-        for child in sales_report_tree.get_children():
-            sales_data.append(sales_report_tree.item(child)["values"])
-            
-        if not sales_data:
-            messagebox.showwarning("Empty", "No data to export for the selected range.")
-            return
 
-        temp_path = os.path.join(INVOICE_FOLDER, f"Financial_Report_{sd}_to_{ed}.pdf")
-        generate_financial_report_pdf(temp_path, sd, ed, summary_data, sales_data)
-        
-        save_path = filedialog.asksaveasfilename(
-            defaultextension=".pdf",
-            filetypes=[("PDF files", "*.pdf")],
-            initialfile=os.path.basename(temp_path)
-        )
-        
-        if save_path:
-            import shutil
-            shutil.copy(temp_path, save_path)
+        # The table only holds the rows scrolled so far, so the PDF streams the full range from the ledger
+        if reports.summary(sd, ed)["lines"] == 0:
+            return None
+
+        def render(f):
+            if by_day:
+                sales_rows = reports.daily_report_rows(sd, ed)
+            else:
+                sales_rows = reports.sales_report_rows(sd, ed)
+            workers.report(None, "rendering pages")
+            generate_financial_report_pdf(f, sd, ed, summary_data, sales_rows, by_day=by_day)
+
+        # Copied from the report cache unless the range or the ledger changed since the last render
+        cached = report_cache.cached_report("financial", [sd, ed, by_day, summary_data], render)
+        shutil.copyfile(cached, save_path)
+        return save_path
+
+    def done(path):
+        if path is None:
+            messagebox.showwarning("Empty", "No data to export for the selected range.")
+        else:
             messagebox.showinfo("Success", "Financial Report exported successfully!")
-            
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to export report: {e}")
+
+    runner.submit("report-pdf", build, label="Exporting financial report", on_done=done,
+                  on_error=show_error("Error", "Failed to export report"))
 
 ttk.Button(filter_frame, text="⬇️ Download Report PDF", bootstyle="success-outline", command=download_report_pdf).grid(row=0, column=5, padx=10)
+report_by_day = ttk.BooleanVar(value=False)
+ttk.Checkbutton(filter_frame, text="Report by day", variable=report_by_day, bootstyle="round-toggle").grid(row=0, column=8, padx=10)
+
+def export_excel():
+    sd = start_date_entry.get()
+    ed = end_date_entry.get()
+    save_path = filedialog.asksaveasfilename(
+        defaultextension=".xlsx",
+        filetypes=[("Excel files", "*.xlsx")],
+        initialfile=f"Ledger_{sd}_to_{ed}.xlsx"
+    )
+    if not save_path:
+        return
+
+    def build():
+        from modules.excel_export import export_workbook
+        total = storage.sales_page(sd, ed, limit=0)[1]
+        return export_workbook(save_path, sd, ed, progress=lambda r: workers.report(
+            min(r["sales_rows"] / max(total, 1), 1.0), f"{r['rows']:,} rows, {r['rows_per_s']:,.0f} rows/s"))
+
+    runner.submit("excel", build, label="Exporting to Excel",
+                  on_done=lambda r: messagebox.showinfo("Success", f"Exported {r['rows']:,} rows in {r['seconds']:.1f}s "
+                                                                   f"({r['rows_per_s']:,.0f} rows/s)."),
+                  on_error=show_error("Error", "Failed to export workbook"))
+
+ttk.Button(filter_frame, text="⬇️ Export Excel", bootstyle="success-outline", command=export_excel).grid(row=0, column=7, padx=10)
+
+def show_gst_summary():
+    """GST return summary for the filter range: per rate slab, optionally per day, with CSV/Excel/PDF export."""
+    try:
+        sd = datetime.strptime(start_date_entry.get(), "%Y-%m-%d").date()
+        ed = datetime.strptime(end_date_entry.get(), "%Y-%m-%d").date()
+    except ValueError:
+        messagebox.showwarning("Invalid Dates", "Use YYYY-MM-DD for both dates.")
+        return
+
+    win = ttk.Toplevel(app)
+    win.title(f"GST Summary {sd} to {ed}")
+    win.geometry("820x480")
+    by_day = ttk.BooleanVar(value=False)
+
+    gst_cols = ("Date", "GST Rate", "Taxable Value", "Tax", "Total", "Invoices")
+    gst_tree = ttk.Treeview(win, columns=gst_cols, show="headings", bootstyle="info")
+    for col in gst_cols:
+        gst_tree.heading(col, text=col)
+        gst_tree.column(col, width=120, anchor=W if col == "Date" else E)
+
+    def fill():
+        daily = by_day.get()
+
+        def show(rows):
+            for item in gst_tree.get_children(): gst_tree.delete(item)
+            for row in rows:
+                gst_tree.insert("", END, values=row if daily else [""] + row)
+        runner.submit("gst", lambda: reports.gst_summary_rows(reports.gst_summary(sd, ed, by_day=daily)),
+                      label="Summarising GST", on_done=show, on_error=show_error("Error", "GST summary failed"))
+
+    def export(fmt):
+        save_path = filedialog.asksaveasfilename(
+            parent=win,
+            defaultextension=f".{fmt}",
+            filetypes=[{"csv": ("CSV files", "*.csv"), "xlsx": ("Excel files", "*.xlsx"), "pdf": ("PDF files", "*.pdf")}[fmt]],
+            initialfile=f"GST_Summary_{sd}_to_{ed}.{fmt}"
+        )
+        if not save_path:
+            return
+        daily = by_day.get()
+
+        def write():
+            if fmt == "pdf":
+                from modules.reports_pdf import generate_gst_summary_pdf
+                daily_rows = reports.gst_summary_rows(reports.gst_summary(sd, ed, by_day=True), total=False) if daily else None
+                generate_gst_summary_pdf(save_path, str(sd), str(ed), reports.gst_summary_rows(reports.gst_summary(sd, ed)), daily_rows)
+            else:
+                reports.export_gst_summary(reports.gst_summary(sd, ed, by_day=daily), save_path, fmt=fmt)
+
+        runner.submit(f"gst-export-{fmt}", write, label="Exporting GST summary",
+                      on_done=lambda _: messagebox.showinfo("Success", "GST Summary exported successfully!", parent=win),
+                      on_error=lambda e: messagebox.showerror("Error", f"Failed to export GST summary: {e}", parent=win))
+
+    bar = ttk.Frame(win)
+    bar.pack(fill=X, padx=10, pady=10)
+    ttk.Checkbutton(bar, text="Break down by day", variable=by_day, command=fill, bootstyle="round-toggle").pack(side=LEFT)
+    for fmt, label in (("pdf", "PDF"), ("xlsx", "Excel"), ("csv", "CSV")):
+        ttk.Button(bar, text=f"⬇️ {label}", bootstyle="success-outline", command=lambda f=fmt: export(f)).pack(side=RIGHT, padx=5)
+    gst_tree.pack(fill=BOTH, expand=True, padx=10, pady=(0, 10))
+    fill()
+
+ttk.Button(filter_frame, text="GST Summary", bootstyle="info-outline", command=show_gst_summary).grid(row=0, column=6, padx=10)
 
 # Delete Section in Reports (Optional)
 del_frame = ttk.LabelFrame(reports_frame, text="Danger Zone")
@@ -360,15 +716,38 @@ del_inv_entry.pack(side=LEFT, padx=5)
 def delete_inv_action():
     try:
         inv = int(del_inv_entry.get())
-        df = pd.read_csv(SALES_FILE)
-        df = df[df["invoice_no"] != inv]
-        df.to_csv(SALES_FILE, index=False)
+    except ValueError:
+        messagebox.showwarning("Error", "Invalid Invoice Number")
+        return
+
+    def done(_):
         messagebox.showinfo("Success", f"Invoice #{inv} removed")
         refresh_stats()
-    except: messagebox.showwarning("Error", "Invalid Invoice Number")
+    # Through modules.invoice: also cancels a queued render and removes the loose and archived PDF
+    runner.submit(f"delete-{inv}", delete_invoice, inv, label=f"Deleting invoice #{inv}", on_done=done,
+                  on_error=show_error("Error", f"Could not delete invoice #{inv}"))
 
 ttk.Button(del_frame, text="Delete Data", bootstyle="danger-outline", command=delete_inv_action).pack(side=LEFT, padx=15)
 
+def void_inv_action():
+    try:
+        inv = int(del_inv_entry.get())
+    except ValueError:
+        messagebox.showwarning("Error", "Invalid Invoice Number")
+        return
+
+    def done(voided):
+        if voided:
+            messagebox.showinfo("Success", f"Invoice #{inv} voided")
+            refresh_stats()
+        else:
+            messagebox.showwarning("Error", f"Invoice #{inv} not found")
+    # Through modules.invoice so a render still queued for it is cancelled
+    runner.submit(f"void-{inv}", void_invoice, inv, label=f"Voiding invoice #{inv}", on_done=done,
+                  on_error=show_error("Error", f"Could not void invoice #{inv}"))
+
+ttk.Button(del_frame, text="Void Invoice", bootstyle="warning-outline", command=void_inv_action).pack(side=LEFT, padx=5)
+
 # ================== BALANCE SHEET TAB LOGIC ==================
 bs_header = ttk.Frame(balance_sheet_frame)
 bs_header.pack(fill=X, padx=20, pady=20)
@@ -376,59 +755,40 @@ bs_header.pack(fill=X, padx=20, pady=20)
 ttk.Label(bs_header, text="Business Balance Sheet Snapshot", font=("Helvetica", 18, "bold")).pack(side=LEFT)
 
 def refresh_balance_sheet():
-    try:
-        sales = pd.read_csv(SALES_FILE)
-        expenses = pd.read_csv(EXPENSES_FILE)
-        
-        total_sales_inc_gst = sales["total"].sum()
-        revenue_ex_gst = sales["price"].sum()
-        gst_collected = total_sales_inc_gst - revenue_ex_gst
-        total_exp = expenses["amount"].sum()
-        
-        cash_balance = total_sales_inc_gst - total_exp
-        gst_payable = gst_collected
-        retained_earnings = revenue_ex_gst - total_exp
-        
+    def show(sheet):
         # Update UI Labels
-        cash_val_lbl.config(text=f"₹ {cash_balance:,.2f}")
-        gst_val_lbl.config(text=f"₹ {gst_payable:,.2f}")
-        equity_val_lbl.config(text=f"₹ {retained_earnings:,.2f}")
+        cash_val_lbl.config(text=f"₹ {sheet['cash_balance']:,.2f}")
+        gst_val_lbl.config(text=f"₹ {sheet['gst_payable']:,.2f}")
+        equity_val_lbl.config(text=f"₹ {sheet['retained_earnings']:,.2f}")
         
-        total_assets_lbl.config(text=f"Total Assets: ₹ {cash_balance:,.2f}")
-        total_liab_eq_lbl.config(text=f"Total Liabilities & Equity: ₹ {gst_payable + retained_earnings:,.2f}")
-        
-    except Exception as e:
-        messagebox.showerror("Error", f"Balance Sheet calculation failed: {e}")
+        total_assets_lbl.config(text=f"Total Assets: ₹ {sheet['total_assets']:,.2f}")
+        total_liab_eq_lbl.config(text=f"Total Liabilities & Equity: ₹ {sheet['total_liabilities_equity']:,.2f}")
+
+    runner.submit("balance-sheet", reports.balance_sheet, label="Refreshing balance sheet", on_done=show,
+                  on_error=show_error("Error", "Balance Sheet calculation failed"))
 
 def download_bs_pdf():
-    try:
+    save_path = filedialog.asksaveasfilename(
+        defaultextension=".pdf",
+        filetypes=[("PDF files", "*.pdf")],
+        initialfile=f"Balance_Sheet_{datetime.now().strftime('%Y-%m-%d')}.pdf"
+    )
+    if not save_path:
+        return
+
+    def build():
         from modules.reports_pdf import generate_balance_sheet_pdf
-        from modules.paths import INVOICE_FOLDER
-        
-        # Parse currency strings back to floats
-        def parse_curr(s):
-            return float(s.replace('₹', '').replace(',', '').strip())
-        
-        cash = parse_curr(cash_val_lbl.cget("text"))
-        gst = parse_curr(gst_val_lbl.cget("text"))
-        equity = parse_curr(equity_val_lbl.cget("text"))
 
-        temp_path = os.path.join(INVOICE_FOLDER, f"Balance_Sheet_{datetime.now().strftime('%Y-%m-%d')}.pdf")
-        generate_balance_sheet_pdf(temp_path, cash, gst, equity)
-        
-        save_path = filedialog.asksaveasfilename(
-            defaultextension=".pdf",
-            filetypes=[("PDF files", "*.pdf")],
-            initialfile=os.path.basename(temp_path)
-        )
-        
-        if save_path:
-            import shutil
-            shutil.copy(temp_path, save_path)
-            messagebox.showinfo("Success", "Balance Sheet exported successfully!")
-            
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to export balance sheet: {e}")
+        sheet = reports.balance_sheet()
+        cash, gst, equity = sheet["cash_balance"], sheet["gst_payable"], sheet["retained_earnings"]
+        cached = report_cache.cached_report("balance-sheet", [cash, gst, equity],
+                                            lambda f: generate_balance_sheet_pdf(f, cash, gst, equity))
+        shutil.copyfile(cached, save_path)
+        return save_path
+
+    runner.submit("balance-sheet-pdf", build, label="Exporting balance sheet",
+                  on_done=lambda _: messagebox.showinfo("Success", "Balance Sheet exported successfully!"),
+                  on_error=show_error("Error", "Failed to export balance sheet"))
 
 ttk.Button(bs_header, text="⬇️ Download Balance Sheet PDF", bootstyle="success-outline", command=download_bs_pdf).pack(side=RIGHT, padx=10)
 ttk.Button(bs_header, text="🔄 Refresh Balance Sheet", bootstyle="info", command=refresh_balance_sheet).pack(side=RIGHT)
@@ -473,8 +833,22 @@ ttk.Separator(liab_frame, orient=HORIZONTAL).pack(fill=X, padx=10, pady=20)
 total_liab_eq_lbl = ttk.Label(liab_frame, text="Total Liabilities & Equity: ₹ 0.00", font=("Helvetica", 12, "bold"))
 total_liab_eq_lbl.pack(anchor=E, padx=10)
 
-# Initialize data
+def on_close():
+    # Drop queued refreshes; an invoice already being written finishes before the process exits.
+    # Unrendered PDFs stay in the render queue and are picked up on the next start.
+    runner.shutdown()
+    render_queue.stop()
+    invoice_archive.stop()
+    app.destroy()
+
+app.protocol("WM_DELETE_WINDOW", on_close)
+
+# Initialize data on the workers: the window shows straight away and fills in as results arrive
 refresh_stats()
 refresh_balance_sheet()
+runner.submit("pdf-queue", render_queue.start, storage, label="Checking invoice PDFs",
+              on_error=show_error("Error", "Invoice PDF queue could not start"))
+poll_pdf_queue()
+invoice_archive.start()
 
 app.mainloop()
@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+
+import pandas as pd
+
+from modules.locks import atomic_write
+from modules.paths import CACHE_FOLDER
+
+# Feather (Arrow) sidecars are columnar and typed; pyarrow ships with streamlit.
+# The desktop-only install falls back to pickle, which also keeps dtypes.
+try:
+    import pyarrow  # noqa: F401
+    SIDECAR_FORMAT = "feather"
+except ImportError:
+    SIDECAR_FORMAT = "pickle"
+
+# Bump whenever the cached table layout changes (dtypes, row order) so old sidecars are ignored
+LAYOUT_VERSION = 2
+
+_memory = {}
+_memory_lock = threading.Lock()
+
+
+def file_signature(*paths):
+    """Returns a hashable (path, size, mtime) token; changes whenever any of the files is rewritten or appended to."""
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((path, st.st_size, st.st_mtime_ns))
+        except FileNotFoundError:
+            sig.append((path, None, None))
+    return tuple(sig)
+
+
+def _sidecar_paths(key):
+    return (os.path.join(CACHE_FOLDER, f"{key}.{SIDECAR_FORMAT}"),
+            os.path.join(CACHE_FOLDER, f"{key}.json"))
+
+
+def _token(signature):
+    return json.dumps(signature, default=str)
+
+
+def _read_sidecar(key, signature):
+    data_path, meta_path = _sidecar_paths(key)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if (meta.get("signature") != _token(signature) or meta.get("format") != SIDECAR_FORMAT
+                or meta.get("layout") != LAYOUT_VERSION):
+            return None
+        if SIDECAR_FORMAT == "feather":
+            return pd.read_feather(data_path)
+        return pd.read_pickle(data_path)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_sidecar(key, signature, df):
+    data_path, meta_path = _sidecar_paths(key)
+    try:
+        with atomic_write(data_path, "wb") as f:
+            if SIDECAR_FORMAT == "feather":
+                df.reset_index(drop=True).to_feather(f)
+            else:
+                df.to_pickle(f)
+        with atomic_write(meta_path) as f:
+            json.dump({"signature": _token(signature), "format": SIDECAR_FORMAT, "layout": LAYOUT_VERSION,
+                       "rows": len(df)}, f)
+    except Exception:
+        # The sidecar is only an accelerator; never fail a read because of it
+        pass
+
+
+# ===============================
+# VERSIONED TABLE CACHE
+# ===============================
+def load_table(key, signature, parse, remember=True):
+    """Returns the typed table for `key`: from memory if `signature` still matches,
+    else from the on-disk sidecar, else by calling parse() (and refreshing both).
+    With remember=False a table not already in memory is not kept there (one-off scans).
+    """
+    with _memory_lock:
+        hit = _memory.get(key)
+    if hit is not None and hit[0] == signature:
+        return hit[1]
+
+    df = _read_sidecar(key, signature)
+    if df is None:
+        df = parse()
+        _write_sidecar(key, signature, df)
+    if remember:
+        with _memory_lock:
+            _memory[key] = (signature, df)
+    return df
+
+
+def extend_table(key, old_signature, new_signature, new_rows, concat=None):
+    """Folds freshly appended rows into the in-memory copy so an append does not force a re-parse.
+    Only applies if the cached copy was current just before the append.
+    """
+    concat = concat or (lambda frames: pd.concat(frames, ignore_index=True))
+    with _memory_lock:
+        hit = _memory.get(key)
+        if hit is None or hit[0] != old_signature:
+            return False
+        df = new_rows if hit[1].empty else concat([hit[1], new_rows])
+        _memory[key] = (new_signature, df)
+    return True
+
+
+def invalidate(key=None):
+    with _memory_lock:
+        if key is None:
+            _memory.clear()
+        else:
+            _memory.pop(key, None)
@@ -0,0 +1,276 @@
+import json
+import re
+import sqlite3
+from contextlib import contextmanager
+
+import pandas as pd
+
+from modules.locks import file_lock
+from modules.paths import CUSTOMER_INDEX_FILE
+
+# Suggestions returned per keystroke
+SUGGEST_LIMIT = 10
+
+# Below this many rows a plain loop beats pandas' groupby overhead (see rollups.SMALL_DELTA_ROWS)
+SMALL_DELTA_ROWS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    contact TEXT,
+    address TEXT,
+    visits INTEGER NOT NULL DEFAULT 0,
+    first_visit TEXT,
+    last_visit TEXT,
+    spend REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS customer_invoices (
+    key TEXT NOT NULL,
+    invoice_no INTEGER NOT NULL,
+    date TEXT,
+    total REAL NOT NULL,
+    lines INTEGER NOT NULL,
+    PRIMARY KEY (key, invoice_no)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS contacts (
+    contact TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def normalise_name(name):
+    """Case- and spacing-insensitive key: '  Priya  SHARMA ' -> 'priya sharma'."""
+    return " ".join(str(name).split()).casefold()
+
+
+def normalise_contact(contact):
+    # Last 10 digits, so '+91 98765-43210' and '9876543210' are the same person
+    digits = re.sub(r"\D", "", str(contact or ""))
+    return digits[-10:]
+
+
+def _token(version):
+    return json.dumps(version, default=str)
+
+
+@contextmanager
+def _connect(path=CUSTOMER_INDEX_FILE):
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _version(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'sales_version'").fetchone()
+    return row[0] if row else None
+
+
+def _set_version(conn, version):
+    conn.execute("INSERT INTO meta (key, value) VALUES ('sales_version', ?) "
+                 "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (_token(version),))
+
+
+# ===============================
+# DELTAS
+# ===============================
+def _invoice_rows(df):
+    """Collapses typed sales rows to [(key, name, invoice_no, date, total, lines)], one per customer invoice.
+    An invoice with no dated line (legacy rows with an unparsable date) gets a NULL date.
+    """
+    df = df[df["customer"].notna()]
+    if df.empty:
+        return []
+    if len(df) < SMALL_DELTA_ROWS:
+        invoices = {}
+        for name, inv, ts, total in zip(df["customer"], df["invoice_no"], df["date"], df["total"]):
+            name = " ".join(str(name).split())
+            entry = invoices.setdefault((name.casefold(), int(inv)), [name, None, 0.0, 0])
+            entry[0] = name
+            if ts == ts and (entry[1] is None or ts < entry[1]):  # NaT != NaT
+                entry[1] = ts
+            entry[2] += float(total)
+            entry[3] += 1
+        return [(key, name, inv, ts.strftime("%Y-%m-%d %H:%M:%S") if ts is not None else None, total, lines)
+                for (key, inv), (name, ts, total, lines) in invoices.items()]
+    names = df["customer"].astype(str).str.split().str.join(" ")
+    keys = names.str.casefold()  # vectorised normalise_name
+    grouped = pd.DataFrame({"key": keys, "name": names, "invoice_no": df["invoice_no"].astype("int64"),
+                            "date": df["date"], "total": df["total"]}) \
+        .groupby(["key", "invoice_no"], sort=False) \
+        .agg(name=("name", "last"), date=("date", "min"), total=("total", "sum"), lines=("total", "size")) \
+        .reset_index()
+    dates = grouped["date"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    grouped["date"] = dates.astype(object).where(dates.notna(), None)
+    return list(grouped[["key", "name", "invoice_no", "date", "total", "lines"]].itertuples(index=False, name=None))
+
+
+def _insert_invoices(conn, invoices, merge=False):
+    # Lines of an invoice normally arrive in one write; merge if they do not
+    upsert = " ON CONFLICT(key, invoice_no) DO UPDATE SET total = total + excluded.total, " \
+             "lines = lines + excluded.lines" if merge else ""
+    conn.executemany("INSERT INTO customer_invoices (key, invoice_no, date, total, lines) VALUES (?, ?, ?, ?, ?)"
+                     + upsert, [(k, inv, d, t, n) for k, _, inv, d, t, n in invoices])
+
+
+def _refresh_customers(conn, keys, names=None):
+    """Recomputes visits/first/last/spend for `keys` from customer_invoices (latest spelling of the name wins)."""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS touched (key TEXT PRIMARY KEY, name TEXT)")
+    conn.execute("DELETE FROM touched")
+    names = names or {}
+    conn.executemany("INSERT OR REPLACE INTO touched (key, name) VALUES (?, ?)",
+                     [(k, names.get(k, k)) for k in keys])
+    conn.execute("""
+        INSERT INTO customers (key, name, visits, first_visit, last_visit, spend)
+        SELECT t.key, t.name, COUNT(ci.invoice_no), MIN(ci.date), MAX(ci.date), COALESCE(SUM(ci.total), 0)
+        FROM touched t LEFT JOIN customer_invoices ci ON ci.key = t.key
+        GROUP BY t.key
+        ON CONFLICT(key) DO UPDATE SET
+            name = CASE WHEN excluded.visits > customers.visits THEN excluded.name ELSE customers.name END,
+            visits = excluded.visits, first_visit = excluded.first_visit,
+            last_visit = excluded.last_visit, spend = excluded.spend
+    """)
+
+
+def _apply(conn, rows, sign):
+    invoices = _invoice_rows(rows)
+    if not invoices:
+        return
+    if sign > 0:
+        _insert_invoices(conn, invoices, merge=True)
+    else:
+        conn.executemany("DELETE FROM customer_invoices WHERE key = ? AND invoice_no = ?",
+                         [(k, inv) for k, _, inv, _, _, _ in invoices])
+    names = {k: name for k, name, *_ in invoices} if sign > 0 else None
+    _refresh_customers(conn, list({k for k, *_ in invoices}), names)
+
+
+# ===============================
+# INCREMENTAL MAINTENANCE
+# ===============================
+def record(table, rows, sign, before_version, after_version):
+    """Applies a sales write to the index (same contract as rollups.record): must be called
+    under the sales write lock with the versions seen before and after the write. If the
+    index was not at `before_version` it is left stale and rebuilt on the next read.
+    """
+    if table != "sales":
+        return False
+    with file_lock(CUSTOMER_INDEX_FILE), _connect() as conn:
+        if _version(conn) != _token(before_version):
+            return False
+        _apply(conn, rows, sign)
+        _set_version(conn, after_version)
+    return True
+
+
+def rebuild(storage):
+    """Recomputes invoices and visit stats from the full ledger; contacts and addresses are kept."""
+    with storage.write_lock("sales"), file_lock(CUSTOMER_INDEX_FILE), _connect() as conn:
+        invoices = _invoice_rows(storage.load_sales())
+        conn.execute("DELETE FROM customer_invoices")
+        conn.execute("UPDATE customers SET visits = 0, first_visit = NULL, last_visit = NULL, spend = 0")
+        _insert_invoices(conn, invoices)
+        names = {k: name for k, name, *_ in invoices}
+        _refresh_customers(conn, list(names), names)
+        _set_version(conn, storage.table_version("sales"))
+
+
+def _ensure_current(storage=None):
+    if storage is None:
+        from modules.storage import get_storage
+        storage = get_storage()
+    with _connect() as conn:
+        current = _version(conn) == _token(storage.table_version("sales"))
+    if not current:
+        rebuild(storage)
+
+
+def remember(name, contact=None, address=None):
+    """Stores the contact details captured at checkout (they are not part of the sales ledger)."""
+    key, contact = normalise_name(name), normalise_contact(contact)
+    if not key:
+        return
+    with _connect() as conn:
+        conn.execute("INSERT INTO customers (key, name) VALUES (?, ?) ON CONFLICT(key) DO NOTHING",
+                     (key, " ".join(str(name).split())))
+        if contact:
+            conn.execute("UPDATE customers SET contact = ? WHERE key = ?", (contact, key))
+            conn.execute("INSERT INTO contacts (contact, key) VALUES (?, ?) "
+                         "ON CONFLICT(contact) DO UPDATE SET key = excluded.key", (contact, key))
+        if address:
+            conn.execute("UPDATE customers SET address = ? WHERE key = ?", (str(address).strip(), key))
+
+
+# ===============================
+# LOOKUPS
+# ===============================
+_FIELDS = ["name", "contact", "address", "visits", "first_visit", "last_visit", "spend"]
+
+
+def _records(cursor):
+    return [dict(zip(_FIELDS, row)) for row in cursor.fetchall()]
+
+
+def suggest(prefix, limit=SUGGEST_LIMIT, storage=None):
+    """Customers whose name (or contact number, if `prefix` is digits) starts with `prefix`.
+    A range scan on the primary key, so it stays fast with hundreds of thousands of customers.
+    """
+    _ensure_current(storage)
+    columns = ", ".join(f"c.{f}" for f in _FIELDS)
+    digits = normalise_contact(prefix) if re.fullmatch(r"[\d\s+\-()]+", str(prefix).strip() or "x") else ""
+    with _connect() as conn:
+        if digits:
+            return _records(conn.execute(
+                f"SELECT {columns} FROM contacts ct JOIN customers c ON c.key = ct.key "
+                "WHERE ct.contact >= ? AND ct.contact < ? ORDER BY ct.contact LIMIT ?",
+                (digits, digits + "\uffff", limit)))
+        key = normalise_name(prefix)
+        if not key:
+            return []
+        return _records(conn.execute(
+            f"SELECT {columns} FROM customers c WHERE c.key >= ? AND c.key < ? ORDER BY c.key LIMIT ?",
+            (key, key + "\uffff", limit)))
+
+
+def lookup(name, storage=None):
+    """The customer's profile dict (visits, first/last visit, lifetime spend, contact), or None."""
+    _ensure_current(storage)
+    columns = ", ".join(_FIELDS)
+    with _connect() as conn:
+        rows = _records(conn.execute(f"SELECT {columns} FROM customers WHERE key = ?", (normalise_name(name),)))
+    return rows[0] if rows else None
+
+
+def contacts(names):
+    """{name: (contact, address)} for the given customer names, in a few queries. Contact details
+    are captured at checkout rather than derived from the ledger, so this needs no rebuild check.
+    """
+    names = {n: normalise_name(n) for n in names if n is not None and n == n}
+    found = {}
+    with _connect() as conn:
+        pending = list(set(names.values()))
+        for i in range(0, len(pending), 500):  # stay under SQLite's bound-parameter limit
+            batch = pending[i:i + 500]
+            found.update((key, (contact, address)) for key, contact, address in conn.execute(
+                f"SELECT key, contact, address FROM customers WHERE key IN ({', '.join('?' * len(batch))})", batch))
+    return {name: found.get(key, (None, None)) for name, key in names.items()}
+
+
+def history(name, limit=20, storage=None):
+    """The customer's most recent invoices: invoice_no, date, total, lines."""
+    _ensure_current(storage)
+    with _connect() as conn:
+        return pd.read_sql_query(
+            "SELECT invoice_no, date, total, lines FROM customer_invoices WHERE key = ? "
+            "ORDER BY date DESC, invoice_no DESC LIMIT ?", conn, params=(normalise_name(name), limit))
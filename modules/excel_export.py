@@ -0,0 +1,175 @@
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import xlsxwriter
+
+from modules import reports
+from modules.paths import EXPORT_FOLDER
+from modules.storage import EXPORT_CHUNK_ROWS
+
+# Excel's hard limit per worksheet (header included); longer ledgers continue on "Sales (2)", ...
+MAX_SHEET_ROWS = 1_048_576
+
+# Days between Excel's epoch and the Unix epoch: dates are written as serial numbers with a date format
+EXCEL_EPOCH = np.datetime64("1899-12-30", "s")
+
+SALES_HEADERS = [("invoice_no", "Invoice #", 10), ("date", "Date", 18), ("customer", "Customer", 24),
+                 ("service", "Service", 24), ("price", "Price", 12), ("gst", "GST %", 8), ("total", "Total", 12)]
+EXPENSE_HEADERS = [("date", "Date", 12), ("description", "Description", 36), ("amount", "Amount", 12)]
+MONEY_FORMAT = "#,##0.00"
+
+
+def _serials(dates):
+    """datetime64 column -> Excel serial day numbers (NaN for missing dates), vectorised."""
+    stamps = dates.to_numpy("datetime64[s]")
+    serials = (stamps - EXCEL_EPOCH) / np.timedelta64(1, "D")
+    return np.where(np.isnat(stamps), np.nan, serials).tolist()
+
+
+def _text(values):
+    return [None if v is None or v != v else str(v) for v in values.astype(object).tolist()]
+
+
+class _SheetStream:
+    """Appends rows to a worksheet in constant-memory mode, rolling over to a new sheet at Excel's row limit."""
+
+    def __init__(self, workbook, title, headers, formats):
+        self.workbook, self.title, self.headers, self.formats = workbook, title, headers, formats
+        self.sheets = 0
+        self.sheet, self.row = None, MAX_SHEET_ROWS
+
+    def _next_sheet(self):
+        self.sheets += 1
+        name = self.title if self.sheets == 1 else f"{self.title} ({self.sheets})"
+        self.sheet = self.workbook.add_worksheet(name)
+        bold = self.formats["header"]
+        for col, (_, label, width) in enumerate(self.headers):
+            self.sheet.set_column(col, col, width)
+            self.sheet.write_string(0, col, label, bold)
+        self.sheet.freeze_panes(1, 0)
+        self.row = 1
+
+    def write(self, columns, kinds):
+        """columns: one list per header; kinds: 'number', 'money', 'date', 'datetime' or 'text' per column.
+        Rows go out strictly in order, as constant_memory mode requires; None/NaN cells are left blank.
+        """
+        formats = [self.formats.get(kind) for kind in kinds]
+        text = [kind == "text" for kind in kinds]
+        rows = len(columns[0]) if columns else 0
+        done = 0
+        while done < rows:
+            if self.row >= MAX_SHEET_ROWS:
+                self._next_sheet()
+            take = min(rows - done, MAX_SHEET_ROWS - self.row)
+            write_number, write_string = self.sheet.write_number, self.sheet.write_string
+            for r, values in enumerate(zip(*(col[done:done + take] for col in columns)), start=self.row):
+                for c, v in enumerate(values):
+                    if v is None or v != v:
+                        continue
+                    if text[c]:
+                        write_string(r, c, v)
+                    else:
+                        write_number(r, c, v, formats[c])
+            self.row += take
+            done += take
+
+    def close(self):
+        if self.sheet is None:
+            self._next_sheet()  # an empty range still gets its (header-only) sheet
+
+
+def _summary_sheet(workbook, formats, start, end, storage):
+    sheet = workbook.add_worksheet("Summary")
+    sheet.set_column(0, 0, 28)
+    sheet.set_column(1, 1, 16)
+    bold, money = formats["header"], formats["money"]
+    sheet.write_string(0, 0, "Fairandlovely - Financial Summary", formats["title"])
+    sheet.write_string(1, 0, f"Period: {start or 'beginning'} to {end or 'today'}")
+    sheet.write_string(2, 0, f"Generated On: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    # From the daily rollups, so the summary never loads the ledger itself
+    summary = reports.summary(start, end, storage=storage)
+    rows = [("Total Sales (Incl. GST)", "total_sales"), ("Total Revenue (Excl. GST)", "revenue_ex_gst"),
+            ("GST Collected", "gst_collected"), ("Total Expenses", "expenses"), ("NET PROFIT/LOSS", "net_profit")]
+    sheet.write_row(4, 0, ["Metric", "Value"], bold)
+    for i, (label, key) in enumerate(rows, start=5):
+        sheet.write_string(i, 0, label, bold if key == "net_profit" else None)
+        sheet.write_number(i, 1, summary[key], money)
+
+
+def export_workbook(path=None, start=None, end=None, storage=None, chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """Writes an .xlsx with Summary, Sales and Expenses sheets for the inclusive [start, end] range.
+    Uses xlsxwriter's constant_memory mode and streams the ledger (storage.iter_sales), so RAM stays
+    bounded however many rows are exported. Amounts are numeric cells and dates are real Excel
+    dates. `path` is a filename or a binary buffer (default: a file in EXPORT_FOLDER). progress(report)
+    is called after each chunk. Returns the report dict (path, rows, rows_per_s).
+    """
+    if storage is None:
+        from modules.storage import get_storage
+        storage = get_storage()
+    if path is None:
+        os.makedirs(EXPORT_FOLDER, exist_ok=True)
+        path = os.path.join(EXPORT_FOLDER, f"Ledger_{start or 'all'}_to_{end or 'all'}.xlsx")
+    started = time.perf_counter()
+    report = {"path": path, "sales_rows": 0, "expense_rows": 0, "rows": 0, "sheets": 0}
+
+    def tick():
+        report["rows"] = report["sales_rows"] + report["expense_rows"]
+        report["seconds"] = time.perf_counter() - started
+        report["rows_per_s"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+        if progress:
+            progress(report)
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        formats = {
+            "header": workbook.add_format({"bold": True, "bg_color": "#D9D9D9"}),
+            "title": workbook.add_format({"bold": True, "font_size": 14}),
+            "money": workbook.add_format({"num_format": MONEY_FORMAT}),
+            "number": None,
+            "datetime": workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"}),
+            "date": workbook.add_format({"num_format": "yyyy-mm-dd"}),
+        }
+        # Constant-memory sheets are written top to bottom, one at a time, in tab order
+        _summary_sheet(workbook, formats, start, end, storage)
+
+        sales = _SheetStream(workbook, "Sales", SALES_HEADERS, formats)
+        for chunk in storage.iter_sales(start, end, chunk_rows):
+            sales.write([chunk["invoice_no"].tolist(), _serials(chunk["date"]), _text(chunk["customer"]),
+                         _text(chunk["service"]), chunk["price"].tolist(), chunk["gst"].astype("float64").tolist(),
+                         chunk["total"].tolist()],
+                        ["number", "datetime", "text", "text", "money", "number", "money"])
+            report["sales_rows"] += len(chunk)
+            tick()
+        sales.close()
+
+        expenses = _SheetStream(workbook, "Expenses", EXPENSE_HEADERS, formats)
+        df = storage.load_expenses(start, end)
+        for offset in range(0, len(df), chunk_rows):
+            chunk = df.iloc[offset:offset + chunk_rows]
+            expenses.write([_serials(chunk["date"]), _text(chunk["description"]), chunk["amount"].tolist()],
+                           ["date", "text", "money"])
+            report["expense_rows"] += len(chunk)
+            tick()
+        expenses.close()
+        report["sheets"] = 1 + sales.sheets + expenses.sheets
+    finally:
+        workbook.close()
+    tick()
+    return report
+
+
+def _print_progress(report):
+    print(f"\r{report['rows']:>12,} rows  {report['rows_per_s']:>10,.0f} rows/s", end="", file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    # python -m modules.excel_export [OUT.xlsx] [START END]
+    out = sys.argv[1] if len(sys.argv) > 1 else None
+    first, last = (sys.argv[2], sys.argv[3]) if len(sys.argv) > 3 else (None, None)
+    result = export_workbook(out, first, last, progress=_print_progress)
+    print(file=sys.stderr)
+    print(result)
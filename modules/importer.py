@@ -0,0 +1,282 @@
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from modules.schema import SALES_COLUMNS, EXPENSE_COLUMNS, parse_sales, parse_expenses
+from modules.sequence import reserve_invoice_numbers
+
+# Rows per chunk: memory stays bounded by this, not by the size of the file
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Header spellings seen in other POS / accounting exports, normalised by _normalise_header
+SALES_ALIASES = {
+    "invoice_no": ["invoice no", "invoice", "invoice number", "bill no", "bill", "bill number", "receipt no", "receipt"],
+    "date": ["date", "datetime", "timestamp", "bill date", "invoice date", "sale date"],
+    "customer": ["customer", "customer name", "client", "client name", "name"],
+    "service": ["service", "service name", "item", "item name", "product", "particulars"],
+    "price": ["price", "rate", "amount", "base", "taxable", "taxable value"],
+    "gst": ["gst", "gst %", "gst rate", "tax rate", "tax %"],
+    "total": ["total", "line total", "net", "net amount", "grand total", "total amount"],
+}
+EXPENSE_ALIASES = {
+    "date": ["date", "expense date", "txn date", "transaction date"],
+    "description": ["description", "expense", "narration", "particulars", "details", "item"],
+    "amount": ["amount", "value", "debit", "expense amount", "total"],
+}
+WALK_IN_CUSTOMER = "Walk-in"
+UNSPECIFIED_SERVICE = "Unspecified"
+
+
+def _normalise_header(name):
+    return re.sub(r"[\s_\-.]+", " ", str(name)).strip().lower()
+
+
+def _rename(df, aliases):
+    """Maps the source headers onto schema columns; the first alias that is present wins."""
+    headers = {_normalise_header(c): c for c in df.columns}
+    mapping = {}
+    for column, names in aliases.items():
+        for name in names:
+            if name in headers and headers[name] not in mapping:
+                mapping[headers[name]] = column
+                break
+    return df[list(mapping)].rename(columns=mapping)
+
+
+def _to_number(values):
+    numbers = pd.to_numeric(values, errors="coerce")
+    retry = numbers.isna() & values.notna()
+    if retry.any():
+        # Exports often carry currency symbols and thousands separators ("Rs. 1,250.00")
+        cleaned = values[retry].astype(str).str.replace(",", "", regex=False)
+        numbers[retry] = pd.to_numeric(cleaned.str.extract(r"(-?\d+(?:\.\d+)?)", expand=False), errors="coerce")
+    return numbers
+
+
+def _to_date(values, dayfirst):
+    """ISO stamps take the fast path. Other layouts ("05/03/2021 14:10") follow `dayfirst`:
+    the format is guessed once from a sample and applied to the whole column, and only
+    the values that still fail fall back to slow per-value parsing.
+    """
+    parsed = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        fmt = None
+        for sample in values[retry].head(20):
+            fmt = guess_datetime_format(str(sample), dayfirst=dayfirst)
+            if fmt:
+                break
+        if fmt:
+            parsed[retry] = pd.to_datetime(values[retry], format=fmt, errors="coerce")
+            retry = parsed.isna() & values.notna()
+        if retry.any():
+            parsed[retry] = pd.to_datetime(values[retry], format="mixed", dayfirst=dayfirst, errors="coerce")
+    return parsed
+
+
+def _to_text(values, default):
+    if values is None:
+        return default
+    missing = values.isna()
+    values = values.astype(str).str.strip()
+    return values.mask(missing | values.isin(["", "nan", "None", "NaN", "<NA>"]), default)
+
+
+# ===============================
+# SOURCE READERS
+# ===============================
+def _excel_chunks(path, chunk_rows):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("Importing Excel files needs openpyxl (pip install openpyxl)") from None
+    # read_only streams the sheet row by row instead of building the whole workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(h) if h is not None else "" for h in next(rows, [])]
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        wb.close()
+
+
+def read_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yields the source file as DataFrames of at most `chunk_rows` rows (CSV or .xlsx)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        yield from _excel_chunks(path, chunk_rows)
+    elif ext in (".csv", ".txt", ""):
+        # Everything as text: numbers and dates are validated per column below
+        yield from pd.read_csv(path, chunksize=chunk_rows, dtype=str, skipinitialspace=True)
+    else:
+        raise ValueError(f"Unsupported import file type: {ext} (use .csv or .xlsx)")
+
+
+# ===============================
+# VALIDATION / NORMALISATION
+# ===============================
+def normalise_sales(chunk, dayfirst=True):
+    """Maps a raw chunk onto the sales schema. Returns (rows, rejected): rows still carry the
+    source bill key in '_bill' for invoice numbering; rejected rows carry a 'reason'.
+    """
+    df = _rename(chunk, SALES_ALIASES)
+    if "date" not in df or ("price" not in df and "total" not in df):
+        raise ValueError("Sales import needs a date column and a price or total column")
+
+    price = _to_number(df["price"]) if "price" in df else None
+    total = _to_number(df["total"]) if "total" in df else None
+    gst = _to_number(df["gst"]) if "gst" in df else None
+    if gst is None:
+        # No rate column: infer it when both amounts are there, otherwise treat as untaxed
+        gst = ((total / price - 1) * 100).round(2) if price is not None and total is not None else 0.0
+        gst = pd.Series(gst, index=df.index)
+    if price is None:
+        price = (total / (1 + gst / 100)).round(2)
+    if total is None:
+        total = (price * (1 + gst / 100)).round(2)
+
+    out = pd.DataFrame({
+        "date": _to_date(df["date"], dayfirst),
+        "customer": _to_text(df.get("customer"), WALK_IN_CUSTOMER),
+        "service": _to_text(df.get("service"), UNSPECIFIED_SERVICE),
+        "price": price,
+        "gst": gst,
+        "total": total,
+    }, index=df.index)
+    out = parse_sales(out.assign(invoice_no=0)).set_axis(df.index)
+
+    reason = pd.Series("", index=df.index)
+    reason = reason.mask(out["total"].isna() | out["price"].isna() | (out["price"] < 0), "bad amount")
+    reason = reason.mask(~out["gst"].between(0, 100), "bad gst rate")
+    reason = reason.mask(out["date"].isna(), "bad date")
+    bad = reason != ""
+
+    # Lines of one bill share a key: the source bill number, else the customer's visit that day
+    if "invoice_no" in df:
+        out["_bill"] = _to_text(df["invoice_no"], "")
+    else:
+        out["_bill"] = out["date"].dt.strftime("%Y-%m-%d") + "|" + out["customer"].astype(str)
+    return out[~bad], chunk[bad].assign(reason=reason[bad])
+
+
+def normalise_expenses(chunk, dayfirst=True):
+    df = _rename(chunk, EXPENSE_ALIASES)
+    if "date" not in df or "amount" not in df:
+        raise ValueError("Expense import needs a date column and an amount column")
+    out = parse_expenses(pd.DataFrame({
+        "date": _to_date(df["date"], dayfirst),
+        "description": _to_text(df.get("description"), UNSPECIFIED_SERVICE),
+        "amount": _to_number(df["amount"]),
+    }, index=df.index)).set_axis(df.index)
+
+    reason = pd.Series("", index=df.index)
+    reason = reason.mask(out["amount"].isna() | (out["amount"] < 0), "bad amount")
+    reason = reason.mask(out["date"].isna(), "bad date")
+    bad = reason != ""
+    return out[~bad], chunk[bad].assign(reason=reason[bad])
+
+
+def _number_invoices(rows, carry):
+    """Gives each run of consecutive lines with the same bill key one new invoice number.
+    `carry` is (last bill key, its invoice number) from the previous chunk, so a bill split
+    across a chunk boundary keeps one number. Returns (new carry, invoices started).
+    """
+    bill = rows["_bill"].to_numpy()
+    new_run = np.empty(len(bill), dtype=bool)
+    new_run[0] = bill[0] != carry[0]
+    new_run[1:] = bill[1:] != bill[:-1]
+    runs = np.cumsum(new_run)
+    count = int(runs[-1])
+    first = reserve_invoice_numbers(count)[0] if count else 0
+    # Run 0 is the continuation of the previous chunk's last bill
+    rows["invoice_no"] = np.where(runs == 0, carry[1] or 0, first + runs - 1).astype("int32")
+    return (bill[-1], int(rows["invoice_no"].iat[-1])), count
+
+
+# ===============================
+# BULK IMPORT
+# ===============================
+def _import(path, table, storage, chunk_rows, rejects_file, progress, dayfirst):
+    if storage is None:
+        from modules.storage import get_storage
+        storage = get_storage()
+    started = time.perf_counter()
+    report = {"table": table, "source": path, "rows": 0, "imported": 0, "rejected": 0, "invoices": 0}
+    carry = (None, None)
+    first_rejects = True
+    for chunk in read_chunks(path, chunk_rows):
+        if table == "sales":
+            rows, rejected = normalise_sales(chunk, dayfirst)
+            if len(rows):
+                carry, started_bills = _number_invoices(rows, carry)
+                report["invoices"] += started_bills
+                storage.append_sales_frame(rows[SALES_COLUMNS].reset_index(drop=True))
+        else:
+            rows, rejected = normalise_expenses(chunk, dayfirst)
+            if len(rows):
+                storage.append_expenses_frame(rows[EXPENSE_COLUMNS].reset_index(drop=True))
+
+        if rejects_file and len(rejected):
+            rejected.to_csv(rejects_file, mode="w" if first_rejects else "a", header=first_rejects, index=False)
+            first_rejects = False
+        report["rows"] += len(chunk)
+        report["imported"] += len(rows)
+        report["rejected"] += len(rejected)
+        report["seconds"] = time.perf_counter() - started
+        report["rows_per_s"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+        if progress:
+            progress(report)
+    report.setdefault("seconds", time.perf_counter() - started)
+    report.setdefault("rows_per_s", 0.0)
+    return report
+
+
+def import_sales(path, storage=None, chunk_rows=DEFAULT_CHUNK_ROWS, rejects_file=None, progress=None,
+                 dayfirst=True):
+    """Streams a sales export (CSV or .xlsx) into the ledger `chunk_rows` at a time.
+    Columns are matched by common header names; missing price/total/GST values are derived
+    from the others. Every bill gets a fresh invoice number from the shared sequence.
+    Invalid rows are skipped (and written to `rejects_file` with a reason, if given).
+    Non-ISO dates are read day-first (05/03/2021 is 5 March) unless dayfirst=False.
+    progress(report) is called after each chunk. Returns the final report dict.
+    """
+    return _import(path, "sales", storage, chunk_rows, rejects_file, progress, dayfirst)
+
+
+def import_expenses(path, storage=None, chunk_rows=DEFAULT_CHUNK_ROWS, rejects_file=None, progress=None,
+                    dayfirst=True):
+    """Streams an expense export (CSV or .xlsx) into expenses, like import_sales."""
+    return _import(path, "expenses", storage, chunk_rows, rejects_file, progress, dayfirst)
+
+
+def _print_progress(report):
+    print(f"\r{report['rows']:>12,} rows  {report['rejected']:>8,} rejected  "
+          f"{report['rows_per_s']:>10,.0f} rows/s", end="", file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    # python -m modules.importer sales|expenses FILE [CHUNK_ROWS]
+    if len(sys.argv) < 3 or sys.argv[1] not in ("sales", "expenses"):
+        print("usage: python -m modules.importer sales|expenses FILE [CHUNK_ROWS]")
+        sys.exit(1)
+    table, source = sys.argv[1], sys.argv[2]
+    rows = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_CHUNK_ROWS
+    rejects = os.path.splitext(source)[0] + ".rejected.csv"
+    run = import_sales if table == "sales" else import_expenses
+    result = run(source, chunk_rows=rows, rejects_file=rejects, progress=_print_progress)
+    print(file=sys.stderr)
+    print(result)
+    if result["rejected"]:
+        print("Rejected rows written to", rejects)
@@ -1,124 +1,298 @@
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Flowable
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_RIGHT
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 from datetime import datetime
-import pandas as pd
+import io
 import os
+import threading
 
-from modules.paths import INVOICE_FOLDER, SALES_FILE as DATA_FILE
+from modules import invoice_archive
+from modules.locks import atomic_write
+from modules.paths import INVOICE_FOLDER
+from modules.storage import get_storage
 
 # ===============================
-# GENERATE INVOICE PDF (REDESIGNED)
+# INVOICE TEMPLATE
 # ===============================
-def generate_invoice_pdf(invoice_no, customer, items, total, address="", contact=""):
-    filename = os.path.join(INVOICE_FOLDER, f"Invoice_{invoice_no}.pdf")
-    doc = SimpleDocTemplate(filename, pagesize=A4, rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=40)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Custom Styles
-    styles['Title'].fontSize = 28
-    styles['Title'].alignment = 2 # Right
-    styles['Heading1'].fontSize = 14
-    
-    # --- 1. HEADER SECTION (Business Info vs "INVOICE") ---
-    business_info = [
-        [Paragraph("<b>Fairandlovely</b><br/>Opp P.O junction , MUVATTUPUZHA<br/>Phone: +91 9495126954", styles['Normal']),
-         Paragraph("INVOICE", styles['Title'])]
-    ]
-    header_table = Table(business_info, colWidths=[3.5*inch, 3*inch])
-    header_table.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP')]))
-    elements.append(header_table)
-    elements.append(Spacer(1, 40))
-
-    # --- 2. INFORMATION SECTION (Customer vs Invoice Info) ---
-    info_data = [
-        [Paragraph(f"<b>BILL TO:</b><br/>{customer}<br/>{address if address else 'No Address Provided'}<br/>Contact: {contact if contact else 'Not Provided'}", styles['Normal']),
-         Table([
-             ["Invoice #", str(invoice_no)],
-             ["Invoice Date", datetime.now().strftime('%m/%d/%Y')],
-             ["Due Date", datetime.now().strftime('%m/%d/%Y')]
-         ], colWidths=[1.2*inch, 1*inch])]
-    ]
-    info_table = Table(info_data, colWidths=[4*inch, 2.5*inch])
-    info_table.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('ALIGN', (1,0), (1,0), 'RIGHT'),
-        ('GRID', (1,0), (1,0), 0.5, colors.white), # Invisible grid for spacing
-    ]))
-    elements.append(info_table)
-    elements.append(Spacer(1, 30))
-
-    # --- 3. ITEMS TABLE ---
-    # Header for items table
-    data = [["Service Description", "Unit Price", "GST %", "Quantity", "Amount"]]
-    
-    # Convert input items to match table format (Assuming Quantity 1 for now)
-    subtotal_base = 0
-    for item in items:
-        # items format from main.py: [service, price_str, gst_str, total_str]
-        try:
-            name = item[0]
-            price_val = float(item[1].replace('₹','').replace(',',''))
-            subtotal_base += price_val
-            data.append([name, item[1], item[2], "1.00", item[3]])
-        except:
+MARGIN = 40
+FRAME_PADDING = 6  # SimpleDocTemplate's frame padding; the header is placed as if it were the first flowable
+HEADER_GAP = 40
+# Stamped into each PDF's keywords. Bump after a branding or layout change so that
+# invoice_batch.regenerate_invoices treats existing PDFs as out of date.
+TEMPLATE_VERSION = 1
+TEMPLATE_KEYWORDS = f"fairandlovely-invoice v{TEMPLATE_VERSION}"
+CELL_PADDING = 6  # reportlab's default left/right cell padding
+NOTES = "<b>NOTES:</b> Thank you for your business. Taxes are included in the final total."
+
+INFO_WIDTHS = [4*inch, 2.5*inch]
+DATES_WIDTHS = [1.2*inch, 1*inch]
+ITEMS_WIDTHS = [2.8*inch, 1.1*inch, 0.8*inch, 0.8*inch, 1*inch]
+SUMMARY_WIDTHS = [4.3*inch, 1.2*inch, 1*inch]
+
+INFO_STYLE = TableStyle([
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ('ALIGN', (1,0), (1,0), 'RIGHT'),
+    ('GRID', (1,0), (1,0), 0.5, colors.white), # Invisible grid for spacing
+])
+ITEMS_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#EEEEEE")),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('ALIGN', (1, 1), (1, -1), 'RIGHT'), # Price
+    ('ALIGN', (2, 1), (3, -1), 'CENTER'),# GST % and Quantity
+    ('ALIGN', (4, 1), (4, -1), 'RIGHT'), # Amount
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('GRID', (0, 0), (-1, -1), 0.1, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor("#FAFAFA")])
+])
+SUMMARY_STYLE = TableStyle([
+    ('ALIGN', (1,0), (-1,-1), 'LEFT'),
+    ('ALIGN', (2,0), (-1,-1), 'RIGHT'),
+    ('FONTNAME', (1,3), (2,3), 'Helvetica-Bold'),
+    ('BACKGROUND', (1,3), (2,3), colors.HexColor("#EEEEEE")),
+    ('LINEABOVE', (1,1), (2,1), 1, colors.black),
+    ('LINEBELOW', (1,3), (2,3), 1, colors.black),
+    ('GRID', (1,0), (2,3), 0.1, colors.grey),
+])
+ITEMS_HEADER = ["Service Description", "Unit Price", "GST %", "Quantity", "Amount"]
+
+
+class _Prewrapped(Flowable):
+    """Stands in for a flowable that was laid out once (see InvoiceTemplate) so a document can draw it
+    without wrapping it again. Made per document, since frames keep their canvas on the flowable;
+    the shared inner flowable is drawn under a lock for the same reason.
+    """
+
+    def __init__(self, flowable, size, lock):
+        Flowable.__init__(self)
+        self.flowable, self.lock = flowable, lock
+        self.width, self.height = size
+        self.hAlign = getattr(flowable, "hAlign", "LEFT")
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        return []  # static blocks move to the next page whole
+
+    def draw(self):
+        with self.lock:
+            self.flowable.drawOn(self.canv, 0, 0)
+
+
+class InvoiceTemplate:
+    """Everything about an invoice that does not depend on the sale, built once per process:
+    the paragraph styles, the TableStyles, and the business header and notes already laid out.
+    The header is drawn into a PDF form once per document and stamped on each page, so
+    rendering an invoice only lays out the bill-to block, the line items and the totals.
+    """
+
+    def __init__(self, pagesize=A4):
+        self.pagesize = pagesize
+        self._lock = threading.RLock()  # the header's cells are _Prewrapped too
+        styles = getSampleStyleSheet()
+        self.normal = styles['Normal']
+        self.title = ParagraphStyle("InvoiceTitle", parent=styles['Title'], fontSize=28, alignment=TA_RIGHT)
+
+        self.frame_width = pagesize[0] - 2*MARGIN - 2*FRAME_PADDING
+        business = Paragraph("<b>Fairandlovely</b><br/>Opp P.O junction , MUVATTUPUZHA<br/>Phone: +91 9495126954",
+                             self.normal)
+        title = Paragraph("INVOICE", self.title)
+        widths = [3.5*inch, 3*inch]
+        # Cell paragraphs are laid out here too, or the table would re-break their lines on every draw
+        cells = [_Prewrapped(para, para.wrap(width - 2*CELL_PADDING, pagesize[1]), self._lock)
+                 for para, width in zip([business, title], widths)]
+        header = Table([cells], colWidths=widths, style=TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP')]))
+        notes = Paragraph(NOTES, self.normal)
+        # Laid out once here; documents get _Prewrapped stand-ins
+        self._header = (header, header.wrap(self.frame_width, pagesize[1]))
+        self._notes = (notes, notes.wrap(self.frame_width, pagesize[1]))
+        # The flowing content starts below the header band
+        self.top_margin = MARGIN + self._header[1][1] + HEADER_GAP
+
+    def _static(self, block):
+        return _Prewrapped(*block, self._lock)
+
+    def _first_page(self, canv, doc):
+        canv.beginForm("invoiceHeader")
+        header = self._static(self._header)
+        top = self.pagesize[1] - MARGIN - FRAME_PADDING
+        header.drawOn(canv, MARGIN + FRAME_PADDING, top - header.height, _sW=self.frame_width - header.width)
+        canv.endForm()
+        self._later_pages(canv, doc)
+
+    def _later_pages(self, canv, doc):
+        canv.doForm("invoiceHeader")
+
+    def build(self, filename, invoice_no, customer, items, total, address="", contact="", date=None):
+        """Renders one invoice to `filename` (a path or a binary buffer); `date` (default now) is printed as the invoice and due date."""
+        doc = SimpleDocTemplate(filename, pagesize=self.pagesize, rightMargin=MARGIN, leftMargin=MARGIN,
+                                topMargin=self.top_margin, bottomMargin=MARGIN, keywords=TEMPLATE_KEYWORDS)
+        today = (date or datetime.now()).strftime('%m/%d/%Y')
+
+        # --- Customer vs invoice info ---
+        bill_to = Paragraph(f"<b>BILL TO:</b><br/>{customer}<br/>{address if address else 'No Address Provided'}"
+                            f"<br/>Contact: {contact if contact else 'Not Provided'}", self.normal)
+        dates = Table([["Invoice #", str(invoice_no)], ["Invoice Date", today], ["Due Date", today]],
+                      colWidths=DATES_WIDTHS)
+        info_table = Table([[bill_to, dates]], colWidths=INFO_WIDTHS, style=INFO_STYLE)
+
+        # --- Items (quantity 1 per line) ---
+        # items format from the UIs: [service, price_str, gst_str, total_str]
+        data = [ITEMS_HEADER]
+        subtotal_base = 0
+        for item in items:
+            try:
+                subtotal_base += float(item[1].replace('₹','').replace(',',''))
+            except (AttributeError, ValueError):
+                pass
             data.append([item[0], item[1], item[2], "1.00", item[3]])
+        items_table = Table(data, colWidths=ITEMS_WIDTHS, style=ITEMS_STYLE)
+
+        # --- Summary ---
+        gst_amt = total - subtotal_base
+        summary_table = Table([
+            ["", "Subtotal (Base)", f"₹ {subtotal_base:,.2f}"],
+            ["", "GST Amount", f"₹ {gst_amt:,.2f}"],
+            ["", "Total", f"₹ {total:,.2f}"],
+            ["", "Amount Paid", "0.00"],
+            ["", "Balance Due", f"₹ {total:,.2f}"]
+        ], colWidths=SUMMARY_WIDTHS, style=SUMMARY_STYLE)
+
+        doc.build([info_table, Spacer(1, 30), items_table, Spacer(1, 10), self._static(self._notes), Spacer(1, 20), summary_table],
+                  onFirstPage=self._first_page, onLaterPages=self._later_pages)
+        return filename
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def get_invoice_template():
+    """The process-wide InvoiceTemplate (built on first use)."""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = InvoiceTemplate()
+    return _template
+
 
-    items_table = Table(data, colWidths=[2.8*inch, 1.1*inch, 0.8*inch, 0.8*inch, 1*inch])
-    items_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#EEEEEE")),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (1, 1), (1, -1), 'RIGHT'), # Price
-        ('ALIGN', (2, 1), (3, -1), 'CENTER'),# GST % and Quantity
-        ('ALIGN', (4, 1), (4, -1), 'RIGHT'), # Amount
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 0.1, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor("#FAFAFA")])
-    ]))
-    elements.append(items_table)
-    
-    # Notes area (like in the image)
-    elements.append(Spacer(1, 10))
-    elements.append(Paragraph("<b>NOTES:</b> Thank you for your business. Taxes are included in the final total.", styles['Normal']))
-    elements.append(Spacer(1, 20))
-
-    # --- 4. SUMMARY SECTION ---
-    gst_amt = total - subtotal_base
-    summary_data = [
-        ["", "Subtotal (Base)", f"₹ {subtotal_base:,.2f}"],
-        ["", "GST Amount", f"₹ {gst_amt:,.2f}"],
-        ["", "Total", f"₹ {total:,.2f}"],
-        ["", "Amount Paid", "0.00"],
-        ["", "Balance Due", f"₹ {total:,.2f}"]
-    ]
-    summary_table = Table(summary_data, colWidths=[4.3*inch, 1.2*inch, 1*inch])
-    summary_table.setStyle(TableStyle([
-        ('ALIGN', (1,0), (-1,-1), 'LEFT'),
-        ('ALIGN', (2,0), (-1,-1), 'RIGHT'),
-        ('FONTNAME', (1,3), (2,3), 'Helvetica-Bold'),
-        ('BACKGROUND', (1,3), (2,3), colors.HexColor("#EEEEEE")),
-        ('LINEABOVE', (1,1), (2,1), 1, colors.black),
-        ('LINEBELOW', (1,3), (2,3), 1, colors.black),
-        ('GRID', (1,0), (2,3), 0.1, colors.grey),
-    ]))
-    elements.append(summary_table)
-
-    doc.build(elements)
+# ===============================
+# GENERATE INVOICE PDF (REDESIGNED)
+# ===============================
+# Under the archive folder: where invoice_file extracts an archived PDF for printing or copying
+EXTRACT_SUBFOLDER = "extracted"
+
+
+def invoice_path(invoice_no, folder=INVOICE_FOLDER):
+    return os.path.join(folder, f"Invoice_{invoice_no}.pdf")
+
+
+def _stamped(data):
+    return data is not None and f"/Keywords ({TEMPLATE_KEYWORDS})".encode() in data
+
+
+def is_current(path):
+    """True if the PDF at `path` exists and was rendered with the current TEMPLATE_VERSION."""
+    try:
+        with open(path, "rb") as f:
+            return _stamped(f.read())
+    except OSError:
+        return False
+
+
+def read_invoice_pdf(invoice_no, folder=INVOICE_FOLDER):
+    """The invoice's PDF bytes: its loose file (the latest render) if there is one, else its copy
+    in the monthly archive; None if it has neither.
+    """
+    try:
+        with open(invoice_path(invoice_no, folder), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return invoice_archive.read(invoice_no, folder)
+
+
+def has_invoice_pdf(invoice_no, folder=INVOICE_FOLDER):
+    return os.path.exists(invoice_path(invoice_no, folder)) or invoice_archive.contains(invoice_no, folder)
+
+
+def invoice_is_current(invoice_no, folder=INVOICE_FOLDER):
+    """is_current() for an invoice, loose or archived."""
+    return _stamped(read_invoice_pdf(invoice_no, folder))
+
+
+def invoice_file(invoice_no, folder=INVOICE_FOLDER):
+    """A path to the invoice's PDF for printing or copying: the loose file, or the archived copy
+    extracted to archive/extracted/. Only the latest extraction is kept there, so the folder never
+    grows. None if the invoice has no PDF.
+    """
+    path = invoice_path(invoice_no, folder)
+    if os.path.exists(path):
+        return path
+    data = invoice_archive.read(invoice_no, folder)
+    if data is None:
+        return None
+    extract_folder = os.path.join(invoice_archive.archive_folder(folder), EXTRACT_SUBFOLDER)
+    os.makedirs(extract_folder, exist_ok=True)
+    extracted = os.path.join(extract_folder, os.path.basename(path))
+    with os.scandir(extract_folder) as it:
+        for entry in it:
+            if entry.path != extracted:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass  # still open in the print spooler; cleared next time
+    with atomic_write(extracted, "wb") as f:
+        f.write(data)
+    return extracted
+
+
+def invoice_item(service, price, gst, total):
+    """One invoice line as the template prints it: [service, price, GST %, total]. Checkout and
+    invoice_batch both build lines here, so a re-render prints what checkout printed.
+    """
+    return [service, f"₹{float(price):.2f}", f"{float(gst)}%", f"₹{float(total):.2f}"]
+
+
+def render_invoice_pdf(invoice_no, customer, items, total, address="", contact="", date=None):
+    """The invoice PDF as bytes, rendered in memory."""
+    buffer = io.BytesIO()
+    get_invoice_template().build(buffer, invoice_no, customer, items, total, address, contact, date)
+    return buffer.getvalue()
+
+
+def generate_invoice_pdf(invoice_no, customer, items, total, address="", contact="", date=None, folder=INVOICE_FOLDER):
+    """Renders the invoice and saves it as Invoice_<no>.pdf in `folder`; returns the path."""
+    data = render_invoice_pdf(invoice_no, customer, items, total, address, contact, date)
+    # Written to a temporary file and renamed, so a PDF on disk is always complete
+    filename = invoice_path(invoice_no, folder)
+    with atomic_write(filename, "wb") as f:
+        f.write(data)
     return filename
 
 def delete_invoice(invoice_no):
     invoice_no = int(invoice_no)
-    if os.path.exists(DATA_FILE):
-        df = pd.read_csv(DATA_FILE)
-        df = df[df["invoice_no"] != invoice_no]
-        df.to_csv(DATA_FILE, index=False)
-    pdf_path = os.path.join(INVOICE_FOLDER, f"Invoice_{invoice_no}.pdf")
+    from modules import render_queue
+    render_queue.cancel(invoice_no)
+    get_storage().delete_invoice(invoice_no)
+    pdf_path = invoice_path(invoice_no)
     if os.path.exists(pdf_path):
         os.remove(pdf_path)
+    # After the loose file, so an archive pass running now cannot put it back
+    invoice_archive.remove(invoice_no)
     return True
+
+def void_invoice(invoice_no):
+    """Voids the sale (its rows are kept for audit) and drops any queued render; a PDF already
+    rendered is kept with the rows. Returns the number of lines voided.
+    """
+    invoice_no = int(invoice_no)
+    from modules import render_queue
+    render_queue.cancel(invoice_no)
+    return get_storage().void_invoice(invoice_no)
@@ -0,0 +1,316 @@
+import os
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zipfile
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+
+from modules.locks import atomic_write, file_lock
+from modules.paths import INVOICE_FOLDER
+
+# Loose Invoice_<no>.pdf files older than this are rolled into their month's archive
+ARCHIVE_AFTER_DAYS = 90
+
+# How often a running app rolls up invoices that have aged since the last pass
+ARCHIVE_INTERVAL_SECONDS = 24 * 3600
+
+ARCHIVE_SUBFOLDER = "archive"
+INDEX_NAME = "index.db"
+LOOSE_NAME = re.compile(r"Invoice_(\d+)\.pdf$")
+
+# Zip local file header: signature ... name length, extra length (see the zip APPNOTE, 4.3.7)
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    invoice_no INTEGER PRIMARY KEY,
+    month TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    crc INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_month ON entries (month);
+"""
+
+_thread = None
+_stop = threading.Event()
+_start_lock = threading.Lock()
+
+
+# ===============================
+# LAYOUT
+# ===============================
+# Each invoice folder has an archive/ subfolder of Invoices_<YYYY-MM>.zip containers (stored,
+# not recompressed: the PDFs are already compressed) and an index mapping invoice_no to the
+# month and the byte offset of the PDF inside its container, so one invoice is read with a
+# single seek and never by listing or scanning anything.
+def archive_folder(folder=INVOICE_FOLDER):
+    return os.path.join(folder, ARCHIVE_SUBFOLDER)
+
+
+def month_path(month, folder=INVOICE_FOLDER):
+    return os.path.join(archive_folder(folder), f"Invoices_{month}.zip")
+
+
+def _member(invoice_no):
+    return f"Invoice_{invoice_no}.pdf"
+
+
+@contextmanager
+def _index(folder=INVOICE_FOLDER):
+    os.makedirs(archive_folder(folder), exist_ok=True)
+    conn = sqlite3.connect(os.path.join(archive_folder(folder), INDEX_NAME), timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _writing(folder):
+    """Serialises archive writes across threads and processes (both UIs may run a pass)."""
+    os.makedirs(archive_folder(folder), exist_ok=True)
+    with file_lock(os.path.join(archive_folder(folder), INDEX_NAME)):
+        yield
+
+
+def _scan(path):
+    """[(invoice_no, data offset, size, crc)] of a month container, from its central directory."""
+    entries = []
+    with open(path, "rb") as f, zipfile.ZipFile(f) as zf:
+        for info in zf.infolist():
+            match = LOOSE_NAME.match(info.filename)
+            if not match:
+                continue
+            f.seek(info.header_offset)
+            header = LOCAL_HEADER.unpack(f.read(LOCAL_HEADER.size))
+            offset = info.header_offset + LOCAL_HEADER.size + header[-2] + header[-1]
+            entries.append((int(match.group(1)), offset, info.file_size, info.CRC))
+    return entries
+
+
+def _reindex(conn, month, folder):
+    conn.execute("DELETE FROM entries WHERE month = ?", (month,))
+    path = month_path(month, folder)
+    if os.path.exists(path):
+        conn.executemany("INSERT OR REPLACE INTO entries (invoice_no, month, offset, size, crc) VALUES (?, ?, ?, ?, ?)",
+                         [(n, month, offset, size, crc) for n, offset, size, crc in _scan(path)])
+
+
+# ===============================
+# LOOKUP
+# ===============================
+def locate(invoice_no, folder=INVOICE_FOLDER):
+    """(container path, offset, size, crc) of an archived invoice, or None."""
+    with _index(folder) as conn:
+        row = conn.execute("SELECT month, offset, size, crc FROM entries WHERE invoice_no = ?",
+                           (int(invoice_no),)).fetchone()
+    if row is None:
+        return None
+    month, offset, size, crc = row
+    return month_path(month, folder), offset, size, crc
+
+
+def contains(invoice_no, folder=INVOICE_FOLDER):
+    return locate(invoice_no, folder) is not None
+
+
+def read(invoice_no, folder=INVOICE_FOLDER):
+    """The archived PDF's bytes, or None if the invoice is not archived. One index lookup and one
+    seek; the CRC check catches a container rewritten since the lookup, which is then retried.
+    """
+    for _ in range(3):
+        where = locate(invoice_no, folder)
+        if where is None:
+            return None
+        path, offset, size, crc = where
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read(size)
+            if len(data) == size and zlib.crc32(data) == crc:
+                return data
+        except FileNotFoundError:
+            pass
+        time.sleep(0.05)
+    # Still inconsistent: the index lags its container (a pass was interrupted); rebuild that month's entries
+    with _writing(folder), _index(folder) as conn:
+        row = conn.execute("SELECT month FROM entries WHERE invoice_no = ?", (int(invoice_no),)).fetchone()
+        if row:
+            _reindex(conn, row[0], folder)
+    where = locate(invoice_no, folder)
+    if where is None:
+        return None
+    path, offset, size, _ = where
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+# ===============================
+# WRITING
+# ===============================
+def _write_month(conn, month, folder, add, drop=()):
+    """Rewrites the month's container with the loose files in `add` ({invoice_no: path}) added
+    (replacing any earlier copy) and the invoices in `drop` left out, then re-indexes the month.
+    The other PDFs' stored bytes are copied as they are, and the new container replaces the old
+    one atomically, so an interrupted pass leaves the previous container intact.
+    """
+    path = month_path(month, folder)
+    replaced = {_member(n) for n in add} | {_member(n) for n in drop}
+    keep = {}
+    if os.path.exists(path):
+        with zipfile.ZipFile(path) as old:
+            keep = {info.filename: info for info in old.infolist() if info.filename not in replaced}
+    if keep or add:
+        with atomic_write(path, "wb") as f:
+            with zipfile.ZipFile(f, "w", zipfile.ZIP_STORED) as zf:
+                if keep:
+                    # Closed before the new container replaces it (Windows refuses to replace an open file)
+                    with open(path, "rb") as src:
+                        for info in keep.values():
+                            zf.writestr(info, _stored_bytes(src, info))
+                for invoice_no, loose in sorted(add.items()):
+                    zf.write(loose, _member(invoice_no))
+    elif os.path.exists(path):
+        os.remove(path)
+    _reindex(conn, month, folder)
+
+
+def _stored_bytes(f, info):
+    f.seek(info.header_offset)
+    header = LOCAL_HEADER.unpack(f.read(LOCAL_HEADER.size))
+    f.seek(info.header_offset + LOCAL_HEADER.size + header[-2] + header[-1])
+    return f.read(info.compress_size)
+
+
+def _sale_months(invoice_nos, storage):
+    """{invoice_no: "YYYY-MM" of its earliest dated sale line} for those of `invoice_nos` in the
+    ledger, one get_invoice lookup each (only invoices not archived yet are passed).
+    """
+    months = {}
+    for invoice_no in invoice_nos:
+        dates = storage.get_invoice(invoice_no)["date"].dropna()
+        if not dates.empty:
+            months[invoice_no] = dates.min().strftime("%Y-%m")
+    return months
+
+
+def archive_invoices(older_than_days=ARCHIVE_AFTER_DAYS, folder=INVOICE_FOLDER, progress=None, storage=None):
+    """Rolls loose invoice PDFs not modified for `older_than_days` into the monthly containers and
+    removes the loose files. An invoice goes into its sale month (the month of its PDF's mtime
+    if it is not in the ledger); a re-rendered invoice that is already archived replaces its entry
+    in place, whatever month it is in. The write lock is only held while a month's container is
+    rewritten, so a delete never waits on a whole pass. progress(report) is called after each
+    month. Returns the report dict: archived, months, seconds.
+    """
+    started = time.perf_counter()
+    report = {"archived": 0, "months": 0}
+    cutoff = time.time() - older_than_days * 86400
+    loose = {}
+    with os.scandir(folder) as it:
+        for entry in it:
+            match = LOOSE_NAME.match(entry.name)
+            if match and entry.is_file():
+                st = entry.stat()
+                if st.st_mtime < cutoff:
+                    loose[int(match.group(1))] = (entry.path, st.st_mtime, st.st_size)
+
+    if loose:
+        with _index(folder) as conn:
+            archived = dict(conn.execute("SELECT invoice_no, month FROM entries"))
+        if storage is None:
+            from modules.storage import get_storage
+            storage = get_storage()
+        sold = _sale_months([n for n in loose if n not in archived], storage)
+        by_month = {}
+        for invoice_no, (path, mtime, _) in loose.items():
+            month = (archived.get(invoice_no) or sold.get(invoice_no)
+                     or datetime.fromtimestamp(mtime).strftime("%Y-%m"))
+            by_month.setdefault(month, {})[invoice_no] = path
+        for month, add in sorted(by_month.items()):
+            with _writing(folder), _index(folder) as conn:
+                # Rechecked under the lock: not deleted, and not archived elsewhere, since the lookup
+                now = dict(conn.execute("SELECT invoice_no, month FROM entries"))
+                add = {n: path for n, path in add.items() if os.path.exists(path) and now.get(n, month) == month}
+                if not add:
+                    continue
+                _write_month(conn, month, folder, add)
+                conn.commit()  # the container and its index entries are durable before the loose files go
+                for invoice_no in add:
+                    path, mtime, size = loose[invoice_no]
+                    try:
+                        st = os.stat(path)
+                        if (st.st_mtime, st.st_size) == (mtime, size):  # not re-rendered meanwhile
+                            os.remove(path)
+                    except FileNotFoundError:
+                        pass
+            report["archived"] += len(add)
+            report["months"] += 1
+            if progress:
+                progress(report)
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+
+def remove(invoice_no, folder=INVOICE_FOLDER):
+    """Drops an invoice from its container (e.g. the invoice was deleted). True if it was archived."""
+    invoice_no = int(invoice_no)
+    # Checked under the write lock: a pass may be archiving this invoice's loose file right now
+    with _writing(folder), _index(folder) as conn:
+        row = conn.execute("SELECT month FROM entries WHERE invoice_no = ?", (invoice_no,)).fetchone()
+        if row is None:
+            return False
+        _write_month(conn, row[0], folder, {}, drop=[invoice_no])
+    return True
+
+
+# ===============================
+# BACKGROUND PASS
+# ===============================
+def _run(folder):
+    while not _stop.is_set():
+        try:
+            archive_invoices(folder=folder)
+        except Exception as e:
+            # The loose files stay where they are and the next pass tries again
+            print(f"Invoice archive pass failed: {type(e).__name__}: {e}", file=sys.stderr)
+        _stop.wait(ARCHIVE_INTERVAL_SECONDS)
+
+
+def start(folder=INVOICE_FOLDER):
+    """Runs archive_invoices now and then every ARCHIVE_INTERVAL_SECONDS on a background thread
+    (idempotent per process).
+    """
+    global _thread
+    with _start_lock:
+        if _thread is not None and _thread.is_alive():
+            return _thread
+        _stop.clear()
+        _thread = threading.Thread(target=_run, args=(folder,), name="invoice-archive", daemon=True)
+        _thread.start()
+        return _thread
+
+
+def stop():
+    _stop.set()
+
+
+def _print_progress(report):
+    print(f"\r{report['archived']:>8,} archived  {report['months']:>4,} months", end="", file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    # python -m modules.invoice_archive [DAYS]
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else ARCHIVE_AFTER_DAYS
+    result = archive_invoices(days, progress=_print_progress)
+    print(file=sys.stderr)
+    print(result)
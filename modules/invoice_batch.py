@@ -0,0 +1,204 @@
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from modules import customers
+from modules.invoice import generate_invoice_pdf, invoice_is_current, invoice_item
+from modules.paths import INVOICE_FOLDER
+from modules.storage import EXPORT_CHUNK_ROWS
+
+# Invoices per pool task: enough to amortise pickling and scheduling, few enough to keep every core busy
+BATCH_SIZE = 25
+
+# Batches in flight per worker; the ledger is streamed, so memory stays flat however many invoices there are
+QUEUED_PER_WORKER = 4
+
+# Failures listed in the report (all are counted)
+MAX_ERRORS = 20
+
+
+# ===============================
+# LEDGER -> INVOICES
+# ===============================
+def _invoice_lines(frames):
+    """Yields (invoice_no, lines) per run of adjacent rows of one invoice in date-ordered sales
+    frames, even across chunk boundaries, where lines are (date, customer, service, price, gst,
+    total). A checkout writes all of an invoice's lines together with one timestamp, so for those
+    the run is the whole invoice; see _mixed_invoices for the others.
+    """
+    current, lines = None, []
+    for df in frames:
+        for row in zip(df["invoice_no"].tolist(), df["date"].tolist(), df["customer"].tolist(),
+                       df["service"].tolist(), df["price"].tolist(), df["gst"].tolist(), df["total"].tolist()):
+            if row[0] != current:
+                if lines:
+                    yield current, lines
+                current, lines = row[0], []
+            lines.append(row[1:])
+    if lines:
+        yield current, lines
+
+
+def _job(invoice_no, lines):
+    """(invoice_no, customer, items, total, date) in the shape generate_invoice_pdf takes."""
+    dates = [d for d, *_ in lines if d == d]  # NaT != NaT
+    customer = next((c for _, c, *_ in reversed(lines) if c == c and c is not None), "")
+    items = [invoice_item(service if service == service else "", price, gst, total)
+             for _, _, service, price, gst, total in lines]
+    total = sum(total for *_, total in lines)
+    return int(invoice_no), customer, items, total, min(dates) if dates else None
+
+
+def ledger_invoice(invoice_no, storage):
+    """The generate_invoice_pdf arguments for one invoice, rebuilt from the ledger and the customer
+    index: (invoice_no, customer, items, total, date, contact, address). None if it has no lines.
+    """
+    for number, lines in _invoice_lines([storage.get_invoice(invoice_no)]):
+        job = _job(number, lines)
+        return job + customers.contacts([job[1]])[job[1]]
+    return None
+
+
+def _mixed_invoices(frames):
+    """Invoice numbers whose lines in the date-ordered `frames` are not one run with one timestamp:
+    edited bills and imported history, whose lines can be interleaved with other invoices or
+    spread over partitions.
+    """
+    seen, mixed = set(), set()
+    current = stamp = None
+    for df in frames:
+        for invoice_no, date in zip(df["invoice_no"].tolist(), df["date"].tolist()):
+            if invoice_no != current:
+                if invoice_no in seen:
+                    mixed.add(invoice_no)
+                seen.add(invoice_no)
+                current, stamp = invoice_no, date
+            elif date != stamp:  # NaT != NaT, so undated lines count as mixed too
+                mixed.add(invoice_no)
+    return mixed
+
+
+def _ledger_invoices(storage, start, end, invoice_nos, chunk_rows):
+    """Yields (invoice_no, lines) once per invoice with all of its lines. A date range is streamed
+    twice: first to find the mixed invoices, which are then fetched whole with get_invoice where
+    they first appear, so a partial invoice never overwrites a full PDF.
+    """
+    if invoice_nos is not None:
+        for invoice_no in sorted({int(n) for n in invoice_nos}):
+            yield from _invoice_lines([storage.get_invoice(invoice_no)])
+        return
+    mixed, fetched = _mixed_invoices(storage.iter_sales(start, end, chunk_rows)), set()
+    for invoice_no, lines in _invoice_lines(storage.iter_sales(start, end, chunk_rows)):
+        if invoice_no not in mixed:
+            yield invoice_no, lines
+        elif invoice_no not in fetched:  # later runs of it are skipped
+            fetched.add(invoice_no)
+            yield from _invoice_lines([storage.get_invoice(invoice_no)])
+
+
+# ===============================
+# RENDERING
+# ===============================
+def _render_batch(jobs, folder):
+    """Pool task: renders each job, returning [(invoice_no, error or None)]. The invoice template
+    is built once per worker process.
+    """
+    results = []
+    for invoice_no, customer, items, total, date, contact, address in jobs:
+        try:
+            generate_invoice_pdf(invoice_no, customer, items, total, address or "", contact or "", date, folder)
+            results.append((invoice_no, None))
+        except Exception as e:
+            results.append((invoice_no, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def regenerate_invoices(start=None, end=None, invoice_nos=None, force=False, workers=None, folder=INVOICE_FOLDER,
+                        storage=None, chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """Re-renders the PDF of every invoice in the inclusive [start, end] date range, or of the
+    invoice numbers in `invoice_nos`, from the sales ledger, on a pool of `workers` processes
+    (default: one per core; 1 renders in this process). PDFs already rendered with the current
+    invoice.TEMPLATE_VERSION are skipped unless `force`. progress(report) is called as batches
+    finish. Returns the report dict: invoices, rendered, skipped, failed, errors, invoices_per_s.
+    """
+    if storage is None:
+        from modules.storage import get_storage
+        storage = get_storage()
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(folder, exist_ok=True)
+    started = time.perf_counter()
+    report = {"invoices": 0, "rendered": 0, "skipped": 0, "failed": 0, "errors": [], "workers": workers}
+
+    def tick():
+        report["seconds"] = time.perf_counter() - started
+        report["invoices_per_s"] = report["rendered"] / report["seconds"] if report["seconds"] else 0.0
+        if progress:
+            progress(report)
+
+    def collect(results):
+        for invoice_no, error in results:
+            if error is None:
+                report["rendered"] += 1
+            else:
+                report["failed"] += 1
+                if len(report["errors"]) < MAX_ERRORS:
+                    report["errors"].append((invoice_no, error))
+        tick()
+
+    def batches():
+        batch = []
+        for invoice_no, lines in _ledger_invoices(storage, start, end, invoice_nos, chunk_rows):
+            report["invoices"] += 1
+            if not force and invoice_is_current(invoice_no, folder):
+                report["skipped"] += 1
+                continue
+            batch.append(_job(invoice_no, lines))
+            if len(batch) == BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def with_contacts(batch):
+        details = customers.contacts({customer for _, customer, *_ in batch})
+        return [job + details.get(job[1], (None, None)) for job in batch]
+
+    if workers <= 1:
+        for batch in batches():
+            collect(_render_batch(with_contacts(batch), folder))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for batch in batches():
+                pending.add(pool.submit(_render_batch, with_contacts(batch), folder))
+                if len(pending) >= workers * QUEUED_PER_WORKER:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future.result())
+            for future in wait(pending).done:
+                collect(future.result())
+    tick()
+    return report
+
+
+def _print_progress(report):
+    print(f"\r{report['rendered']:>8,} rendered  {report['skipped']:>8,} up to date  {report['failed']:>6,} failed  "
+          f"{report['invoices_per_s']:>8,.1f} invoices/s", end="", file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    # python -m modules.invoice_batch [--force] [START END | INVOICE_NO ...]
+    args = sys.argv[1:]
+    force = "--force" in args
+    args = [a for a in args if a != "--force"]
+    if len(args) == 2 and all("-" in a for a in args):
+        result = regenerate_invoices(args[0], args[1], force=force, progress=_print_progress)
+    elif all(a.isdigit() for a in args):
+        result = regenerate_invoices(invoice_nos=[int(a) for a in args] or None, force=force,
+                                     progress=_print_progress)
+    else:
+        print("usage: python -m modules.invoice_batch [--force] [START END | INVOICE_NO ...]")
+        sys.exit(1)
+    print(file=sys.stderr)
+    print(result)
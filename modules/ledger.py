@@ -0,0 +1,293 @@
+import csv
+import io
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from modules.cache import file_signature
+from modules.locks import atomic_write, atomic_write_csv
+from modules.paths import SALES_FILE, SALES_PARTITION_FOLDER
+from modules.schema import SALES_COLUMNS
+
+TOMBSTONE_COLUMNS = ["invoice_no", "kind", "recorded_at"]
+TOMBSTONE_KINDS = ("delete", "void")
+
+# ===============================
+# APPEND-ONLY SALES LEDGER
+# ===============================
+def append_sales(rows, path=SALES_FILE):
+    """Appends invoice line items to the end of the sales ledger.
+    Only the new rows are written; the header is written once, when the file is new or empty.
+    rows: iterable of dicts keyed by SALES_COLUMNS.
+    """
+    return _append_csv(rows, path, SALES_COLUMNS)
+
+
+def _is_new(path):
+    return not os.path.exists(path) or os.path.getsize(path) == 0
+
+
+def _needs_newline(path):
+    # Guard against a hand-edited file whose last line has no line break
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) not in (b"\n", b"\r")
+
+
+def _append_csv(rows, path, columns):
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    new_file = _is_new(path)
+    needs_newline = not new_file and _needs_newline(path)
+
+    # Build the whole chunk first so it reaches the file in a single write
+    buf = io.StringIO()
+    if needs_newline:
+        buf.write("\n")
+    writer = csv.DictWriter(buf, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+    if new_file:
+        writer.writeheader()
+    writer.writerows(rows)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        f.write(buf.getvalue())
+    return len(rows)
+
+
+def append_frame(df, path, date_format=None):
+    """DataFrame counterpart of append_sales for bulk writes: one vectorised to_csv append.
+    Datetime columns are written with `date_format`.
+    """
+    if df.empty:
+        return 0
+    new_file = _is_new(path)
+    if not new_file and _needs_newline(path):
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            f.write("\n")
+    df.to_csv(path, mode="a", header=new_file, index=False, lineterminator="\n", date_format=date_format)
+    return len(df)
+
+
+# ===============================
+# DATE-PARTITIONED SALES LEDGER
+# ===============================
+# "month" (default), "year" or "day"; only used when a new ledger is created,
+# an existing ledger keeps the scheme recorded in its manifest.
+PARTITION_SCHEME = os.environ.get("FAIRANDLOVELY_PARTITION", "month")
+_KEY_FORMATS = {"month": "%Y-%m", "year": "%Y", "day": "%Y-%m-%d"}
+_PERIOD_FREQ = {"month": "M", "year": "Y", "day": "D"}
+UNDATED = "undated"
+
+
+class PartitionedLedger:
+    """Sales ledger split into one CSV per period under SALES_PARTITION_FOLDER.
+    manifest.json records each partition's date range, invoice range and row count,
+    so readers only open the partitions that overlap the requested dates.
+    Mutating methods expect the caller to hold the sales write lock.
+    """
+
+    def __init__(self, folder=SALES_PARTITION_FOLDER, scheme=PARTITION_SCHEME):
+        self.folder = folder
+        self.manifest_file = os.path.join(folder, "manifest.json")
+        self.tombstone_file = os.path.join(folder, "tombstones.csv")
+        self.voided_file = os.path.join(folder, "voided.csv")
+        os.makedirs(folder, exist_ok=True)
+        self._memory = (None, None)
+        self._tombstones = (None, {})
+        self._memory_lock = threading.Lock()
+        self.scheme = self.manifest().get("scheme") or scheme
+        if self.scheme not in _KEY_FORMATS:
+            raise ValueError(f"Unknown partition scheme: {self.scheme}")
+
+    # --- Manifest ---
+    def manifest(self):
+        signature = file_signature(self.manifest_file)
+        with self._memory_lock:
+            if self._memory[0] == signature:
+                return self._memory[1]
+        try:
+            with open(self.manifest_file, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {"scheme": None, "partitions": {}}
+        with self._memory_lock:
+            self._memory = (signature, manifest)
+        return manifest
+
+    def _write_manifest(self, partitions):
+        with atomic_write(self.manifest_file) as f:
+            json.dump({"scheme": self.scheme, "partitions": partitions}, f, indent=1, sort_keys=True)
+
+    def _partitions_copy(self):
+        return {key: dict(info) for key, info in self.manifest()["partitions"].items()}
+
+    # --- Partition lookup ---
+    def partition_key(self, date_value):
+        try:
+            return datetime.strptime(str(date_value)[:10], "%Y-%m-%d").strftime(_KEY_FORMATS[self.scheme])
+        except ValueError:
+            return UNDATED
+
+    def partition_path(self, key):
+        return os.path.join(self.folder, f"sales_{key}.csv")
+
+    def partitions(self, start=None, end=None):
+        """Keys of the partitions whose recorded date range overlaps [start, end] (dates or None)."""
+        keys = []
+        for key, info in sorted(self.manifest()["partitions"].items()):
+            if start is None and end is None:
+                keys.append(key)
+            elif info.get("min_date") is None:
+                continue  # undated rows never match a date filter
+            elif (start is None or info["max_date"][:10] >= start.isoformat()) and \
+                 (end is None or info["min_date"][:10] <= end.isoformat()):
+                keys.append(key)
+        return keys
+
+    def partitions_with_invoice(self, invoice_no):
+        return [key for key, info in sorted(self.manifest()["partitions"].items())
+                if info["min_invoice"] <= invoice_no <= info["max_invoice"]]
+
+    def last_invoice_no(self):
+        partitions = self.manifest()["partitions"]
+        if not partitions:
+            return None
+        return max(info["max_invoice"] for info in partitions.values())
+
+    # --- Writes ---
+    @staticmethod
+    def _merge_stats(info, dates, invoices, rows):
+        info = dict(info or {"min_date": None, "max_date": None, "min_invoice": None, "max_invoice": None, "rows": 0})
+        for field, values in (("date", [d for d in dates if d]), ("invoice", invoices)):
+            if values:
+                lo, hi = min(values), max(values)
+                info[f"min_{field}"] = lo if info[f"min_{field}"] is None else min(info[f"min_{field}"], lo)
+                info[f"max_{field}"] = hi if info[f"max_{field}"] is None else max(info[f"max_{field}"], hi)
+        info["rows"] += rows
+        return info
+
+    def append(self, rows):
+        """Appends rows to their partitions. Returns [(key, rows, signature_before, signature_after)]."""
+        groups = {}
+        for row in rows:
+            groups.setdefault(self.partition_key(row["date"]), []).append(row)
+        partitions = self._partitions_copy()
+        written = []
+        for key, group in groups.items():
+            path = self.partition_path(key)
+            before = file_signature(path)
+            append_sales(group, path=path)
+            dates = [str(r["date"]) for r in group] if key != UNDATED else []
+            partitions[key] = self._merge_stats(partitions.get(key), dates, [int(r["invoice_no"]) for r in group], len(group))
+            written.append((key, group, before, file_signature(path)))
+        self._write_manifest(partitions)
+        return written
+
+    def append_frame(self, df, dates=None):
+        """Bulk counterpart of append(): routes a frame of SALES_COLUMNS rows to partitions with
+        one groupby and one CSV append per partition. `dates` is the parsed date column if
+        the caller already has it. Returns the keys written.
+        """
+        dates = pd.to_datetime(df["date"], errors="coerce") if dates is None else dates
+        periods = dates.dt.to_period(_PERIOD_FREQ[self.scheme])
+        partitions = self._partitions_copy()
+        keys = []
+        for period, group in df.groupby(periods, sort=True, dropna=False):
+            key = UNDATED if pd.isna(period) else period.strftime(_KEY_FORMATS[self.scheme])
+            append_frame(group, self.partition_path(key), date_format="%Y-%m-%d %H:%M:%S")
+            partitions[key] = self._frame_stats(partitions.get(key), group, dates[group.index])
+            keys.append(key)
+        self._write_manifest(partitions)
+        return keys
+
+    def _frame_stats(self, info, df, dates=None):
+        dates = (pd.to_datetime(df["date"], errors="coerce") if dates is None else dates).dropna()
+        stamps = [dates.min().strftime("%Y-%m-%d %H:%M:%S"), dates.max().strftime("%Y-%m-%d %H:%M:%S")] if len(dates) else []
+        return self._merge_stats(info, stamps, [int(df["invoice_no"].min()), int(df["invoice_no"].max())], len(df))
+
+    def rewrite_partition(self, key, df):
+        """Replaces a partition's contents with `df` (raw, string-dated rows) and refreshes its manifest entry."""
+        partitions = self._partitions_copy()
+        path = self.partition_path(key)
+        if df.empty:
+            if os.path.exists(path):
+                os.remove(path)
+            partitions.pop(key, None)
+        else:
+            atomic_write_csv(df, path)
+            partitions[key] = self._frame_stats(None, df)
+        self._write_manifest(partitions)
+
+    # --- Tombstones ---
+    def tombstones(self):
+        """{invoice_no: kind} for deleted/voided invoices not yet compacted into the partitions."""
+        signature = file_signature(self.tombstone_file)
+        with self._memory_lock:
+            if self._tombstones[0] == signature:
+                return self._tombstones[1]
+        try:
+            df = pd.read_csv(self.tombstone_file)
+            dead = dict(zip(df["invoice_no"].astype(int), df["kind"].astype(str)))
+        except (OSError, ValueError, KeyError):
+            dead = {}
+        with self._memory_lock:
+            self._tombstones = (signature, dead)
+        return dead
+
+    def add_tombstone(self, invoice_no, kind="delete"):
+        if kind not in TOMBSTONE_KINDS:
+            raise ValueError(f"Unknown tombstone kind: {kind}")
+        _append_csv([{"invoice_no": int(invoice_no), "kind": kind,
+                      "recorded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}],
+                    self.tombstone_file, TOMBSTONE_COLUMNS)
+
+    def compact_partition(self, key, dead=None):
+        """Folds the tombstones (default: all pending) that hit one partition into its base file.
+        Voided rows are kept in voided.csv for audit. Returns the number of rows removed.
+        The tombstones themselves stay: an invoice can have lines in more than one partition,
+        so they are dropped with drop_tombstones() once every partition has been compacted.
+        """
+        dead = self.tombstones() if dead is None else dead
+        if not dead:
+            return 0
+        df = pd.read_csv(self.partition_path(key))
+        match = df["invoice_no"].isin(list(dead))
+        if not match.any():
+            return 0
+        removed = df[match]
+        voided = removed[removed["invoice_no"].map(dead) == "void"]
+        if not voided.empty:
+            append_sales(voided.to_dict("records"), path=self.voided_file)
+        self.rewrite_partition(key, df[~match])
+        return len(removed)
+
+    def drop_tombstones(self, invoice_nos):
+        """Forgets the tombstones of invoices whose rows are gone from every partition."""
+        try:
+            tombstones = pd.read_csv(self.tombstone_file)
+        except (OSError, ValueError):
+            return
+        atomic_write_csv(tombstones[~tombstones["invoice_no"].isin(list(invoice_nos))], self.tombstone_file)
+
+    def migrate(self, legacy_file=SALES_FILE):
+        """Moves any rows found in the single-file ledger (sales.csv) into partitions.
+        The original file is kept as '<file>.bak' and reset to just its header.
+        """
+        if not os.path.exists(legacy_file):
+            return 0
+        with open(legacy_file, "r", encoding="utf-8") as f:
+            f.readline()
+            if not f.readline().strip():
+                return 0
+
+        df = pd.read_csv(legacy_file).reindex(columns=SALES_COLUMNS)
+        self.append_frame(df)
+
+        shutil.copyfile(legacy_file, legacy_file + ".bak")
+        atomic_write_csv(pd.DataFrame(columns=SALES_COLUMNS), legacy_file)
+        return len(df)
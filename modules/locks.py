@@ -0,0 +1,98 @@
+import os
+import time
+from contextlib import contextmanager
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+DEFAULT_LOCK_TIMEOUT = 10.0
+
+
+class LockTimeout(TimeoutError):
+    pass
+
+
+def _try_lock(fd):
+    if os.name == "nt":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _unlock(fd):
+    if os.name == "nt":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+# ===============================
+# ADVISORY FILE LOCK
+# ===============================
+@contextmanager
+def file_lock(path, timeout=DEFAULT_LOCK_TIMEOUT, poll=0.005):
+    """Holds an exclusive advisory lock on '<path>.lock' for the duration of the block.
+    Works across processes (Streamlit sessions, the desktop app) and threads.
+    Raises LockTimeout if the lock cannot be acquired within `timeout` seconds.
+    """
+    fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                _try_lock(fd)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise LockTimeout(f"Timed out after {timeout:.0f}s waiting for lock on {os.path.basename(path)}")
+                time.sleep(poll)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+# ===============================
+# ATOMIC REPLACE
+# ===============================
+def _replace(tmp, path, retries=50):
+    # On Windows os.replace fails while another process has the target open for reading
+    for attempt in range(retries):
+        try:
+            os.replace(tmp, path)
+            return
+        except PermissionError:
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.02)
+
+
+@contextmanager
+def atomic_write(path, mode="w", encoding="utf-8", newline=""):
+    """Yields a temp file next to `path`; on success it is fsynced and renamed over `path`,
+    so readers only ever see the old or the new file, never a half-written one.
+    """
+    tmp = f"{path}.{os.getpid()}.{time.monotonic_ns()}.tmp"
+    f = open(tmp, mode, encoding=encoding if "b" not in mode else None, newline=newline if "b" not in mode else None)
+    try:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        _replace(tmp, path)
+    except BaseException:
+        f.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def atomic_write_csv(df, path):
+    with atomic_write(path) as f:
+        df.to_csv(f, index=False, lineterminator="\n")
@@ -3,10 +3,14 @@ import sys
 
 def get_base_path():
     """Returns the base path for data storage.
+    If FAIRANDLOVELY_HOME is set, uses that directory.
     If running as an EXE, uses %APPDATA%/MakeupGST.
     Otherwise, uses the script directory.
     """
-    if getattr(sys, 'frozen', False):
+    if os.environ.get("FAIRANDLOVELY_HOME"):
+        # Explicit override (benchmarks, scratch copies of the data)
+        base = os.environ["FAIRANDLOVELY_HOME"]
+    elif getattr(sys, 'frozen', False):
         # Running as a bundled EXE
         appdata = os.environ.get("APPDATA")
         base = os.path.join(appdata, "MakeupGST")
@@ -20,12 +24,23 @@ def get_base_path():
 BASE_DIR = get_base_path()
 DATA_FOLDER = os.path.join(BASE_DIR, "data")
 INVOICE_FOLDER = os.path.join(BASE_DIR, "invoices")
+CACHE_FOLDER = os.path.join(DATA_FOLDER, ".cache")
+REPORT_CACHE_FOLDER = os.path.join(CACHE_FOLDER, "reports")
+SALES_PARTITION_FOLDER = os.path.join(DATA_FOLDER, "sales")
+EXPORT_FOLDER = os.path.join(DATA_FOLDER, "export")
 
 # Ensure folders exist
 os.makedirs(DATA_FOLDER, exist_ok=True)
 os.makedirs(INVOICE_FOLDER, exist_ok=True)
+os.makedirs(CACHE_FOLDER, exist_ok=True)
+os.makedirs(REPORT_CACHE_FOLDER, exist_ok=True)
 
 # File paths
 PRODUCTS_FILE = os.path.join(DATA_FOLDER, "products.csv")
 SALES_FILE = os.path.join(DATA_FOLDER, "sales.csv")
 EXPENSES_FILE = os.path.join(DATA_FOLDER, "expenses.csv")
+DB_FILE = os.path.join(DATA_FOLDER, "fairandlovely.db")
+INVOICE_SEQ_FILE = os.path.join(DATA_FOLDER, "invoice_seq.txt")
+ROLLUP_FILE = os.path.join(DATA_FOLDER, "daily_rollups.json")
+CUSTOMER_INDEX_FILE = os.path.join(DATA_FOLDER, "customers.db")
+RENDER_QUEUE_FILE = os.path.join(DATA_FOLDER, "render_queue.db")
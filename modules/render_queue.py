@@ -0,0 +1,253 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from modules.invoice import generate_invoice_pdf, has_invoice_pdf, invoice_path
+from modules.paths import RENDER_QUEUE_FILE
+
+# Seconds to wait before each retry of a failed render; after the last one the job is marked failed
+RETRY_DELAYS = (2, 10, 60, 300)
+
+# How often an idle worker looks for jobs queued by another process (e.g. the other UI)
+IDLE_POLL_SECONDS = 5
+
+# A crash can only lose the checkouts in flight: at startup the newest invoices in the ledger are
+# checked for a PDF or a queued job, and re-queued from the ledger if they have neither
+RECOVERY_SCAN = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    invoice_no INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_try REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    queued REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_try);
+"""
+
+_wake = threading.Event()
+_stop = threading.Event()
+_thread = None
+_start_lock = threading.Lock()
+
+
+@contextmanager
+def _connect(path=RENDER_QUEUE_FILE):
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+# ===============================
+# QUEUE
+# ===============================
+def enqueue(invoice_no, customer, items, total, address="", contact="", date=None):
+    """Queues the invoice PDF (same arguments as generate_invoice_pdf) and returns at once.
+    Call it after the sale is in the ledger; the background worker renders the PDF.
+    """
+    if isinstance(date, datetime):
+        date = date.strftime("%Y-%m-%d %H:%M:%S")
+    payload = json.dumps({"customer": customer, "items": items, "total": float(total),
+                          "address": address or "", "contact": contact or "", "date": date})
+    with _connect() as conn:
+        conn.execute("INSERT INTO jobs (invoice_no, payload, status, attempts, next_try, error, queued) "
+                     "VALUES (?, ?, 'pending', 0, 0, NULL, ?) ON CONFLICT(invoice_no) DO UPDATE SET "
+                     "payload = excluded.payload, status = 'pending', attempts = 0, next_try = 0, error = NULL",
+                     (int(invoice_no), payload, time.time()))
+    _wake.set()
+
+
+def cancel(invoice_no):
+    """Drops a queued render (e.g. the invoice was deleted)."""
+    with _connect() as conn:
+        conn.execute("DELETE FROM jobs WHERE invoice_no = ?", (int(invoice_no),))
+
+
+def status(invoice_no):
+    """'queued', 'rendering', 'retrying' (an attempt failed, another is scheduled), 'failed',
+    'ready' (the PDF exists and nothing is queued) or None (no PDF and nothing queued).
+    """
+    with _connect() as conn:
+        row = conn.execute("SELECT status, attempts FROM jobs WHERE invoice_no = ?", (int(invoice_no),)).fetchone()
+    if row is None:
+        return "ready" if has_invoice_pdf(invoice_no) else None
+    state, attempts = row
+    if state == "pending":
+        return "retrying" if attempts else "queued"
+    return state
+
+
+def error(invoice_no):
+    with _connect() as conn:
+        row = conn.execute("SELECT error FROM jobs WHERE invoice_no = ?", (int(invoice_no),)).fetchone()
+    return row[0] if row else None
+
+
+def counts():
+    """{'pending': n, 'rendering': n, 'failed': n} across the queue, for status displays."""
+    result = {"pending": 0, "rendering": 0, "failed": 0}
+    with _connect() as conn:
+        result.update(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+    return result
+
+
+def failures(limit=20):
+    """[(invoice_no, error)] of renders that gave up after every retry, newest first."""
+    with _connect() as conn:
+        return conn.execute("SELECT invoice_no, error FROM jobs WHERE status = 'failed' "
+                            "ORDER BY invoice_no DESC LIMIT ?", (limit,)).fetchall()
+
+
+def retry_failed():
+    """Puts every failed render back in the queue with a fresh set of retries."""
+    with _connect() as conn:
+        retried = conn.execute("UPDATE jobs SET status = 'pending', attempts = 0, next_try = 0 "
+                               "WHERE status = 'failed'").rowcount
+    _wake.set()
+    return retried
+
+
+def wait(invoice_no, timeout=30.0):
+    """Blocks until the invoice's PDF is ready or has failed (or `timeout` passes); returns status()."""
+    deadline = time.monotonic() + timeout
+    while True:
+        state = status(invoice_no)
+        if state in ("ready", "failed", None) or time.monotonic() >= deadline:
+            return state
+        time.sleep(0.05)
+
+
+# ===============================
+# WORKER
+# ===============================
+def _claim():
+    """Takes the oldest due job, or returns None. The conditional UPDATE makes the claim safe
+    when both UIs run a worker on the same queue.
+    """
+    with _connect() as conn:
+        while True:
+            row = conn.execute("SELECT invoice_no, payload, attempts FROM jobs WHERE status = 'pending' "
+                               "AND next_try <= ? ORDER BY next_try, invoice_no LIMIT 1", (time.time(),)).fetchone()
+            if row is None:
+                return None
+            if conn.execute("UPDATE jobs SET status = 'rendering' WHERE invoice_no = ? AND status = 'pending'",
+                            (row[0],)).rowcount:
+                return row
+
+
+def _idle_seconds():
+    with _connect() as conn:
+        (due,) = conn.execute("SELECT MIN(next_try) FROM jobs WHERE status = 'pending'").fetchone()
+    return IDLE_POLL_SECONDS if due is None else min(IDLE_POLL_SECONDS, max(0.0, due - time.time()))
+
+
+def _render(invoice_no, payload, attempts):
+    try:
+        job = json.loads(payload)
+        date = datetime.strptime(job["date"], "%Y-%m-%d %H:%M:%S") if job["date"] else None
+        generate_invoice_pdf(invoice_no, job["customer"], job["items"], job["total"],
+                             job["address"], job["contact"], date)
+    except Exception as e:
+        attempts += 1
+        gave_up = attempts > len(RETRY_DELAYS)
+        delay = 0 if gave_up else RETRY_DELAYS[attempts - 1]
+        with _connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, attempts = ?, next_try = ?, error = ? "
+                         "WHERE invoice_no = ? AND status = 'rendering'",
+                         ("failed" if gave_up else "pending", attempts, time.time() + delay,
+                          f"{type(e).__name__}: {e}", invoice_no))
+        return
+    with _connect() as conn:
+        # Left alone if the sale was re-queued while rendering; it is rendered again with the new payload
+        done = conn.execute("DELETE FROM jobs WHERE invoice_no = ? AND status = 'rendering'", (invoice_no,)).rowcount
+        cancelled = not done and conn.execute("SELECT 1 FROM jobs WHERE invoice_no = ?", (invoice_no,)).fetchone() is None
+    if cancelled:
+        # The invoice was deleted or voided while it rendered: do not leave its PDF behind
+        try:
+            os.remove(invoice_path(invoice_no))
+        except FileNotFoundError:
+            pass
+
+
+def _run():
+    while not _stop.is_set():
+        job = None
+        try:
+            job = _claim()
+            if job is None:
+                _wake.wait(_idle_seconds())
+                _wake.clear()
+                continue
+            _render(*job)
+        except sqlite3.Error:
+            _stop.wait(IDLE_POLL_SECONDS)  # queue database busy or unavailable; try again shortly
+        except Exception as e:
+            # e.g. the finished PDF could not be removed after a cancel; the worker keeps going
+            print(f"Invoice render failed: {type(e).__name__}: {e}", file=sys.stderr)
+            if job is not None:
+                try:
+                    with _connect() as conn:
+                        conn.execute("UPDATE jobs SET status = 'failed', error = ? "
+                                     "WHERE invoice_no = ? AND status = 'rendering'",
+                                     (f"{type(e).__name__}: {e}", job[0]))
+                except sqlite3.Error:
+                    pass  # left 'rendering'; recover() re-queues it at the next start
+
+
+def recover(storage=None):
+    """Re-queues renders interrupted by a crash or shutdown, and any of the newest RECOVERY_SCAN
+    invoices in the ledger that have neither a PDF nor a queued job. Returns how many were queued.
+    """
+    from modules.invoice_batch import ledger_invoice
+    if storage is None:
+        from modules.storage import get_storage
+        storage = get_storage()
+    with _connect() as conn:
+        # If the other UI is mid-render this renders that invoice twice, which is harmless
+        requeued = conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'rendering'").rowcount
+        queued = {n for (n,) in conn.execute("SELECT invoice_no FROM jobs")}
+    last = storage.last_invoice_no()
+    if last is not None:
+        for invoice_no in range(max(int(last) - RECOVERY_SCAN + 1, 1), int(last) + 1):
+            if invoice_no in queued or has_invoice_pdf(invoice_no):
+                continue
+            job = ledger_invoice(invoice_no, storage)
+            if job is not None:
+                number, customer, items, total, date, contact, address = job
+                enqueue(number, customer, items, total, address, contact, date)
+                requeued += 1
+    _wake.set()
+    return requeued
+
+
+def start(storage=None):
+    """Starts the background render worker for this process (idempotent) after recover()."""
+    global _thread
+    with _start_lock:
+        if _thread is not None and _thread.is_alive():
+            return _thread
+        _stop.clear()
+        recover(storage)
+        _thread = threading.Thread(target=_run, name="pdf-render", daemon=True)
+        _thread.start()
+        return _thread
+
+
+def stop():
+    """Stops the worker after its current render; anything still queued is picked up on the next start()."""
+    _stop.set()
+    _wake.set()
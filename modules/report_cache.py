@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import time
+from datetime import date
+
+from modules.locks import atomic_write
+from modules.paths import REPORT_CACHE_FOLDER
+
+# Cached PDFs beyond this total are evicted oldest first
+MAX_CACHE_BYTES = 256 * 2**20
+
+# Cached PDFs older than this are evicted (the key changes daily, so nothing older is served)
+MAX_AGE_SECONDS = 24 * 3600
+
+# Bump after a report layout change so earlier renders are not served
+CACHE_VERSION = 1
+
+
+# ===============================
+# REPORT PDF CACHE
+# ===============================
+def cache_key(kind, params, storage):
+    """Content address of a report: its type, its parameters, the ledger's data version and the
+    day. Any sale, deletion or expense changes the version, so a stale render is never found, and
+    a report's printed "Generated On" / "As of" date is always today's.
+    """
+    blob = json.dumps([CACHE_VERSION, kind, params, storage.name, storage.data_version(), date.today().isoformat()],
+                      default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _fresh(path):
+    try:
+        return time.time() - os.path.getmtime(path) <= MAX_AGE_SECONDS
+    except OSError:
+        return False
+
+
+def cached_report(kind, params, render, storage=None):
+    """Path of the cached PDF for report `kind` with `params` (anything JSON-serialisable).
+    render(f) writes the PDF to the binary file `f` and only runs when no current render is
+    cached. Treat the file as read-only and read or copy it straight away: it may later be evicted.
+    """
+    if storage is None:
+        from modules.storage import get_storage
+        storage = get_storage()
+    path = os.path.join(REPORT_CACHE_FOLDER, f"{kind}-{cache_key(kind, params, storage)}.pdf")
+    if _fresh(path):
+        return path
+    os.makedirs(REPORT_CACHE_FOLDER, exist_ok=True)
+    with atomic_write(path, "wb") as f:
+        render(f)
+    evict(keep=path)
+    return path
+
+
+def read_report(kind, params, render, storage=None):
+    """cached_report(), as bytes (for web downloads)."""
+    with open(cached_report(kind, params, render, storage), "rb") as f:
+        return f.read()
+
+
+def evict(max_bytes=MAX_CACHE_BYTES, max_age=MAX_AGE_SECONDS, keep=None):
+    """Removes cached PDFs older than `max_age` seconds, then the oldest until the rest fit in
+    `max_bytes`. `keep` (a path) is never removed. Returns how many files were removed.
+    """
+    now = time.time()
+    entries = []
+    try:
+        with os.scandir(REPORT_CACHE_FOLDER) as it:
+            for entry in it:
+                if entry.name.endswith(".pdf"):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+    except FileNotFoundError:
+        return 0
+    removed, total = 0, 0
+    for mtime, size, path in sorted(entries, reverse=True):  # newest first
+        if path == keep:
+            total += size
+            continue
+        if now - mtime > max_age or total + size > max_bytes:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass  # already evicted by the other UI
+        else:
+            total += size
+    return removed
+
+
+def clear():
+    """Empties the cache; returns how many files were removed."""
+    return evict(max_bytes=0, max_age=0)
@@ -1,26 +1,323 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
 import pandas as pd
 
-from modules.paths import SALES_FILE, EXPENSES_FILE
+from modules import rollups
+from modules.storage import EXPORT_CHUNK_ROWS, get_storage
 
-def generate_profit_loss():
-    sales = pd.read_csv(SALES_FILE)
-    expenses = pd.read_csv(EXPENSES_FILE)
+# Results kept per (query, date range, data version); the oldest are evicted first
+REPORT_CACHE_SIZE = 64
 
-    total_sales = sales["total"].sum()
-    total_expenses = expenses["amount"].sum()
+# Time buckets for the analytics views: pandas period frequency (ISO weeks run Monday-Sunday)
+BUCKETS = {"day": "D", "week": "W-SUN", "month": "M", "quarter": "Q"}
+ROLLING_WINDOWS = (7, 30)
+SERIES_COLUMNS = ["gross", "net", "gst", "expenses", "profit", "lines"]
 
-    profit = total_sales - total_expenses
+# GST rate slabs (%) always listed in the return summary, even when nothing was sold at them
+GST_SLABS = (0.0, 5.0, 12.0, 18.0, 28.0)
+GST_COLUMNS = ["rate", "taxable_value", "tax", "total", "invoices", "lines"]
 
-    return total_sales, total_expenses, profit
-def generate_balance_sheet():
-    sales = pd.read_csv(SALES_FILE)
-    expenses = pd.read_csv(EXPENSES_FILE)
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _day(value):
+    # Dates, datetimes and 'YYYY-MM-DD...' strings all key the same way
+    return None if value is None or value == "" else str(value)[:10]
+
+
+def _memoized(name, storage, args, compute):
+    """LRU memo keyed on the query, its arguments and the ledger's data version.
+    Any sale, deletion or expense changes the version, so stale entries are never served.
+    """
+    storage = storage or get_storage()
+    key = (name, args, storage.name, storage.data_version())
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+    result = compute(storage)
+    with _memo_lock:
+        _memo[key] = result
+        while len(_memo) > REPORT_CACHE_SIZE:
+            _memo.popitem(last=False)
+    return result
+
+
+def clear_cache():
+    with _memo_lock:
+        _memo.clear()
+
+
+# ===============================
+# SUMMARIES
+# ===============================
+def summary(start=None, end=None, storage=None):
+    """Financial summary for the inclusive [start, end] range (None = all time):
+    total_sales (incl. GST), revenue_ex_gst, gst_collected, expenses, net_profit, lines.
+    """
+    start, end = _day(start), _day(end)
+
+    def compute(storage):
+        totals = rollups.totals(storage, start, end)
+        return {
+            "total_sales": totals["gross"],
+            "revenue_ex_gst": totals["base"],
+            "gst_collected": totals["gst"],
+            "expenses": totals["expenses"],
+            "net_profit": totals["base"] - totals["expenses"],
+            "lines": totals["lines"],
+        }
+    return dict(_memoized("summary", storage, (start, end), compute))
+
+
+def summary_rows(result):
+    """[label, formatted value] rows shared by the report tables and PDFs."""
+    return [
+        ["Total Sales (Incl. GST)", f"₹ {result['total_sales']:,.2f}"],
+        ["Total Revenue (Excl. GST)", f"₹ {result['revenue_ex_gst']:,.2f}"],
+        ["GST Collected", f"₹ {result['gst_collected']:,.2f}"],
+        ["Total Expenses", f"₹ {result['expenses']:,.2f}"],
+        ["NET PROFIT/LOSS", f"₹ {result['net_profit']:,.2f}"],
+    ]
+
+
+def balance_sheet(storage=None):
+    """All-time snapshot: cash_balance, gst_payable, retained_earnings and the two totals."""
+    totals = summary(storage=storage)
+    cash_balance = totals["total_sales"] - totals["expenses"]
+    gst_payable = totals["gst_collected"]
+    retained_earnings = totals["net_profit"]
+    return {
+        "cash_balance": cash_balance,
+        "gst_payable": gst_payable,
+        "retained_earnings": retained_earnings,
+        "total_assets": cash_balance,
+        "total_liabilities_equity": gst_payable + retained_earnings,
+    }
+
+
+# ===============================
+# BREAKDOWNS
+# ===============================
+def daily_sales(start=None, end=None, storage=None):
+    """Per-day gross, base, gst and line count (see rollups.daily_sales). Treat as read-only."""
+    start, end = _day(start), _day(end)
+    return _memoized("daily_sales", storage, (start, end), lambda s: rollups.daily_sales(s, start, end))
+
+
+def top_services(start=None, end=None, limit=5, storage=None):
+    start, end = _day(start), _day(end)
+    return _memoized("top_services", storage, (start, end, limit),
+                     lambda s: rollups.service_counts(s, start, end).head(limit))
+
+
+def sales_by_customer(start=None, end=None, storage=None):
+    """Gross sales per customer over the range, largest first."""
+    start, end = _day(start), _day(end)
+
+    def compute(storage):
+        sales = storage.load_sales(start, end)
+        return sales.groupby("customer", observed=True)["total"].sum().sort_values(ascending=False)
+    return _memoized("sales_by_customer", storage, (start, end), compute)
+
+
+# ===============================
+# TIME-BUCKETED ANALYTICS
+# ===============================
+def _daily_frame(storage, start, end):
+    """One row per calendar day in [start, end] (gaps filled with 0) from the daily rollups:
+    gross, net (ex GST), gst, expenses, profit, lines. Indexed by day.
+    """
+    sales = rollups.daily_sales(storage, start, end).set_index("day")
+    expenses = rollups.daily_expenses(storage, start, end).set_index("day")
+    df = pd.DataFrame({
+        "gross": sales["gross"],
+        "net": sales["base"],
+        "gst": sales["gst"],
+        "expenses": expenses["amount"],
+        "lines": sales["lines"],
+    })
+    if start is not None or end is not None or not df.empty:
+        first = pd.Timestamp(start) if start is not None else df.index.min()
+        last = pd.Timestamp(end) if end is not None else df.index.max()
+        df = df.reindex(pd.date_range(first, last, freq="D", name="day"))
+    df = df.fillna(0.0).astype("float64")
+    df["profit"] = df["net"] - df["expenses"]
+    df["lines"] = df["lines"].astype("int64")
+    return df[SERIES_COLUMNS]
+
+
+def timeseries(start=None, end=None, bucket="day", storage=None):
+    """Gross, net (ex GST), GST, expenses, profit and line count per day, ISO week, month or quarter.
+    Returns a frame with a 'period' column (first day of each bucket) followed by SERIES_COLUMNS.
+    Built from the daily rollups, so multi-year ranges cost one row per day, not per line item.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket: {bucket} (use one of {', '.join(BUCKETS)})")
+    start, end = _day(start), _day(end)
 
-    assets = sales["total"].sum()
-    liabilities = expenses["amount"].sum()
-    equity = assets - liabilities
+    def compute(storage):
+        daily = _daily_frame(storage, start, end)
+        if bucket != "day":
+            daily = daily.groupby(daily.index.to_period(BUCKETS[bucket]).start_time).sum()
+        return daily.rename_axis("period").reset_index()
+    return _memoized("timeseries", storage, (start, end, bucket), compute)
 
-    return assets, liabilities, equity
-def sales_by_salesperson():
-    sales = pd.read_csv("data/sales.csv")
-    return sales.groupby("salesperson")["total"].sum()
+
+def rolling(start=None, end=None, window=7, storage=None):
+    """Trailing `window`-day sums of the daily series for each day in [start, end].
+    Days before `start` are read so the first values cover a full window.
+    """
+    start, end = _day(start), _day(end)
+
+    def compute(storage):
+        lead = None if start is None else str(pd.Timestamp(start).date() - timedelta(days=window - 1))
+        daily = _daily_frame(storage, lead, end)
+        sums = daily.rolling(f"{window}D").sum()
+        sums["lines"] = sums["lines"].astype("int64")
+        if start is not None:
+            sums = sums.loc[pd.Timestamp(start):]
+        return sums.rename_axis("period").reset_index()
+    return _memoized("rolling", storage, (start, end, window), compute)
+
+
+# ===============================
+# GST RETURN SUMMARY
+# ===============================
+def _runs(keys):
+    """Drops adjacent repeats (keys is sorted, so what is left is distinct)."""
+    return keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) > 1 else keys
+
+
+def _gst_frame(sales, by_day):
+    """One pass over the line items: each line gets a group id (slab, or day x slab) and
+    taxable value, tax, lines and distinct invoices are all bincounts over that id.
+    """
+    if by_day:
+        sales = sales[sales["date"].notna()]
+    rate = np.round(sales["gst"].to_numpy("float64", na_value=0.0), 2)
+    price = sales["price"].to_numpy("float64", na_value=0.0)
+    total = sales["total"].to_numpy("float64", na_value=0.0)
+    invoice = sales["invoice_no"].to_numpy("int64")
+
+    # Standard slabs are always present; odd rates (e.g. 3%) get their own row
+    rates = np.array(GST_SLABS)
+    group = np.minimum(np.searchsorted(rates, rate), len(rates) - 1)
+    odd = rate[rates[group] != rate]
+    if len(odd):
+        rates = np.union1d(rates, odd)
+        group = np.searchsorted(rates, rate)
+    group = group.astype("int64")
+    n_days = 1
+    if by_day:
+        day = sales["date"].to_numpy("datetime64[D]").astype("int64")
+        first = day.min() if len(day) else 0
+        n_days = int(day.max() - first + 1) if len(day) else 0
+        group += (day - first) * len(rates)
+    size = len(rates) * n_days
+
+    # Distinct (invoice, group) pairs, invoice-major. The ledger is in date order, so invoice
+    # numbers are already nearly sorted and the stable (timsort) sort runs in about linear time.
+    offset = invoice - invoice.min() if len(invoice) else invoice
+    pairs = _runs(np.sort(_runs((offset << 32) | group), kind="stable"))
+    df = pd.DataFrame({
+        "rate": np.tile(rates, n_days),
+        "taxable_value": np.bincount(group, weights=price, minlength=size),
+        "tax": np.bincount(group, weights=total - price, minlength=size),
+        "total": np.bincount(group, weights=total, minlength=size),
+        "invoices": np.bincount(pairs & 0xFFFFFFFF, minlength=size),
+        "lines": np.bincount(group, minlength=size),
+    }).astype({"taxable_value": "float64", "tax": "float64", "total": "float64"})  # bincount of nothing is int
+    if by_day:
+        days = (np.arange(n_days) + first).astype("datetime64[D]").astype("datetime64[ns]")
+        df.insert(0, "day", np.repeat(days, len(rates)))
+        df = df[df["lines"] > 0].reset_index(drop=True)
+    else:
+        df = df[(df["lines"] > 0) | df["rate"].isin(GST_SLABS)].reset_index(drop=True)
+    df.attrs["invoices"] = len(_runs(pairs >> 32))
+    return df
+
+
+def gst_summary(start=None, end=None, by_day=False, storage=None):
+    """GST return summary for the inclusive [start, end] range: per rate slab (and per day if
+    `by_day`) the taxable value (ex GST), tax, gross total, distinct invoices and line count.
+    df.attrs['invoices'] holds the distinct invoice count for the whole period. Treat as read-only.
+    """
+    start, end = _day(start), _day(end)
+    return _memoized("gst_summary", storage, (start, end, by_day),
+                     lambda s: _gst_frame(s.load_sales(start, end), by_day))
+
+
+def gst_summary_rows(df, total=True):
+    """[slab, taxable, tax, total, invoices] display rows (prefixed with the day for a by_day
+    frame), plus a TOTAL row unless `total` is False.
+    """
+    day = [d.strftime("%Y-%m-%d") for d in df["day"]] if "day" in df else None
+    rows = [([day[i]] if day else []) +
+            [f"{r.rate:g}%", f"₹ {r.taxable_value:,.2f}", f"₹ {r.tax:,.2f}", f"₹ {r.total:,.2f}", f"{r.invoices:,}"]
+            for i, r in enumerate(df[GST_COLUMNS].itertuples(index=False))]
+    if total:
+        rows.append(([""] if day else []) + [
+            "TOTAL", f"₹ {df['taxable_value'].sum():,.2f}", f"₹ {df['tax'].sum():,.2f}",
+            f"₹ {df['total'].sum():,.2f}", f"{df.attrs.get('invoices', df['invoices'].sum()):,}"])
+    return rows
+
+
+def export_gst_summary(df, path, fmt=None):
+    """Writes a gst_summary frame to `path` (a filename or a binary buffer): Excel when `fmt`
+    is 'xlsx' or the filename ends in .xlsx, CSV otherwise. Returns `path`.
+    """
+    fmt = fmt or ("xlsx" if str(path).lower().endswith(".xlsx") else "csv")
+    out = df.round({"taxable_value": 2, "tax": 2, "total": 2})
+    if fmt == "xlsx":
+        out.to_excel(path, sheet_name="GST Summary", index=False, engine="xlsxwriter")
+    else:
+        out.to_csv(path, index=False, date_format="%Y-%m-%d")
+    return path
+
+
+# ===============================
+# REPORT PDF ROWS
+# ===============================
+def _cell(value):
+    # Table cells are single lines: the PDF tables rely on a fixed row height
+    return "" if value is None or value != value else str(value).replace("\n", " ")
+
+
+def sales_report_rows(start=None, end=None, storage=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields [invoice #, date, customer, service, total] display rows for the detailed sales
+    section of the financial report PDF, streamed from the ledger one chunk at a time.
+    """
+    storage = storage or get_storage()
+    for chunk in storage.iter_sales(_day(start), _day(end), chunk_rows):
+        dates = chunk["date"].dt.strftime("%Y-%m-%d %H:%M:%S").fillna("").tolist()
+        for inv, date, cust, service, total in zip(chunk["invoice_no"].tolist(), dates, chunk["customer"].tolist(),
+                                                   chunk["service"].tolist(), chunk["total"].tolist()):
+            yield [_cell(inv), date, _cell(cust), _cell(service), f"₹{total:.2f}"]
+
+
+def daily_report_rows(start=None, end=None, storage=None):
+    """[day, lines, revenue ex GST, GST, total] display rows per day with sales, from the daily
+    rollups, for the summarised-by-day variant of the financial report PDF.
+    """
+    daily = daily_sales(start, end, storage)
+    return [[r.day.strftime("%Y-%m-%d"), f"{int(r.lines):,}", f"₹ {r.base:,.2f}", f"₹ {r.gst:,.2f}", f"₹ {r.gross:,.2f}"]
+            for r in daily.itertuples(index=False)]
+
+
+# --- Legacy helpers (tuples) ---
+# Their original contract: figures include GST, unlike summary()'s net_profit and balance_sheet()
+def generate_profit_loss():
+    """(total sales incl. GST, expenses, sales minus expenses)."""
+    totals = summary()
+    return totals["total_sales"], totals["expenses"], totals["total_sales"] - totals["expenses"]
+
+
+def generate_balance_sheet():
+    """(assets = total sales incl. GST, liabilities = expenses, equity = assets - liabilities)."""
+    totals = summary()
+    return totals["total_sales"], totals["expenses"], totals["total_sales"] - totals["expenses"]
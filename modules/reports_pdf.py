@@ -1,12 +1,117 @@
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, Flowable
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
+from reportlab.pdfbase.pdfdoc import PDFArray, PDFName, PDFStream
+from reportlab.pdfgen.canvas import Canvas
 from datetime import datetime
+import io
 import os
+import zlib
 
-def generate_financial_report_pdf(path, start_date, end_date, summary_data, sales_data):
-    doc = SimpleDocTemplate(path, pagesize=A4)
+# Every generator takes `path` as a filename, a binary buffer, or None to render in memory and
+# return the PDF bytes (what a web download needs; nothing is written to disk)
+def _target(path):
+    return io.BytesIO() if path is None else path
+
+def _result(path, target):
+    return target.getvalue() if path is None else path
+
+
+# --- Financial report: detailed section ---
+# Every detail row is this tall (cells are single lines), so a page's worth of rows is known
+# before laying any of them out
+ROW_HEIGHT = 18  # what the old single table gave its 8pt rows
+
+SALES_HEADER = ["Invoice #", "Date", "Customer", "Item", "Total"]
+SALES_WIDTHS = [0.8*72, 1.2*72, 1.2*72, 1.2*72, 0.8*72]
+DAILY_HEADER = ["Date", "Lines", "Revenue (Excl. GST)", "GST", "Total"]
+DAILY_WIDTHS = [1.1*72, 0.8*72, 1.5*72, 1.2*72, 1.4*72]
+DETAIL_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.whitesmoke),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+
+class _RowStream(Flowable):
+    """Lays out the rows of an iterable as one repeat-header LongTable per page. Rows are pulled
+    only as pages are filled, so neither the rows nor a whole-report table are ever held in memory,
+    and no table is ever split across pages.
+    """
+
+    def __init__(self, header, rows, col_widths, style):
+        Flowable.__init__(self)
+        self.header, self.col_widths, self.style = header, col_widths, style
+        self.rows, self.pending, self.table = iter(rows), [], None
+        self.width = sum(col_widths)
+        self.hAlign = "CENTER"
+
+    def _room(self, availHeight):
+        return int(availHeight // ROW_HEIGHT) - 1  # rows that fit under the header row
+
+    def _pull(self, n):
+        while len(self.pending) < n:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.pending.append(row)
+
+    def _table(self, rows):
+        return LongTable([self.header] + rows, colWidths=self.col_widths, rowHeights=ROW_HEIGHT,
+                         repeatRows=1, style=self.style)
+
+    def wrap(self, availWidth, availHeight):
+        room = self._room(availHeight)
+        self._pull(room + 1)
+        if len(self.pending) > room:
+            self.table = None
+            return self.width, availHeight + ROW_HEIGHT  # more rows than fit: the frame splits us
+        self.table = self._table(self.pending)
+        return self.table.wrap(availWidth, availHeight)
+
+    def split(self, availWidth, availHeight):
+        room = self._room(availHeight)
+        if room < 1:
+            return []  # not even one row: start on the next page
+        self._pull(room)
+        rows, self.pending = self.pending[:room], self.pending[room:]
+        # The doc marks a flowable that did not fit at a page end and fails if it happens twice;
+        # the rest of the stream is a fresh flowable each time
+        self.__dict__.pop("_postponed", None)
+        return [self._table(rows), self]
+
+    def draw(self):
+        self.table.drawOn(self.canv, 0, 0)
+
+
+class _CompactCanvas(Canvas):
+    """Compresses each page's content stream as the page is finished. reportlab otherwise keeps
+    every page's drawing operators as text until the document is saved, which is most of the
+    memory a long report takes.
+    """
+
+    def showPage(self):
+        Canvas.showPage(self)
+        page = self._doc.Pages.pages[-1]
+        if page.stream:
+            contents = PDFStream(content=zlib.compress(page.stream.encode("utf8")))
+            contents.dictionary["Filter"] = PDFArray([PDFName("FlateDecode")])  # already applied
+            contents.__Comment__ = "page stream"
+            page.Contents, page.stream = contents, None
+
+
+def generate_financial_report_pdf(path, start_date, end_date, summary_data, sales_data, by_day=False):
+    """Summary table plus the detailed sales section. `sales_data` is any iterable of
+    [invoice #, date, customer, item, total] rows (reports.sales_report_rows streams them from the
+    ledger) and is consumed page by page, so memory stays bounded however long the report is.
+    With `by_day`, `sales_data` holds reports.daily_report_rows instead and the section is one
+    row per day.
+    """
+    target = _target(path)
+    doc = SimpleDocTemplate(target, pagesize=A4)
     elements = []
     styles = getSampleStyleSheet()
 
@@ -38,27 +143,21 @@ def generate_financial_report_pdf(path, start_date, end_date, summary_data, sale
     elements.append(Spacer(1, 24))
 
     # Detailed Sales
-    elements.append(Paragraph("<b>Detailed Sales History</b>", styles['Heading2']))
+    if by_day:
+        elements.append(Paragraph("<b>Daily Sales Summary</b>", styles['Heading2']))
+        header, widths = DAILY_HEADER, DAILY_WIDTHS
+    else:
+        elements.append(Paragraph("<b>Detailed Sales History</b>", styles['Heading2']))
+        header, widths = SALES_HEADER, SALES_WIDTHS
     elements.append(Spacer(1, 6))
+    elements.append(_RowStream(header, sales_data, widths, DETAIL_STYLE))
 
-    sales_table_data = [["Invoice #", "Date", "Customer", "Item", "Total"]]
-    for row in sales_data:
-        sales_table_data.append(row)
-
-    d_table = Table(sales_table_data, colWidths=[0.8*72, 1.2*72, 1.2*72, 1.2*72, 0.8*72])
-    d_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.whitesmoke),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-    ]))
-    elements.append(d_table)
-
-    doc.build(elements)
-    return path
+    doc.build(elements, canvasmaker=_CompactCanvas)
+    return _result(path, target)
 
 def generate_balance_sheet_pdf(path, cash, gst_payable, equity):
-    doc = SimpleDocTemplate(path, pagesize=A4)
+    target = _target(path)
+    doc = SimpleDocTemplate(target, pagesize=A4)
     elements = []
     styles = getSampleStyleSheet()
 
@@ -98,4 +197,54 @@ def generate_balance_sheet_pdf(path, cash, gst_payable, equity):
     elements.append(Paragraph("<i>This is a computer-generated financial statement.</i>", styles['Italic']))
 
     doc.build(elements)
-    return path
+    return _result(path, target)
+
+def generate_gst_summary_pdf(path, start_date, end_date, slab_rows, daily_rows=None):
+    """GST return summary page: one row per rate slab (reports.gst_summary_rows), optionally
+    followed by the day-by-day breakdown as [day, slab, taxable, tax, total, invoices] rows.
+    """
+    target = _target(path)
+    doc = SimpleDocTemplate(target, pagesize=A4)
+    elements = []
+    styles = getSampleStyleSheet()
+
+    elements.append(Paragraph("<b>Fairandlovely - GST SUMMARY</b>", styles['Title']))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(f"Period: {start_date} to {end_date}", styles['Normal']))
+    elements.append(Paragraph(f"Generated On: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
+    elements.append(Spacer(1, 18))
+
+    # Slab Table
+    elements.append(Paragraph("<b>Tax by Rate Slab</b>", styles['Heading2']))
+    elements.append(Spacer(1, 6))
+
+    slab_table = Table([["GST Rate", "Taxable Value", "Tax", "Total", "Invoices"]] + list(slab_rows),
+                       colWidths=[0.9*72, 1.5*72, 1.3*72, 1.5*72, 0.8*72])
+    slab_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ]))
+    elements.append(slab_table)
+
+    if daily_rows:
+        elements.append(Spacer(1, 24))
+        elements.append(Paragraph("<b>Daily Breakdown</b>", styles['Heading2']))
+        elements.append(Spacer(1, 6))
+        daily_table = Table([["Date", "GST Rate", "Taxable Value", "Tax", "Total", "Invoices"]] + list(daily_rows),
+                            colWidths=[1*72, 0.8*72, 1.3*72, 1.1*72, 1.3*72, 0.7*72], repeatRows=1)
+        daily_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.whitesmoke),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
+        ]))
+        elements.append(daily_table)
+
+    elements.append(Spacer(1, 24))
+    elements.append(Paragraph("<i>Taxable value excludes GST. Invoices with lines at several rates count once per slab; "
+                              "the TOTAL row counts each invoice once.</i>", styles['Italic']))
+
+    doc.build(elements)
+    return _result(path, target)
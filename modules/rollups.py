@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+
+import pandas as pd
+
+from modules.locks import atomic_write, file_lock
+from modules.paths import ROLLUP_FILE
+
+SALES_FIELDS = ["gross", "base", "gst", "lines"]
+EXPENSE_FIELDS = ["amount", "entries"]
+
+# Below this many rows a plain loop beats pandas' groupby overhead (a checkout is a handful of lines)
+SMALL_DELTA_ROWS = 500
+
+_memory = {"signature": None, "state": None}
+_memory_lock = threading.Lock()
+
+
+def _token(version):
+    return json.dumps(version, default=str)
+
+
+def _empty_state():
+    return {"versions": {"sales": None, "expenses": None}, "sales": {}, "services": {}, "expenses": {}}
+
+
+def _read_state(for_update=False):
+    # Readers share one parsed copy; writers get a private one they can mutate
+    try:
+        st = os.stat(ROLLUP_FILE)
+    except FileNotFoundError:
+        return _empty_state()
+    signature = (st.st_size, st.st_mtime_ns)
+    if not for_update:
+        with _memory_lock:
+            if _memory["signature"] == signature:
+                return _memory["state"]
+    try:
+        with open(ROLLUP_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return _empty_state()
+    if not for_update:
+        with _memory_lock:
+            _memory["signature"], _memory["state"] = signature, state
+    return state
+
+
+def _write_state(state):
+    with atomic_write(ROLLUP_FILE) as f:
+        json.dump(state, f, separators=(",", ":"))
+
+
+def _round(value):
+    return round(float(value), 6)
+
+
+# ===============================
+# DELTAS
+# ===============================
+def _sales_rollup(df):
+    """Aggregates typed sales rows into {day: [gross, base, gst, lines]} and {day: {service: count}}."""
+    df = df[df["date"].notna()]
+    if df.empty:
+        return {}, {}
+    if len(df) < SMALL_DELTA_ROWS:
+        sales, svc = {}, {}
+        for ts, service, price, total in zip(df["date"], df["service"], df["price"], df["total"]):
+            d = ts.strftime("%Y-%m-%d")
+            acc = sales.setdefault(d, [0.0, 0.0, 0.0, 0])
+            acc[0] += total
+            acc[1] += price
+            acc[2] += total - price
+            acc[3] += 1
+            counts = svc.setdefault(d, {})
+            counts[str(service)] = counts.get(str(service), 0) + 1
+        return sales, svc
+    day = df["date"].dt.floor("D")
+    daily = pd.DataFrame({"day": day, "gross": df["total"], "base": df["price"],
+                          "gst": df["total"] - df["price"]}).groupby("day").agg(
+        gross=("gross", "sum"), base=("base", "sum"), gst=("gst", "sum"), lines=("gross", "size"))
+    services = pd.DataFrame({"day": day, "service": df["service"].astype(str)}).groupby(["day", "service"]).size()
+
+    sales = {d.strftime("%Y-%m-%d"): [r.gross, r.base, r.gst, int(r.lines)] for d, r in daily.iterrows()}
+    svc = {}
+    for (d, service), count in services.items():
+        svc.setdefault(d.strftime("%Y-%m-%d"), {})[service] = int(count)
+    return sales, svc
+
+
+def _expense_rollup(df):
+    df = df[df["date"].notna()]
+    if df.empty:
+        return {}
+    if len(df) < SMALL_DELTA_ROWS:
+        expenses = {}
+        for ts, amount in zip(df["date"], df["amount"]):
+            acc = expenses.setdefault(ts.strftime("%Y-%m-%d"), [0.0, 0])
+            acc[0] += amount
+            acc[1] += 1
+        return expenses
+    daily = df.groupby(df["date"].dt.floor("D"))["amount"].agg(["sum", "size"])
+    return {d.strftime("%Y-%m-%d"): [r["sum"], int(r["size"])] for d, r in daily.iterrows()}
+
+
+def _merge(target, delta, sign):
+    for day, values in delta.items():
+        current = target.get(day, [0] * len(values))
+        merged = [_round(c + sign * v) if i < len(values) - 1 else int(c + sign * v)
+                  for i, (c, v) in enumerate(zip(current, values))]
+        if merged[-1] <= 0:
+            target.pop(day, None)
+        else:
+            target[day] = merged
+
+
+def _merge_services(target, delta, sign):
+    for day, counts in delta.items():
+        current = target.setdefault(day, {})
+        for service, count in counts.items():
+            current[service] = current.get(service, 0) + sign * count
+            if current[service] <= 0:
+                del current[service]
+        if not current:
+            del target[day]
+
+
+# ===============================
+# INCREMENTAL MAINTENANCE
+# ===============================
+def record(table, rows, sign, before_version, after_version):
+    """Applies a write (sign=+1 for new rows, -1 for deleted rows) to the daily rollups.
+    Must be called while the writer still holds the table's lock, with the table
+    version seen just before and just after the write. If the rollups were not at
+    `before_version`, they are left marked stale and rebuilt on the next read.
+    """
+    with file_lock(ROLLUP_FILE):
+        state = _read_state(for_update=True)
+        if state["versions"].get(table) != _token(before_version):
+            return False
+        if table == "sales":
+            sales, services = _sales_rollup(rows)
+            _merge(state["sales"], sales, sign)
+            _merge_services(state["services"], services, sign)
+        else:
+            _merge(state["expenses"], _expense_rollup(rows), sign)
+        state["versions"][table] = _token(after_version)
+        _write_state(state)
+    return True
+
+
+def rebuild(storage, tables=("sales", "expenses")):
+    """Recomputes the rollups for `tables` from the full ledger.
+    Holds each table's write lock so no write can slip in between reading the data and its version.
+    """
+    for table in tables:
+        with storage.write_lock(table), file_lock(ROLLUP_FILE):
+            state = {**_empty_state(), **_read_state(for_update=True)}
+            if table == "sales":
+                state["sales"], state["services"] = _sales_rollup(storage.load_sales())
+            else:
+                state["expenses"] = _expense_rollup(storage.load_expenses())
+            state["versions"][table] = _token(storage.table_version(table))
+            _write_state(state)
+    return _read_state()
+
+
+def _current_state(storage):
+    state = _read_state()
+    stale = [t for t in ("sales", "expenses") if state["versions"].get(t) != _token(storage.table_version(t))]
+    return rebuild(storage, stale) if stale else state
+
+
+# ===============================
+# QUERIES
+# ===============================
+def _in_range(day, start, end):
+    # Days are 'YYYY-MM-DD' strings, so plain string comparison orders them correctly
+    return (start is None or day >= str(start)[:10]) and (end is None or day <= str(end)[:10])
+
+
+def daily_sales(storage, start=None, end=None):
+    """Per-day gross, base revenue, GST and line count for the inclusive [start, end] range."""
+    state = _current_state(storage)
+    rows = [[day] + values for day, values in state["sales"].items() if _in_range(day, start, end)]
+    df = pd.DataFrame(rows, columns=["day"] + SALES_FIELDS)
+    df["day"] = pd.to_datetime(df["day"])
+    return df.sort_values("day").reset_index(drop=True)
+
+
+def service_counts(storage, start=None, end=None):
+    """Line-item count per service over the range, most popular first."""
+    state = _current_state(storage)
+    totals = {}
+    for day, counts in state["services"].items():
+        if _in_range(day, start, end):
+            for service, count in counts.items():
+                totals[service] = totals.get(service, 0) + count
+    return pd.Series(totals, dtype="int64", name="count").sort_values(ascending=False)
+
+
+def daily_expenses(storage, start=None, end=None):
+    state = _current_state(storage)
+    rows = [[day] + values for day, values in state["expenses"].items() if _in_range(day, start, end)]
+    df = pd.DataFrame(rows, columns=["day"] + EXPENSE_FIELDS)
+    df["day"] = pd.to_datetime(df["day"])
+    return df.sort_values("day").reset_index(drop=True)
+
+
+def totals(storage, start=None, end=None):
+    """Sums the rollups over the range: gross, base, gst, lines, expenses."""
+    sales = daily_sales(storage, start, end)
+    expenses = daily_expenses(storage, start, end)
+    return {
+        "gross": float(sales["gross"].sum()),
+        "base": float(sales["base"].sum()),
+        "gst": float(sales["gst"].sum()),
+        "lines": int(sales["lines"].sum()),
+        "expenses": float(expenses["amount"].sum()),
+    }
@@ -0,0 +1,89 @@
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+SALES_COLUMNS = ["invoice_no", "date", "customer", "service", "price", "gst", "total"]
+PRODUCT_COLUMNS = ["id", "name", "price", "gst"]
+EXPENSE_COLUMNS = ["date", "description", "amount"]
+
+# ===============================
+# TABLE SCHEMAS
+# ===============================
+# Money stays float64 so sums over millions of rows keep their paise; the GST rate
+# (0-28, sometimes 2.5) fits float32, and names repeat heavily so they are dictionary-encoded.
+SALES_DTYPES = {
+    "invoice_no": "int32",
+    "customer": "category",
+    "service": "category",
+    "price": "float64",
+    "gst": "float32",
+    "total": "float64",
+}
+EXPENSE_DTYPES = {
+    "description": "category",
+    "amount": "float64",
+}
+
+
+def _parse_dates(values):
+    """ISO timestamps ('YYYY-MM-DD[ HH:MM:SS]') take the fast path; anything else is inferred per value."""
+    parsed = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], format="mixed", errors="coerce")
+    return parsed
+
+
+def _apply(df, columns, dtypes):
+    df = df.reindex(columns=columns)
+    df["date"] = df["date"] if pd.api.types.is_datetime64_any_dtype(df["date"]) else _parse_dates(df["date"])
+    for col, dtype in dtypes.items():
+        if dtype == "category":
+            df[col] = df[col].astype(str).astype("category") if df[col].dtype != "category" else df[col]
+        elif dtype.startswith("int"):
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(dtype)
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+    return df.reset_index(drop=True)
+
+
+def parse_sales(df):
+    return _apply(df, SALES_COLUMNS, SALES_DTYPES)
+
+
+def parse_expenses(df):
+    return _apply(df, EXPENSE_COLUMNS, EXPENSE_DTYPES)
+
+
+def read_sales_csv(path):
+    """Reads a sales CSV straight into the typed schema (no object columns in between)."""
+    df = pd.read_csv(path, dtype={"customer": "category", "service": "category", "price": "float64",
+                                  "gst": "float32", "total": "float64"})
+    return parse_sales(df)
+
+
+def read_expenses_csv(path):
+    df = pd.read_csv(path, dtype={"description": "category", "amount": "float64"})
+    return parse_expenses(df)
+
+
+def sort_by_date(df):
+    """Orders a typed table by timestamp (stable, so invoice lines keep their order; undated rows last).
+    Range queries binary-search this order, see storage._filter_by_date.
+    """
+    if df["date"].is_monotonic_increasing:
+        return df
+    return df.sort_values("date", kind="stable", na_position="last", ignore_index=True)
+
+
+def concat_frames(frames):
+    """pd.concat that keeps categorical columns categorical (plain concat falls back to object
+    as soon as two frames have different categories).
+    """
+    frames = [f for f in frames if f is not None]
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames, ignore_index=True)
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype) and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = union_categoricals([f[col] for f in frames], ignore_order=True)
+    return df
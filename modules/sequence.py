@@ -0,0 +1,45 @@
+from modules.locks import atomic_write, file_lock
+from modules.paths import INVOICE_SEQ_FILE
+
+FIRST_INVOICE_NO = 1001
+
+
+def _read_next(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_next(path, value):
+    with atomic_write(path) as f:
+        f.write(str(value))
+
+
+def _seed_from_ledger():
+    # Only runs once, when the sequence file does not exist yet
+    from modules.storage import get_storage
+    last = get_storage().last_invoice_no()
+    return int(last) + 1 if last is not None else FIRST_INVOICE_NO
+
+
+# ===============================
+# INVOICE NUMBER SEQUENCE
+# ===============================
+def reserve_invoice_numbers(count=1, path=INVOICE_SEQ_FILE):
+    """Atomically reserves `count` consecutive invoice numbers and returns them as a range.
+    Numbers are never handed out twice, even after invoices are deleted.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    with file_lock(path):
+        next_no = _read_next(path)
+        if next_no is None:
+            next_no = _seed_from_ledger()
+        _write_next(path, next_no + count)
+    return range(next_no, next_no + count)
+
+
+def next_invoice_no(path=INVOICE_SEQ_FILE):
+    return reserve_invoice_numbers(1, path)[0]
@@ -0,0 +1,628 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from modules import cache, customers, rollups
+from modules.paths import PRODUCTS_FILE, SALES_FILE, EXPENSES_FILE, DB_FILE, SALES_PARTITION_FOLDER, EXPORT_FOLDER
+from modules.ledger import PartitionedLedger, append_frame
+from modules.locks import atomic_write_csv, file_lock
+from modules.schema import (SALES_COLUMNS, PRODUCT_COLUMNS, EXPENSE_COLUMNS, parse_sales, parse_expenses,
+                            read_sales_csv, read_expenses_csv, concat_frames, sort_by_date)
+
+# Backend selection: "csv" (default) or "sqlite"
+STORAGE_BACKEND = os.environ.get("FAIRANDLOVELY_STORAGE", "csv").lower()
+
+# SQLite sales_page: deeper than this, non-date orders switch from LIMIT/OFFSET to a cached rowid order
+SHALLOW_PAGE_ROWS = 1000
+
+# Rows per frame yielded by iter_sales (streaming exports)
+EXPORT_CHUNK_ROWS = 100_000
+
+# Pending tombstones that trigger a background compaction of the CSV sales ledger
+COMPACT_THRESHOLD = 100
+
+
+def _as_date(value):
+    """Accepts a date, datetime or 'YYYY-MM-DD' string and returns a date (or None)."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def _filter_by_date(df, start=None, end=None):
+    """Slices a date-sorted typed table (see schema.sort_by_date) to the inclusive [start, end] day range.
+    The datetime64 column is an int64 epoch array, so this is two binary searches and a
+    zero-copy slice instead of a comparison per row. Undated (NaT) rows sort last and never match.
+    """
+    start, end = _as_date(start), _as_date(end)
+    if df.empty or (start is None and end is None):
+        return df.copy(deep=False)
+    stamps = df["date"].to_numpy()
+    lo = 0 if start is None else np.searchsorted(stamps, np.datetime64(start, "us"), side="left")
+    if end is None:
+        # Stop before the undated tail
+        hi = np.searchsorted(stamps, np.datetime64("NaT"), side="left")
+    else:
+        hi = np.searchsorted(stamps, np.datetime64(end + timedelta(days=1), "us"), side="left")
+    return df.iloc[lo:hi]
+
+
+def _sort_column(sort_by):
+    if sort_by not in SALES_COLUMNS:
+        raise ValueError(f"Cannot sort sales by {sort_by!r} (use one of {', '.join(SALES_COLUMNS)})")
+    return sort_by
+
+
+def _page_order(df, sort_by, descending):
+    """Row positions of a date-sorted sales table ordered by `sort_by`; ties stay in date order."""
+    values = df[sort_by].reset_index(drop=True)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Categoricals sort by code; put the codes in label order first
+        values = values.cat.reorder_categories(sorted(values.cat.categories))
+    return values.sort_values(ascending=not descending, kind="stable", na_position="last").index.to_numpy()
+
+
+def _record(table, rows, sign, before_version, after_version):
+    """Feeds a write to the derived indexes (daily rollups, customer index); see rollups.record."""
+    rollups.record(table, rows, sign, before_version, after_version)
+    customers.record(table, rows, sign, before_version, after_version)
+
+
+def _concat_sorted(frames):
+    return sort_by_date(concat_frames(frames))
+
+
+def _read_csv(path, columns):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return pd.DataFrame(columns=columns)
+    return pd.read_csv(path)
+
+
+def _read_typed(path, columns, reader, parse):
+    # Cached tables are kept in timestamp order so date ranges can be binary-searched
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return parse(pd.DataFrame(columns=columns))
+    return sort_by_date(reader(path))
+
+
+# ===============================
+# CSV BACKEND
+# ===============================
+class CsvStorage:
+    """Repository API over CSV files in DATA_FOLDER: products.csv, expenses.csv and the
+    date-partitioned sales ledger (see modules.ledger.PartitionedLedger).
+    Rows dropped into the legacy single-file sales.csv are migrated into partitions at startup.
+    Deleted/voided invoices are tombstones applied on read until compact() folds them in.
+    Every mutation holds the file's advisory lock; rewrites go through temp-file + rename.
+    """
+
+    name = "csv"
+
+    def __init__(self, products_file=PRODUCTS_FILE, sales_file=SALES_FILE, expenses_file=EXPENSES_FILE,
+                 sales_folder=SALES_PARTITION_FOLDER):
+        self.products_file = products_file
+        self.sales_file = sales_file
+        self.expenses_file = expenses_file
+        self.ledger = PartitionedLedger(sales_folder)
+        self._compacting = threading.Lock()
+        self._page_cache = None  # (range key, sales in range, {(column, descending): row order})
+        self.init_files()
+        with self.write_lock("sales"):
+            if self.ledger.migrate(self.sales_file):
+                cache.invalidate()
+
+    def init_files(self):
+        for path, columns in ((self.products_file, PRODUCT_COLUMNS),
+                              (self.sales_file, SALES_COLUMNS),
+                              (self.expenses_file, EXPENSE_COLUMNS)):
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                with file_lock(path):
+                    if not os.path.exists(path) or os.path.getsize(path) == 0:
+                        atomic_write_csv(pd.DataFrame(columns=columns), path)
+
+    # --- Catalog ---
+    def load_products(self):
+        return _read_csv(self.products_file, PRODUCT_COLUMNS)
+
+    def add_product(self, name, price, gst):
+        with file_lock(self.products_file):
+            df = self.load_products()
+            new_id = int(df["id"].max()) + 1 if not df.empty else 1
+            df.loc[len(df)] = [new_id, name, float(price), float(gst)]
+            atomic_write_csv(df, self.products_file)
+        return new_id
+
+    def table_version(self, table):
+        # Appends rewrite the manifest and deletions append a tombstone, so together they version the ledger
+        if table == "sales":
+            return cache.file_signature(self.ledger.manifest_file, self.ledger.tombstone_file)
+        return cache.file_signature(self.expenses_file)
+
+    def write_lock(self, table):
+        return file_lock(self.sales_file if table == "sales" else self.expenses_file)
+
+    def data_version(self):
+        """Token that changes whenever sales or expenses change."""
+        return (self.table_version("sales"), self.table_version("expenses"))
+
+    # --- Sales Ledger ---
+    def _partition_table(self, key, remember=True):
+        path = self.ledger.partition_path(key)
+        return cache.load_table(f"csv-sales-{key}", cache.file_signature(path),
+                                lambda: _read_typed(path, SALES_COLUMNS, read_sales_csv, parse_sales), remember)
+
+    def _sales_table(self, keys):
+        frames = [self._partition_table(key) for key in keys]
+        if not frames:
+            return parse_sales(pd.DataFrame(columns=SALES_COLUMNS))
+        df = concat_frames(frames)
+        dead = self.ledger.tombstones()
+        if dead:
+            # Tombstone overlay: hide deleted/voided invoices not yet compacted away
+            df = df[~df["invoice_no"].isin(list(dead))]
+        return df
+
+    def load_sales(self, start=None, end=None):
+        # Partition pruning: only partitions overlapping [start, end] are opened
+        keys = self.ledger.partitions(_as_date(start), _as_date(end))
+        return _filter_by_date(self._sales_table(keys), start, end)
+
+    def iter_sales(self, start=None, end=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Yields the sales in [start, end] in date order as typed frames of up to `chunk_rows` rows.
+        One partition is read at a time and not kept in the table cache, so memory is bounded
+        by the largest partition rather than the whole range.
+        """
+        dead = self.ledger.tombstones()
+        for key in self.ledger.partitions(_as_date(start), _as_date(end)):
+            df = _filter_by_date(self._partition_table(key, remember=False), start, end)
+            if dead:
+                df = df[~df["invoice_no"].isin(list(dead))]
+            for offset in range(0, len(df), chunk_rows):
+                yield df.iloc[offset:offset + chunk_rows]
+
+    def sales_page(self, start=None, end=None, offset=0, limit=100, sort_by="date", descending=False):
+        """One page of the sales in [start, end] ordered by `sort_by`, plus the total row count.
+        The range and each requested row order are kept for the current ledger version, so
+        paging or scrolling through it costs a slice per page.
+        """
+        sort_by, offset = _sort_column(sort_by), max(int(offset), 0)
+        key = (str(_as_date(start)), str(_as_date(end)), self.data_version())
+        if self._page_cache is None or self._page_cache[0] != key:
+            self._page_cache = (key, self.load_sales(start, end), {})
+        _, df, orders = self._page_cache
+        if sort_by == "date":
+            # The table's own order (newest first is the same slice read backwards)
+            if not descending:
+                return df.iloc[offset:offset + limit], len(df)
+            return df.iloc[max(len(df) - offset - limit, 0):max(len(df) - offset, 0)][::-1], len(df)
+        if (sort_by, descending) not in orders:
+            orders[(sort_by, descending)] = _page_order(df, sort_by, descending)
+        return df.iloc[orders[(sort_by, descending)][offset:offset + limit]], len(df)
+
+    def append_sales(self, rows):
+        rows = list(rows)
+        new_rows = parse_sales(pd.DataFrame(rows))
+        with self.write_lock("sales"):
+            before = self.table_version("sales")
+            for key, group, part_before, part_after in self.ledger.append(rows):
+                cache.extend_table(f"csv-sales-{key}", part_before, part_after, parse_sales(pd.DataFrame(group)),
+                                   concat=_concat_sorted)
+            _record("sales", new_rows, +1, before, self.table_version("sales"))
+        return len(rows)
+
+    def append_sales_frame(self, df):
+        """Bulk append of a typed sales frame (modules.schema); used by the importer."""
+        with self.write_lock("sales"):
+            before = self.table_version("sales")
+            self.ledger.append_frame(df[SALES_COLUMNS], df["date"])
+            _record("sales", df, +1, before, self.table_version("sales"))
+        return len(df)
+
+    def get_invoice(self, invoice_no):
+        df = self._sales_table(self.ledger.partitions_with_invoice(int(invoice_no)))
+        return df[df["invoice_no"] == int(invoice_no)]
+
+    def last_invoice_no(self):
+        return self.ledger.last_invoice_no()
+
+    def delete_invoice(self, invoice_no, kind="delete"):
+        """Records a tombstone for the invoice; the partition files are not rewritten here,
+        so the cost does not grow with the ledger. kind is "delete" or "void".
+        """
+        with self.write_lock("sales"):
+            rows = self.get_invoice(invoice_no)
+            if not rows.empty:
+                before = self.table_version("sales")
+                self.ledger.add_tombstone(invoice_no, kind)
+                _record("sales", rows, -1, before, self.table_version("sales"))
+        if len(self.ledger.tombstones()) >= COMPACT_THRESHOLD:
+            self.compact_in_background()
+        return len(rows)
+
+    def void_invoice(self, invoice_no):
+        """Like delete_invoice, but compaction keeps the rows in sales/voided.csv for audit."""
+        return self.delete_invoice(invoice_no, kind="void")
+
+    def compact(self):
+        """Folds pending tombstones into the partition files, one partition per lock hold.
+        The tombstones are dropped only after every partition holding their invoices is rewritten,
+        so an invoice with lines in two partitions stays deleted throughout.
+        """
+        if not self._compacting.acquire(blocking=False):
+            return 0
+        try:
+            removed = 0
+            dead = dict(self.ledger.tombstones())
+            if not dead:
+                return 0
+            keys = {key for inv in dead for key in self.ledger.partitions_with_invoice(inv)}
+            for key in sorted(keys):
+                with self.write_lock("sales"):
+                    before = self.table_version("sales")
+                    removed += self.ledger.compact_partition(key, dead)
+                    # Same logical data, new version: tell the indexes so they are not rebuilt
+                    _record("sales", parse_sales(pd.DataFrame(columns=SALES_COLUMNS)), +1,
+                            before, self.table_version("sales"))
+            with self.write_lock("sales"):
+                before = self.table_version("sales")
+                self.ledger.drop_tombstones(dead)
+                _record("sales", parse_sales(pd.DataFrame(columns=SALES_COLUMNS)), +1,
+                        before, self.table_version("sales"))
+            return removed
+        finally:
+            self._compacting.release()
+
+    def compact_in_background(self):
+        threading.Thread(target=self.compact, name="ledger-compaction", daemon=True).start()
+
+    # --- Expenses ---
+    def _expenses_table(self):
+        return cache.load_table("csv-expenses", cache.file_signature(self.expenses_file),
+                                lambda: _read_typed(self.expenses_file, EXPENSE_COLUMNS, read_expenses_csv, parse_expenses))
+
+    def load_expenses(self, start=None, end=None):
+        return _filter_by_date(self._expenses_table(), start, end)
+
+    def add_expense(self, expense_date, description, amount):
+        self.append_expenses_frame(parse_expenses(pd.DataFrame([[str(expense_date), description, float(amount)]],
+                                                               columns=EXPENSE_COLUMNS)))
+
+    def append_expenses_frame(self, df):
+        """Appends typed expense rows to expenses.csv without rewriting it."""
+        with self.write_lock("expenses"):
+            before = self.table_version("expenses")
+            append_frame(df[EXPENSE_COLUMNS], self.expenses_file, date_format="%Y-%m-%d")
+            _record("expenses", df, +1, before, self.table_version("expenses"))
+        return len(df)
+
+
+# ===============================
+# SQLITE BACKEND
+# ===============================
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    gst REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sales (
+    invoice_no INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    customer TEXT,
+    service TEXT,
+    price REAL NOT NULL,
+    gst REAL NOT NULL,
+    total REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS expenses (
+    date TEXT NOT NULL,
+    description TEXT,
+    amount REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(date);
+CREATE INDEX IF NOT EXISTS idx_sales_invoice_no ON sales(invoice_no);
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date);
+CREATE TABLE IF NOT EXISTS voided_sales (
+    invoice_no INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    customer TEXT,
+    service TEXT,
+    price REAL NOT NULL,
+    gst REAL NOT NULL,
+    total REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _bump_version(conn, table):
+    conn.execute("INSERT INTO meta (key, value) VALUES (?, 1) "
+                 "ON CONFLICT(key) DO UPDATE SET value = value + 1", (f"{table}_version",))
+
+
+def _date_where(start, end):
+    """Builds an index-friendly WHERE clause on the 'YYYY-MM-DD HH:MM:SS' date column."""
+    start, end = _as_date(start), _as_date(end)
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("date >= ?")
+        params.append(start.isoformat())
+    if end is not None:
+        clauses.append("date < ?")
+        params.append((end + timedelta(days=1)).isoformat())
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class SqliteStorage:
+    """Repository API over a single SQLite database (WAL mode).
+    On first use, any existing CSV data is imported automatically.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=DB_FILE, auto_import=True):
+        self.path = path
+        self._page_cache = None  # (range, column, direction, version) key and the sorted rowids
+        is_new = not os.path.exists(path)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        if is_new and auto_import:
+            self.import_csv()
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps this safe across
+        # Streamlit's script threads and the desktop app.
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _query(self, sql, params=(), columns=None):
+        with self._connect() as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+        if columns is not None and df.empty:
+            return pd.DataFrame(columns=columns)
+        return df
+
+    def _version(self, table, conn=None):
+        if conn is None:
+            with self._connect() as conn:
+                return self._version(table, conn)
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (f"{table}_version",)).fetchone()
+        return row[0] if row else 0
+
+    def table_version(self, table):
+        return (self.path, self._version(table))
+
+    def write_lock(self, table):
+        # One lock for the whole database; SQLite serialises writers anyway
+        return file_lock(self.path)
+
+    def data_version(self):
+        """Ledger version numbers; bumped by every sales/expenses write."""
+        return (self.table_version("sales"), self.table_version("expenses"))
+
+    @contextmanager
+    def _write(self, table):
+        """Transaction for a sales/expenses write; yields (conn, changes) and feeds the derived indexes.
+        The file lock keeps the version bump and the rollup update in the same order across processes.
+        """
+        with self.write_lock(table):
+            with self._connect() as conn:
+                before = self._version(table, conn)
+                _bump_version(conn, table)
+                changes = []
+                yield conn, changes
+            for rows, sign in changes:
+                _record(table, rows, sign, (self.path, before), (self.path, before + 1))
+
+    # --- Catalog ---
+    def load_products(self):
+        return self._query("SELECT id, name, price, gst FROM products ORDER BY id", columns=PRODUCT_COLUMNS)
+
+    def add_product(self, name, price, gst):
+        with self._connect() as conn:
+            cur = conn.execute("INSERT INTO products (name, price, gst) VALUES (?, ?, ?)",
+                               (name, float(price), float(gst)))
+            return cur.lastrowid
+
+    # --- Sales Ledger ---
+    def load_sales(self, start=None, end=None):
+        where, params = _date_where(start, end)
+        # Timestamp order (the dates are ISO strings), matching the CSV backend's sorted tables
+        sql = f"SELECT {', '.join(SALES_COLUMNS)} FROM sales{where} ORDER BY date, rowid"
+        if not params:
+            # Whole-ledger reads (balance sheet) are served from the versioned cache
+            return cache.load_table("sqlite-sales", (self.path, self._version("sales")),
+                                    lambda: parse_sales(self._query(sql, columns=SALES_COLUMNS))).copy(deep=False)
+        return parse_sales(self._query(sql, params, columns=SALES_COLUMNS))
+
+    def iter_sales(self, start=None, end=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Yields the sales in [start, end] in date order as typed frames of up to `chunk_rows` rows,
+        read through one cursor so only a chunk is in memory at a time.
+        """
+        where, params = _date_where(start, end)
+        sql = f"SELECT {', '.join(SALES_COLUMNS)} FROM sales{where} ORDER BY date, rowid"
+        with self._connect() as conn:
+            for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunk_rows):
+                yield parse_sales(chunk)
+
+    def sales_page(self, start=None, end=None, offset=0, limit=100, sort_by="date", descending=False):
+        """One page of the sales in [start, end] ordered by `sort_by`, plus the total row count.
+        Date order pages straight off the date index (LIMIT/OFFSET). Past the first few pages,
+        other orders sort the range's rowids once per ledger version and each page then reads
+        only its own rows.
+        """
+        where, params = _date_where(start, end)
+        sort_by, offset, limit = _sort_column(sort_by), max(int(offset), 0), int(limit)
+        direction = "DESC" if descending else "ASC"
+        columns = ", ".join(SALES_COLUMNS)
+        order = f"date {direction}, rowid {direction}" if sort_by == "date" \
+            else f"{sort_by} IS NULL, {sort_by} {direction}, date, rowid"
+        with self._connect() as conn:
+            key = (str(_as_date(start)), str(_as_date(end)), sort_by, descending, self._version("sales", conn))
+            cached = self._page_cache is not None and self._page_cache[0] == key
+            if sort_by == "date" or (not cached and offset + limit <= SHALLOW_PAGE_ROWS):
+                # Index order, or the first pages of another order: SQLite's top-N sort is enough
+                total = conn.execute(f"SELECT COUNT(*) FROM sales{where}", params).fetchone()[0]
+                page = pd.read_sql_query(f"SELECT {columns} FROM sales{where} ORDER BY {order} LIMIT ? OFFSET ?",
+                                         conn, params=params + [limit, offset])
+            else:
+                if not cached:
+                    rows = conn.execute(f"SELECT rowid FROM sales{where} ORDER BY {order}", params).fetchall()
+                    self._page_cache = (key, np.array([r[0] for r in rows], dtype="int64"))
+                rowids = self._page_cache[1]
+                total, wanted = len(rowids), rowids[offset:offset + limit].tolist()
+                page = pd.read_sql_query(f"SELECT rowid AS _rowid, {columns} FROM sales "
+                                         f"WHERE rowid IN ({', '.join('?' * len(wanted))})", conn, params=wanted)
+                page = page.set_index("_rowid").reindex(wanted).reset_index(drop=True)
+        return parse_sales(page if not page.empty else pd.DataFrame(columns=SALES_COLUMNS)), total
+
+    def append_sales(self, rows):
+        rows = list(rows)
+        values = [tuple(r[c] for c in SALES_COLUMNS) for r in rows]
+        with self._write("sales") as (conn, changes):
+            conn.executemany(f"INSERT INTO sales ({', '.join(SALES_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)", values)
+            changes.append((parse_sales(pd.DataFrame(rows)), +1))
+        return len(values)
+
+    def append_sales_frame(self, df):
+        """Bulk append of a typed sales frame (modules.schema); used by the importer."""
+        out = df[SALES_COLUMNS].copy()
+        out["date"] = out["date"].dt.strftime("%Y-%m-%d %H:%M:%S").fillna("")
+        with self._write("sales") as (conn, changes):
+            out.to_sql("sales", conn, if_exists="append", index=False, chunksize=10_000)
+            changes.append((df, +1))
+        return len(df)
+
+    def get_invoice(self, invoice_no):
+        sql = f"SELECT {', '.join(SALES_COLUMNS)} FROM sales WHERE invoice_no = ? ORDER BY rowid"
+        return parse_sales(self._query(sql, (int(invoice_no),), columns=SALES_COLUMNS))
+
+    def last_invoice_no(self):
+        with self._connect() as conn:
+            (value,) = conn.execute("SELECT MAX(invoice_no) FROM sales").fetchone()
+        return value
+
+    def delete_invoice(self, invoice_no, kind="delete"):
+        # Indexed delete; no tombstones needed. Voided rows are kept in voided_sales for audit.
+        columns = ", ".join(SALES_COLUMNS)
+        with self._write("sales") as (conn, changes):
+            removed = pd.read_sql_query(f"SELECT {columns} FROM sales WHERE invoice_no = ?",
+                                        conn, params=(int(invoice_no),))
+            if kind == "void":
+                conn.execute(f"INSERT INTO voided_sales ({columns}) SELECT {columns} FROM sales WHERE invoice_no = ?",
+                             (int(invoice_no),))
+            deleted = conn.execute("DELETE FROM sales WHERE invoice_no = ?", (int(invoice_no),)).rowcount
+            changes.append((parse_sales(removed), -1))
+        return deleted
+
+    def void_invoice(self, invoice_no):
+        return self.delete_invoice(invoice_no, kind="void")
+
+    def compact(self):
+        return 0
+
+    def compact_in_background(self):
+        pass
+
+    # --- Expenses ---
+    def load_expenses(self, start=None, end=None):
+        where, params = _date_where(start, end)
+        sql = f"SELECT date, description, amount FROM expenses{where} ORDER BY date, rowid"
+        if not params:
+            return cache.load_table("sqlite-expenses", (self.path, self._version("expenses")),
+                                    lambda: parse_expenses(self._query(sql, columns=EXPENSE_COLUMNS))).copy(deep=False)
+        return parse_expenses(self._query(sql, params, columns=EXPENSE_COLUMNS))
+
+    def add_expense(self, expense_date, description, amount):
+        with self._write("expenses") as (conn, changes):
+            conn.execute("INSERT INTO expenses (date, description, amount) VALUES (?, ?, ?)",
+                         (str(expense_date), description, float(amount)))
+            changes.append((parse_expenses(pd.DataFrame([[str(expense_date), description, amount]],
+                                                        columns=EXPENSE_COLUMNS)), +1))
+
+    def append_expenses_frame(self, df):
+        out = df[EXPENSE_COLUMNS].copy()
+        out["date"] = out["date"].dt.strftime("%Y-%m-%d")
+        with self._write("expenses") as (conn, changes):
+            out.to_sql("expenses", conn, if_exists="append", index=False, chunksize=10_000)
+            changes.append((df, +1))
+        return len(df)
+
+    # --- CSV Import / Export ---
+    def import_csv(self, source=None):
+        """Loads the CSV data (products, partitioned sales ledger, expenses) into the database,
+        appending to whatever is already there.
+        """
+        source = source or CsvStorage()
+        counts = {}
+        with self.write_lock("sales"), self._connect() as conn:
+            for table, df, columns in (("products", source.load_products(), PRODUCT_COLUMNS),
+                                       ("sales", source.load_sales(), SALES_COLUMNS),
+                                       ("expenses", source.load_expenses(), EXPENSE_COLUMNS)):
+                if not df.empty:
+                    df = df[columns].copy()
+                    if "date" in df:
+                        # Undated rows keep an empty date (the column is NOT NULL)
+                        df["date"] = df["date"].dt.strftime("%Y-%m-%d %H:%M:%S").fillna("")
+                    df.to_sql(table, conn, if_exists="append", index=False, chunksize=10_000)
+                    _bump_version(conn, table)
+                counts[table] = len(df)
+        return counts
+
+    def export_csv(self, folder=EXPORT_FOLDER):
+        """Writes products.csv, sales.csv and expenses.csv into `folder` (not the live CSV ledger)."""
+        os.makedirs(folder, exist_ok=True)
+        self.load_products().to_csv(os.path.join(folder, "products.csv"), index=False)
+        self.load_sales().to_csv(os.path.join(folder, "sales.csv"), index=False, date_format="%Y-%m-%d %H:%M:%S")
+        self.load_expenses().to_csv(os.path.join(folder, "expenses.csv"), index=False, date_format="%Y-%m-%d")
+        return folder
+
+
+# ===============================
+# BACKEND FACTORY
+# ===============================
+_storage = None
+
+
+def get_storage():
+    """Returns the process-wide storage backend selected by FAIRANDLOVELY_STORAGE."""
+    global _storage
+    if _storage is None:
+        _storage = SqliteStorage() if STORAGE_BACKEND == "sqlite" else CsvStorage()
+    return _storage
+
+
+if __name__ == "__main__":
+    # python -m modules.storage import|export  -- move data between the CSV files and SQLite
+    # python -m modules.storage compact        -- fold pending invoice tombstones into the ledger
+    import sys
+
+    action = sys.argv[1] if len(sys.argv) > 1 else ""
+    if action == "import":
+        print(SqliteStorage(auto_import=False).import_csv())
+    elif action == "export":
+        print("Exported to", SqliteStorage().export_csv())
+    elif action == "compact":
+        print("Rows folded:", get_storage().compact())
+    else:
+        print("usage: python -m modules.storage import|export|compact")
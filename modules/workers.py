@@ -0,0 +1,140 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Loading, aggregation and PDF rendering run here instead of on the Tk thread.
+# pandas, sqlite3 and file I/O release the GIL for much of their work, so two workers keep the UI responsive.
+MAX_WORKERS = 2
+
+# How often the Tk thread drains finished results (ms)
+POLL_MS = 40
+
+_local = threading.local()
+
+
+class Cancelled(Exception):
+    """Raised inside a task by check_cancelled() once a newer task with the same key was submitted."""
+
+
+class Task:
+    def __init__(self, key, label):
+        self.key = key
+        self.label = label
+        self.fraction = None  # None = indeterminate
+        self.text = ""
+        self.cancelled = threading.Event()
+        self.future = None
+        self.on_done = None
+        self.on_error = None
+
+
+def report(fraction=None, text=""):
+    """Progress from inside a running task (fraction in [0, 1] or None); shown on the status bar."""
+    task = getattr(_local, "task", None)
+    if task is not None:
+        task.fraction, task.text = fraction, text
+        _local.runner._events.put(("progress", task, None))
+
+
+def check_cancelled():
+    """Lets long tasks stop early once they have been superseded."""
+    task = getattr(_local, "task", None)
+    if task is not None and task.cancelled.is_set():
+        raise Cancelled(task.key)
+
+
+class TaskRunner:
+    """Thread pool for a Tk app. Callbacks (on_done, on_error, on_busy) always run on the Tk
+    thread: workers only put results on a queue, which the Tk thread drains with after().
+
+    Tasks are keyed: submitting a new task under a key supersedes the previous one. A superseded
+    task that has not started is cancelled, one that is running is told via check_cancelled(),
+    and its result is dropped either way. So a refresh clicked twice only ever paints the last one.
+    """
+
+    def __init__(self, root, max_workers=MAX_WORKERS, on_busy=None):
+        self.root = root
+        self.on_busy = on_busy
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ui-worker")
+        self._events = queue.Queue()
+        self._current = {}
+        self._closed = False
+        self.root.after(POLL_MS, self._poll)
+
+    def submit(self, key, fn, *args, on_done=None, on_error=None, label=None, **kwargs):
+        """Runs fn(*args, **kwargs) on a worker and passes its result to on_done(result) on the Tk thread.
+        Errors go to on_error(exc); Cancelled is swallowed. Returns the Task.
+        """
+        previous = self._current.get(key)
+        if previous is not None:
+            previous.cancelled.set()
+            if previous.future is not None:
+                previous.future.cancel()
+        task = Task(key, label or key)
+        task.on_done, task.on_error = on_done, on_error
+        self._current[key] = task
+        task.future = self._pool.submit(self._run, task, fn, args, kwargs)
+        self._notify()
+        return task
+
+    def cancel(self, key):
+        task = self._current.pop(key, None)
+        if task is not None:
+            task.cancelled.set()
+            task.future.cancel()
+            self._notify()
+
+    def running(self):
+        """Tasks submitted and not yet delivered, oldest first."""
+        return list(self._current.values())
+
+    def shutdown(self):
+        # Pending work is dropped; tasks already running (e.g. an invoice PDF) are allowed to finish
+        self._closed = True
+        for task in self._current.values():
+            task.cancelled.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- Worker side ---
+    def _run(self, task, fn, args, kwargs):
+        _local.task, _local.runner = task, self
+        try:
+            check_cancelled()
+            self._events.put(("done", task, fn(*args, **kwargs)))
+        except Cancelled:
+            self._events.put(("cancelled", task, None))
+        except Exception as e:
+            self._events.put(("error", task, e))
+        finally:
+            _local.task = None
+
+    # --- Tk side ---
+    def _poll(self):
+        if self._closed:
+            return
+        changed = False
+        while True:
+            try:
+                kind, task, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            changed = True
+            if self._current.get(task.key) is not task:
+                continue  # superseded or cancelled: drop the result
+            if kind == "progress":
+                continue
+            del self._current[task.key]
+            callback = task.on_done if kind == "done" else task.on_error if kind == "error" else None
+            if callback is not None:
+                try:
+                    callback(payload)
+                except Exception as e:
+                    # Keep the poll loop alive; surface UI callback bugs like tkinter does
+                    self.root.report_callback_exception(type(e), e, e.__traceback__)
+        if changed:
+            self._notify()
+        self.root.after(POLL_MS, self._poll)
+
+    def _notify(self):
+        if self.on_busy is not None:
+            self.on_busy(self.running())